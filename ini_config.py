@@ -5,6 +5,11 @@
 """ini配置文件控制
 日常使用是保存在内存中
 需要调用函数保存到文件
+延迟写入模式: 改动在最后一次写配置 debounce_ms 后由后台线程写入文件, 不阻塞界面线程
+写入文件先写临时文件再替换 (os.replace), 中途崩溃不会截断原文件; 替换前临时文件设为原文件的权限
+save / close 在调用线程同步写入, 关闭时保证已保存
+读配置直接查键值缓存; load_int / load_bool / load_enum 返回校验后的类型值, 解析结果同样缓存
+check_reload 检测文件被外部修改 (修改时间、大小) 后重新加载, 并通知监听者 (运行中调整配置无需重启)
 """
 
 
@@ -17,12 +22,23 @@ __author__ = 'lihua.tan'
 # 基础库
 import os# 操作系统库
 import sys# 系统
-from enum import IntEnum# 枚举
+import time# 时间
+import atexit# 退出处理
+import tempfile# 临时文件
+import threading# 线程
+from io import StringIO# 字符串缓冲
+from enum import (Enum, IntEnum)# 枚举
 from configparser import ConfigParser# 配置解析库
 # 自封装库
 pass
 
 
+# 新建文件的默认权限 (按 umask; 导入时读取, os.umask 不能在后台线程中安全调用)
+_umask = os.umask(0)
+os.umask(_umask)
+_default_file_mode = 0o666 & ~_umask
+
+
 # 配置键名索引
 class ConfigKey(IntEnum):
     """配置键名索引
@@ -35,9 +51,13 @@ class GlobalConfig(object):
     '''全局ini配置文件控制
     '''
     _obj = None# 控制句柄
+    _listener_list = []# 重新加载的监听者
 
     @classmethod
-    def load_file(cls, dir_path: str = None, base_name: str = '全局配置') -> None:
+    def load_file(cls, dir_path: str = None, base_name: str = '全局配置', write_behind: bool = False) -> None:
+        """加载配置文件
+        write_behind: 延迟写入模式 (写配置后由后台线程写入文件)
+        """
         # 已初始化
         if cls._obj:
             cls._obj.load(False)
@@ -56,23 +76,85 @@ class GlobalConfig(object):
         # 文件路径
         ini_path = os.path.join(dir_path, base_name)
         # 创建配置
-        cls._obj = IniConfig(ini_path)
+        cls._obj = IniConfig(ini_path, write_behind)
 
     @classmethod
     def save_to_file(cls) -> None:
         """保存到文件
         """
+        if not cls._obj:
+            return None
         cls._obj.save()
 
+    @classmethod
+    def close(cls) -> None:
+        """同步保存并停止后台写入
+        """
+        if not cls._obj:
+            return None
+        cls._obj.close()
+
     @classmethod
     def load(cls, section: str, key: str, default: str) -> str:
         """加载配置
         section: 节 (__name__)
         key: 键
-        default: 默认
+        default: 默认 (未加载配置文件时直接返回)
         """
+        if not cls._obj:
+            return default
         return cls._obj.get_value(section, key, default)
 
+    @classmethod
+    def load_int(cls, section: str, key: str, default: int, min_value: int = None, max_value: int = None) -> int:
+        """加载整数配置 (无效值使用默认, 超出范围时取边界值)
+        """
+        if not cls._obj:
+            return default
+        return cls._obj.get_int(section, key, default, min_value, max_value)
+
+    @classmethod
+    def load_bool(cls, section: str, key: str, default: bool) -> bool:
+        """加载布尔配置 (1/0, yes/no, true/false, on/off; 无效值使用默认)
+        """
+        if not cls._obj:
+            return default
+        return cls._obj.get_bool(section, key, default)
+
+    @classmethod
+    def load_enum(cls, section: str, key: str, default: Enum) -> Enum:
+        """加载枚举配置 (成员名不区分大小写, 或成员值; 无效值使用默认)
+        default: 默认成员 (决定枚举类型)
+        """
+        if not cls._obj:
+            return default
+        return cls._obj.get_enum(section, key, default)
+
+    @classmethod
+    def add_reload_listener(cls, callback_func) -> None:
+        """添加重新加载的监听者 (无参数回调)
+        """
+        if callback_func not in cls._listener_list:
+            cls._listener_list.append(callback_func)
+
+    @classmethod
+    def remove_reload_listener(cls, callback_func) -> None:
+        """移除重新加载的监听者
+        """
+        if callback_func in cls._listener_list:
+            cls._listener_list.remove(callback_func)
+
+    @classmethod
+    def check_reload(cls) -> bool:
+        """文件被外部修改时重新加载并通知监听者
+        return: 已重新加载
+        """
+        if not cls._obj or not cls._obj.check_reload():
+            return False
+        for callback_func in list(cls._listener_list):
+            callback_func()
+        return True
+
     @classmethod
     def save(cls, section: str, key: str, value: str) -> None:
         """保存
@@ -80,6 +162,8 @@ class GlobalConfig(object):
         key: 键
         value: 值
         """
+        if not cls._obj:
+            return None
         cls._obj.set_value(section, key, value)
 
 
@@ -87,16 +171,32 @@ class GlobalConfig(object):
 class IniConfig(object):
     '''ini配置文件控制
     '''
-    def __init__(self, ini_path: str) -> None:
+    def __init__(self, ini_path: str, write_behind: bool = False, debounce_ms: int = 500) -> None:
         '''构造
         ini_path: ini配置文件路径
+        write_behind: 延迟写入模式 (写配置后由后台线程写入文件)
+        debounce_ms: 延迟写入模式下, 最后一次写配置后等待的毫秒数 (期间的改动合并为一次写入)
         '''
         if not ini_path.endswith('.ini'):
             raise ValueError from IniConfig
         self.__ini_path = os.path.abspath(ini_path)# ini文件路径
         self.__cfg_parser = ConfigParser()# 解析器
         self.__has_changed = False# 存在改动
+        self.__lock = threading.Lock()# 解析器访问锁
+        self.__write_lock = threading.Lock()# 文件写入锁 (保证写入顺序)
+        self.__condition = threading.Condition(self.__lock)# 通知后台线程
+        self.__debounce_s = debounce_ms / 1000# 延迟写入等待秒数
+        self.__due_time = 0.0# 延迟写入时刻 (time.monotonic)
+        self.__worker = None# 后台写入线程 (None 为同步模式)
+        self.__closed = False# 已关闭
+        self.__value_dict = {}# 键值缓存 {(节, 键): 值}
+        self.__typed_dict = {}# 类型值缓存 {(节, 键, 类型, 默认, 最小, 最大): 值}
+        self.__file_stat = None# 最近加载/写入时的文件 (修改时间, 大小)
         self.load()# 加载配置
+        if write_behind:
+            self.__worker = threading.Thread(target=self.__write_behind, name='IniConfigWriter', daemon=True)
+            self.__worker.start()
+            atexit.register(self.close)
 
     def __repr__(self) -> str:
         '''实例化对象的输出信息
@@ -108,26 +208,142 @@ class IniConfig(object):
         '''
         return self.__ini_path
 
+    def is_write_behind(self) -> bool:
+        '''延迟写入模式
+        '''
+        return self.__worker is not None
+
     def load(self, force_load=False) -> bool:
         '''加载配置
         force_load: =True, 忽略内存中的改动, 强制加载配置
         '''
-        if not os.path.isfile(self.__ini_path):
-            self.__has_changed = True
-            return False
-        if not force_load and self.__has_changed:
-            return False
-        self.__cfg_parser.read(self.__ini_path)
-        self.__has_changed = False
-        return True
+        with self.__lock:
+            if not os.path.isfile(self.__ini_path):
+                self.__has_changed = True
+                return False
+            if not force_load and self.__has_changed:
+                return False
+            self.__cfg_parser.read(self.__ini_path)
+            self.__has_changed = False
+            self.__file_stat = self.__get_file_stat()
+            self.__build_cache()
+            return True
 
-    def save(self) -> None:
-        '''保存配置
+    def reload(self) -> bool:
+        '''重新加载文件 (丢弃内存中未保存的改动)
         '''
-        if self.__has_changed:
+        with self.__lock:
+            if not os.path.isfile(self.__ini_path):
+                return False
+            cfg_parser = ConfigParser()
+            cfg_parser.read(self.__ini_path)
+            self.__cfg_parser = cfg_parser
             self.__has_changed = False
-            with open(self.__ini_path, 'w') as fp:
-                self.__cfg_parser.write(fp)
+            self.__file_stat = self.__get_file_stat()
+            self.__build_cache()
+            return True
+
+    def check_reload(self) -> bool:
+        '''文件被外部修改时重新加载 (内存中有未保存的改动时暂不加载)
+        return: 已重新加载
+        '''
+        file_stat = self.__get_file_stat()
+        with self.__lock:
+            if file_stat is None or file_stat == self.__file_stat or self.__has_changed:
+                return False
+        return self.reload()
+
+    def __get_file_stat(self) -> tuple[int]:
+        '''文件 (修改时间, 大小), 不存在为 None
+        '''
+        try:
+            stat = os.stat(self.__ini_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def __build_cache(self) -> None:
+        '''建立键值缓存 (需持有解析器访问锁)
+        '''
+        self.__value_dict = {(section, key): value for section in self.__cfg_parser.sections() for key, value in self.__cfg_parser.items(section)}
+        self.__typed_dict.clear()
+
+    def save(self) -> None:
+        '''保存配置 (同步写入)
+        '''
+        with self.__write_lock:
+            with self.__lock:
+                if not self.__has_changed:
+                    return None
+                self.__has_changed = False
+                text = self.__dump()
+            try:
+                self.__write_file(text)
+            except OSError:
+                with self.__lock:
+                    self.__has_changed = True# 下次重试
+                raise
+
+    def close(self) -> None:
+        '''同步保存并停止后台写入
+        '''
+        with self.__lock:
+            self.__closed = True
+            self.__condition.notify()
+        if self.__worker and self.__worker is not threading.current_thread():
+            self.__worker.join()
+        self.save()
+
+    def __dump(self) -> str:
+        '''配置内容 (需持有解析器访问锁)
+        '''
+        buffer = StringIO()
+        self.__cfg_parser.write(buffer)
+        return buffer.getvalue()
+
+    def __write_file(self, text: str) -> None:
+        '''原子写入文件 (写入同目录临时文件后替换, 保持原文件的权限)
+        '''
+        dir_path, file_name = os.path.split(self.__ini_path)
+        fd, temp_path = tempfile.mkstemp(prefix=file_name + '.', suffix='.tmp', dir=dir_path)
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                fp.write(text)
+                fp.flush()
+                os.fsync(fp.fileno())
+            try:
+                mode = os.stat(self.__ini_path).st_mode & 0o7777
+            except OSError:# 文件不存在
+                mode = _default_file_mode
+            os.chmod(temp_path, mode)# mkstemp 创建的文件为 0600
+            os.replace(temp_path, self.__ini_path)
+            with self.__lock:
+                self.__file_stat = self.__get_file_stat()# 自身写入不触发重新加载
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def __write_behind(self) -> None:
+        '''后台写入线程: 等待改动稳定 debounce_ms 后写入
+        '''
+        while True:
+            with self.__lock:
+                while not self.__closed:
+                    if self.__has_changed:
+                        wait_s = self.__due_time - time.monotonic()
+                        if wait_s <= 0:
+                            break
+                        self.__condition.wait(wait_s)
+                    else:
+                        self.__condition.wait()
+                if self.__closed:
+                    return None
+            try:
+                self.save()
+            except OSError:# 保留改动, 等待下次写配置或关闭时重试
+                with self.__lock:
+                    self.__due_time = time.monotonic() + self.__debounce_s
 
     def __create_section(self, section: str) -> None:
         '''创建节
@@ -141,18 +357,66 @@ class IniConfig(object):
         key: 键
         value: 键值
         '''
-        self.__has_changed = True
-        self.__create_section(section)
-        self.__cfg_parser.set(section, key, value)
-
-    def __has_key(self, section: str, key: str) -> bool:
-        '''键是否在节中
-        '''
-        return key in self.__cfg_parser.options(section)
+        with self.__lock:
+            self.__create_section(section)
+            if self.__cfg_parser.get(section, key, fallback=None) == value:# 未改动
+                return None
+            self.__cfg_parser.set(section, key, value)
+            self.__value_dict[(section, key)] = value
+            self.__typed_dict.clear()
+            self.__has_changed = True
+            if self.__worker:# 延迟写入
+                self.__due_time = time.monotonic() + self.__debounce_s
+                self.__condition.notify()
 
     def get_value(self, section: str, key: str, default: str) -> str:
         '''读配置
         '''
-        if not self.__cfg_parser.has_section(section) or not self.__has_key(section, key):
-            return default
-        return self.__cfg_parser.get(section, key)
+        return self.__value_dict.get((section, key), default)
+
+    def get_int(self, section: str, key: str, default: int, min_value: int = None, max_value: int = None) -> int:
+        '''读整数配置 (无效值使用默认, 超出范围时取边界值)
+        '''
+        return self.__get_typed(section, key, default, int, min_value, max_value)
+
+    def get_bool(self, section: str, key: str, default: bool) -> bool:
+        '''读布尔配置 (无效值使用默认)
+        '''
+        return self.__get_typed(section, key, default, bool)
+
+    def get_enum(self, section: str, key: str, default: Enum) -> Enum:
+        '''读枚举配置 (成员名不区分大小写, 或成员值; 无效值使用默认)
+        '''
+        return self.__get_typed(section, key, default, type(default))
+
+    def __get_typed(self, section: str, key: str, default, value_type: type, min_value=None, max_value=None):
+        '''读类型值 (解析结果缓存, 写配置或重新加载时清除)
+        '''
+        cache_key = (section, key, value_type, default, min_value, max_value)
+        with self.__lock:
+            if cache_key in self.__typed_dict:
+                return self.__typed_dict[cache_key]
+            text = self.__value_dict.get((section, key))
+            try:
+                value = default if text is None else self.__parse(text.strip(), value_type)
+            except (ValueError, KeyError):
+                value = default
+            if min_value is not None and value < min_value:
+                value = min_value
+            if max_value is not None and value > max_value:
+                value = max_value
+            self.__typed_dict[cache_key] = value
+            return value
+
+    @staticmethod
+    def __parse(text: str, value_type: type):
+        '''字符串 转为 类型值
+        '''
+        if value_type is bool:
+            return ConfigParser.BOOLEAN_STATES[text.lower()]
+        if issubclass(value_type, Enum):
+            for name, member in value_type.__members__.items():
+                if name.lower() == text.lower():
+                    return member
+            return value_type(int(text))
+        return value_type(text)
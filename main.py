@@ -3,6 +3,8 @@
 
 """主模块
 主程序入口
+--profile-startup: 统计启动耗时 (导入、配置、setupUi、首帧绘制), 首帧绘制完成后输出报告并退出
+Qt 及游戏模块在解析参数后导入, 以便计入启动耗时
 """
 
 
@@ -13,18 +15,45 @@ __author__ = 'lihua.tan'
 
 # python库
 import sys
-# Qt标准库
-from PySide6.QtWidgets import (QApplication, QStyleFactory)
+import argparse
 # 自封装库
-from tetris_game import TetrisGame
+from tetris_startup import StartupProfiler# 启动耗时统计
 
 # 主程序入口
 if __name__ == '__main__':
+    # 参数
+    parser = argparse.ArgumentParser(description='俄罗斯方块')
+    parser.add_argument('--replay', default='', help='回放的录像文件')
+    parser.add_argument('--seek', type=int, default=0, help='回放自此部件数开始')
+    parser.add_argument('--profile-startup', action='store_true', help='统计启动耗时, 首帧绘制后输出报告并退出')
+    parser.add_argument('--profile-json', default='', help='启动耗时报告另存为 JSON 文件')
+    args, qt_argv = parser.parse_known_args()
+    if args.profile_startup:
+        def on_startup_finish(report: str) -> None:
+            '''输出启动耗时报告并退出
+            '''
+            print(report)
+            if args.profile_json:
+                import json
+                with open(args.profile_json, 'w', encoding='utf-8') as fp:
+                    json.dump(dict(StartupProfiler.get_phases()), fp, indent=2)
+            QApplication.quit()
+        StartupProfiler.start(on_startup_finish)
+    # Qt标准库
+    from PySide6.QtWidgets import (QApplication, QStyleFactory)
+    StartupProfiler.mark('import_qt')
+    # 自封装库
+    from tetris_game import TetrisGame
+    StartupProfiler.mark('import_game')
     # 应用程序对象
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1] + qt_argv)
     app.setStyle(QStyleFactory.create("Fusion")) # 以Fusion风格运行
-    # 对话框对象
+    StartupProfiler.mark('qapplication')
+    # 对话框对象 (构造中记录 config / setup_ui / game_init)
     tetris_game = TetrisGame()
     tetris_game.show()
+    StartupProfiler.mark('show')
+    if args.replay:
+        tetris_game.play_replay(args.replay, args.seek)# 回放录像
     # 执行应用程序
     sys.exit(app.exec())
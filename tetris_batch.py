@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 批量模拟
+以 NumPy 数组同时保存 N 个面板, 每一步对全部面板并行执行一组部件变换
+面板每行以整数位图表示 (第 col 位为 1 表示占用), 碰撞、放置、消除均为数组运算
+另外逐列记录高度 (与 TetrisMatrix 相同), 落至底部的行数由部件底部轮廓一次算出, 无需逐行探测
+place(orientation, dx) 每次放置一个部件 (转向、平移后直接落至底部), 适合以放置为动作的训练
+形状几何取自 ShapeTable, 计分规则与 TetrisData 一致
+"""
+
+
+# 模块信息
+__all__ = ['TetrisBatch']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import numpy as np
+# 自封装库
+from tetris_piece import (Shape, ShapeTable)# 游戏部件
+from tetris_engine import (TransferOption, TetrisData)# 游戏规则
+
+
+# 批量模拟
+class TetrisBatch(object):
+    '''批量模拟
+    N 个面板同步推进, 只支持旋转 (不含镜像) 的 4 种朝向, 与游戏操作一致
+    形状几何表以 形状 * 4 + 朝向 为索引, 面板、列高度按一维索引读写;
+    部件的 4 行 (列) 逐个偏移计算, 均为一维数组运算 (比 (N, 4) 数组的广播、归约快)
+    '''
+    __no_square = 1 << 30# 轮廓表中部件不占用的列
+
+    def __init__(self, batch_size: int, row_count=24, col_count=10, data: TetrisData = None, seed=None) -> None:
+        '''构造
+        batch_size: 面板数
+        row_count, col_count: 面板大小 (col_count 不超过 62)
+        data: 提供初始等级等配置的游戏数据 (默认新建)
+        seed: 随机种子 (None 为不固定)
+        '''
+        if col_count > 62:
+            raise ValueError
+        self.__batch_size = batch_size# 面板数
+        self.__row_count = row_count# 行方块数
+        self.__col_count = col_count# 列方块数
+        self.__center_col = col_count // 2# 部件原点所在列
+        self.__full_row_mask = (1 << col_count) - 1# 整行占用位图
+        self.__data = data if data else TetrisData()# 配置
+        self.__random = np.random.default_rng(seed)# 随机数
+        self.__init_shape_table()
+        # 面板 (顶部、右侧多留 4 行、4 列, 放置、更新列高度时无需截取边界)
+        self.__board_stride = row_count + 4
+        self.__board = np.zeros((batch_size, self.__board_stride), dtype=np.int64)# 行占用位图
+        self.__board_flat = self.__board.reshape(-1)# 一维视图
+        self.__height_stride = col_count + 4
+        self.__height = np.zeros((batch_size, self.__height_stride), dtype=np.int64)# 列高度 (最高占用行 + 1)
+        self.__height_flat = self.__height.reshape(-1)# 一维视图
+        self.__height_weights = np.arange(1, row_count + 1)[:, None]# 行 -> 该行占用时的列高度
+        self.__col_bits = np.arange(col_count)# 列位
+        self.__index = np.arange(batch_size)# 面板索引
+        # 部件
+        self.__shape = np.zeros(batch_size, dtype=np.int64)# 当前部件形状
+        self.__orientation = np.zeros(batch_size, dtype=np.int64)# 当前部件朝向
+        self.__dx = np.zeros(batch_size, dtype=np.int64)# 当前部件平移
+        self.__dy = np.zeros(batch_size, dtype=np.int64)
+        self.__next_shape = np.zeros(batch_size, dtype=np.int64)# 下一部件形状
+        # 数据
+        self.__alive = np.zeros(batch_size, dtype=bool)# 运行中
+        self.__score = np.zeros(batch_size, dtype=np.int64)# 分数
+        self.__level = np.zeros(batch_size, dtype=np.int64)# 等级
+        self.__lines_removed = np.zeros(batch_size, dtype=np.int64)# 累计移除行数
+        self.__pieces_dropped = np.zeros(batch_size, dtype=np.int64)# 累计下落部件
+        self.reset()
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[batch: {self.__batch_size} x ({self.__row_count} x {self.__col_count}), alive: {int(self.__alive.sum())}]'
+
+    def __init_shape_table(self) -> None:
+        '''形状几何表 [形状 * 4 + 朝向]
+        '''
+        state_count = (Shape._ValidEnd + 1) * 4
+        self.__left_table = np.zeros(state_count, dtype=np.int64)# 最左侧 x
+        self.__right_table = np.zeros(state_count, dtype=np.int64)# 最右侧 x
+        self.__bottom_table = np.zeros(state_count, dtype=np.int64)# 最底部 y
+        self.__top_table = np.zeros(state_count, dtype=np.int64)# 最顶部 y
+        self.__mask_table = np.zeros((4, state_count), dtype=np.int64)# 行掩码 [自最底部行起的偏移]
+        self.__bottom_profile_table = np.full((4, state_count), self.__no_square, dtype=np.int64)# 各列最底部方块 y, 相对最底部 y [自最左侧列起的偏移]
+        self.__top_profile_table = np.full((4, state_count), -self.__no_square, dtype=np.int64)# 各列最顶部方块 y + 1 (同上)
+        for shape in range(Shape._ValidStart, Shape._ValidEnd + 1):
+            for orientation in range(4):
+                index = shape * 4 + orientation
+                state = ShapeTable.get_state(shape, orientation)
+                self.__left_table[index] = state.left_x
+                self.__right_table[index] = state.right_x
+                self.__bottom_table[index] = state.bottom_y
+                self.__top_table[index] = state.top_y
+                for y, mask in state.row_masks:
+                    self.__mask_table[y - state.bottom_y, index] = mask
+                for x, y in state.bottom_profile:
+                    self.__bottom_profile_table[x - state.left_x, index] = y - state.bottom_y
+                for x, y in state.points:
+                    top_y = self.__top_profile_table[x - state.left_x, index]
+                    self.__top_profile_table[x - state.left_x, index] = max(top_y, y - state.bottom_y + 1)
+
+    def get_batch_size(self) -> int:
+        '''面板数
+        '''
+        return self.__batch_size
+
+    def get_board(self) -> np.ndarray:
+        '''面板行占用位图 (batch_size, row_count), 最下方为 row 0
+        '''
+        return self.__board[:, :self.__row_count]
+
+    def get_col_height(self) -> np.ndarray:
+        '''列高度 (batch_size, col_count), 空列为 0
+        '''
+        return self.__height[:, :self.__col_count]
+
+    def get_alive(self) -> np.ndarray:
+        '''运行中的面板
+        '''
+        return self.__alive
+
+    def get_shape(self) -> np.ndarray:
+        '''当前部件形状
+        '''
+        return self.__shape
+
+    def get_next_shape(self) -> np.ndarray:
+        '''下一部件形状
+        '''
+        return self.__next_shape
+
+    def get_score(self) -> np.ndarray:
+        '''分数
+        '''
+        return self.__score
+
+    def get_level(self) -> np.ndarray:
+        '''等级
+        '''
+        return self.__level
+
+    def get_lines_removed(self) -> np.ndarray:
+        '''累计移除行数
+        '''
+        return self.__lines_removed
+
+    def get_pieces_dropped(self) -> np.ndarray:
+        '''累计下落部件
+        '''
+        return self.__pieces_dropped
+
+    def reset(self, select: np.ndarray = None) -> None:
+        '''重置面板并开始新游戏
+        select: 要重置的面板 (bool 数组, None 为全部)
+        '''
+        if select is None:
+            select = np.ones(self.__batch_size, dtype=bool)
+        self.__board[select] = 0
+        self.__height[select] = 0
+        self.__score[select] = 0
+        self.__level[select] = self.__data.get_start_level()
+        self.__lines_removed[select] = 0
+        self.__pieces_dropped[select] = 0
+        self.__next_shape[select] = self.__random_shapes(int(select.sum()))
+        self.__alive[select] = True
+        self.__get_new_piece(np.flatnonzero(select))
+
+    def __random_shapes(self, count: int) -> np.ndarray:
+        '''随机形状
+        '''
+        return self.__random.integers(Shape._ValidStart, Shape._ValidEnd + 1, count)
+
+    def is_setable(self, shape: np.ndarray, orientation: np.ndarray, dx: np.ndarray, dy: np.ndarray, index: np.ndarray = None) -> np.ndarray:
+        '''是否可放置指定状态的部件
+        shape, orientation, dx, dy: 部件状态
+        index: 对应的面板索引 (None 为全部面板)
+        '''
+        if index is None:
+            index = self.__index
+        return self.__is_state_setable(shape * 4 + orientation, dx, dy, index)
+
+    def __is_state_setable(self, state: np.ndarray, dx: np.ndarray, dy: np.ndarray, index: np.ndarray) -> np.ndarray:
+        '''是否可放置指定状态的部件
+        state: 形状 * 4 + 朝向
+        '''
+        # 列越界
+        left_col = self.__left_table[state] + dx + self.__center_col
+        result = (left_col >= 0) & (self.__right_table[state] + dx + self.__center_col < self.__col_count)
+        # 行越界
+        bottom_row = self.__bottom_table[state] + dy + self.__row_count
+        result &= (bottom_row >= 0) & (self.__top_table[state] + dy < 0)
+        # 占用 (越界的部件已判定, 只需保证索引有效)
+        row_index = index * self.__board_stride + np.minimum(np.maximum(bottom_row, 0), self.__row_count)
+        left_col = np.minimum(np.maximum(left_col, 0), self.__col_count)
+        for offset, mask_table in enumerate(self.__mask_table):
+            result &= (self.__board_flat[row_index + offset] & (mask_table[state] << left_col)) == 0
+        return result
+
+    def __get_new_piece(self, index: np.ndarray) -> None:
+        '''更新部件, 无法放置的面板结束运行
+        index: 要更新部件的面板索引
+        '''
+        shape = self.__next_shape[index]
+        self.__shape[index] = shape
+        self.__orientation[index] = 0
+        self.__dx[index] = 0
+        dy = -(1 + self.__top_table[shape * 4])# 确保整个进入
+        self.__dy[index] = dy
+        self.__next_shape[index] = self.__random_shapes(len(index))
+        self.__alive[index] &= self.__is_state_setable(shape * 4, 0, dy, index)
+
+    def __get_drop_rows(self, index: np.ndarray) -> np.ndarray:
+        '''可下落行数
+        部件各列最底部方块均在列高度之上时, 由底部轮廓与列高度直接算出;
+        否则 (部件处于悬空方块之下) 对这些面板逐行探测
+        '''
+        state = self.__shape[index] * 4 + self.__orientation[index]
+        left_col = self.__left_table[state] + self.__dx[index] + self.__center_col
+        bottom_row = self.__bottom_table[state] + self.__dy[index] + self.__row_count
+        col_index = index * self.__height_stride + left_col
+        drop_rows = None
+        for offset, profile_table in enumerate(self.__bottom_profile_table):
+            col_rows = profile_table[state] - self.__height_flat[col_index + offset]
+            drop_rows = col_rows if drop_rows is None else np.minimum(drop_rows, col_rows)
+        drop_rows += bottom_row
+        blocked = np.flatnonzero(drop_rows < 0)
+        if len(blocked):
+            state, dx, dy, blocked_index = state[blocked], self.__dx[index[blocked]], self.__dy[index[blocked]], index[blocked]
+            blocked_rows = np.zeros(len(blocked), dtype=np.int64)
+            falling = np.ones(len(blocked), dtype=bool)
+            while falling.any():
+                falling &= self.__is_state_setable(state, dx, dy - blocked_rows - 1, blocked_index)
+                blocked_rows += falling
+            drop_rows[blocked] = blocked_rows
+        return drop_rows
+
+    def __set_piece_arrived(self, index: np.ndarray) -> np.ndarray:
+        '''部件抵达: 放置、消除整行、更新数据、更新部件
+        index: 部件抵达的面板索引
+        return: 各面板本次清除行数
+        '''
+        state = self.__shape[index] * 4 + self.__orientation[index]
+        # 放置部件 (每个面板的行、列各不相同, 可直接按索引写入)
+        left_col = self.__left_table[state] + self.__dx[index] + self.__center_col
+        bottom_row = self.__bottom_table[state] + self.__dy[index] + self.__row_count
+        row_index = index * self.__board_stride + bottom_row
+        col_index = index * self.__height_stride + left_col
+        remove_lines = np.zeros(len(index), dtype=np.int64)# 只有部件所在行可能成为整行
+        for offset in range(4):
+            row = self.__board_flat[row_index + offset] | (self.__mask_table[offset][state] << left_col)
+            self.__board_flat[row_index + offset] = row
+            remove_lines += row == self.__full_row_mask
+            height = self.__height_flat[col_index + offset]
+            self.__height_flat[col_index + offset] = np.maximum(height, bottom_row + self.__top_profile_table[offset][state])
+        # 消除整行 (保留行稳定排序到底部, 顶部补空行, 再由位图重算列高度)
+        clear = np.flatnonzero(remove_lines)
+        if len(clear):
+            clear_index = index[clear]
+            boards = self.__board[clear_index, :self.__row_count]
+            order = np.argsort(boards == self.__full_row_mask, axis=1, kind='stable')
+            boards = np.take_along_axis(boards, order, axis=1)
+            boards[np.arange(self.__row_count) >= (self.__row_count - remove_lines[clear])[:, None]] = 0
+            self.__board[clear_index, :self.__row_count] = boards
+            occupied = (boards[:, :, None] >> self.__col_bits) & 1
+            self.__height[clear_index, :self.__col_count] = (occupied * self.__height_weights).max(axis=1)
+        # 更新数据 (与 TetrisData.update 一致)
+        self.__score[index] += TetrisData._piece_score + TetrisData._line_score * remove_lines
+        pieces_dropped = self.__pieces_dropped[index] + 1
+        self.__pieces_dropped[index] = pieces_dropped
+        self.__level[index] += pieces_dropped % self.__data.get_update_level_count() == 0
+        self.__lines_removed[index] += remove_lines
+        # 更新部件
+        self.__get_new_piece(index)
+        return remove_lines
+
+    def step(self, options: np.ndarray) -> tuple[np.ndarray]:
+        '''全部面板推进一步
+        options: 各面板的部件变换 (TransferOption 数组, 已结束的面板忽略)
+        return: (变换成功, 部件抵达, 清除行数)
+        '''
+        options = np.asarray(options)
+        alive = self.__alive.copy()
+        moved = np.zeros(self.__batch_size, dtype=bool)
+        remove_lines = np.zeros(self.__batch_size, dtype=np.int64)
+        # 平移、旋转、下移一行
+        trying = np.flatnonzero(alive & (options != TransferOption._None) & (options != TransferOption.DropDown))
+        if len(trying):
+            trying_options = options[trying]
+            orientation = (self.__orientation[trying] + (trying_options == TransferOption.Rotate)) & 0b0011
+            dx = self.__dx[trying] + (trying_options == TransferOption.RightShift) - (trying_options == TransferOption.LeftShift)
+            dy = self.__dy[trying] - (trying_options == TransferOption.LineDown)
+            success = self.__is_state_setable(self.__shape[trying] * 4 + orientation, dx, dy, trying)
+            moved_index = trying[success]
+            moved[moved_index] = True
+            self.__orientation[moved_index], self.__dx[moved_index], self.__dy[moved_index] = orientation[success], dx[success], dy[success]
+        # 落至底部
+        drop = alive & (options == TransferOption.DropDown)
+        drop_index = np.flatnonzero(drop)
+        if len(drop_index):
+            self.__dy[drop_index] -= self.__get_drop_rows(drop_index)
+        # 部件抵达
+        arrived = drop | (alive & (options == TransferOption.LineDown) & ~moved)
+        arrived_index = np.flatnonzero(arrived)
+        if len(arrived_index):
+            remove_lines[arrived_index] = self.__set_piece_arrived(arrived_index)
+        return moved, arrived, remove_lines
+
+    def place(self, orientation: np.ndarray, dx: np.ndarray) -> tuple[np.ndarray]:
+        '''全部面板各放置一个部件: 当前部件转为 orientation、平移至 dx 后落至底部 (不检查移动路径)
+        orientation, dx: 各面板的目标朝向 (0~3)、平移 (已结束的面板忽略)
+        return: (已放置, 清除行数); 目标状态在当前行无法放置的面板不变
+        '''
+        orientation = np.broadcast_to(np.asarray(orientation) & 0b0011, self.__batch_size)
+        dx = np.broadcast_to(np.asarray(dx), self.__batch_size)
+        placed = np.zeros(self.__batch_size, dtype=bool)
+        remove_lines = np.zeros(self.__batch_size, dtype=np.int64)
+        index = np.flatnonzero(self.__alive)
+        orientation, dx = orientation[index], dx[index]
+        success = self.__is_state_setable(self.__shape[index] * 4 + orientation, dx, self.__dy[index], index)
+        index = index[success]
+        if len(index):
+            placed[index] = True
+            self.__orientation[index], self.__dx[index] = orientation[success], dx[success]
+            self.__dy[index] -= self.__get_drop_rows(index)
+            remove_lines[index] = self.__set_piece_arrived(index)
+        return placed, remove_lines
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 性能测试
+测量游戏热点路径的每秒操作数:
+    碰撞检测 (TetrisBoard.is_piece_setable)、不同填充程度下的消除整行 (remove_full_lines)、
+    部件变换 (TetrisPiece.transfer)、落至底部、不同面板大小的完整绘制 (paintEvent, Qt offscreen 平台)、
+    无界面整局游戏、批量模拟 (TetrisBatch.place, 每秒放置部件数)
+结果输出为 JSON, 并与保存的基准比较, 任一项低于基准超过容差即返回非 0
+
+用法:
+    python tetris_benchmark.py --json result.json                  # 与 benchmark_baseline.json 比较
+    python tetris_benchmark.py --save-baseline benchmark_baseline.json   # 更新基准
+"""
+
+
+# 模块信息
+__all__ = ['run_benchmarks', 'compare_baseline']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import os
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_piece import (Shape, TetrisPiece)# 游戏部件
+from tetris_matrix import TetrisMatrix# 面板数据
+from tetris_engine import (GameState, TetrisEngine)# 游戏规则
+from tetris_strategy import create_strategy# 自动玩家策略
+
+
+# 配置文件 (与游戏界面相同)
+_config_dir = os.path.dirname(os.path.abspath(__file__))
+_config_base_name = '俄罗斯方块配置'
+_baseline_path = os.path.join(_config_dir, 'benchmark_baseline.json')# 默认基准文件
+
+_fill_levels = (0, 25, 50, 75)# 消除整行测试的面板填充程度 (%)
+_paint_sizes = ((24, 10), (48, 20), (96, 40))# 绘制测试的面板大小 (行, 列)
+_paint_square_size = 20# 绘制测试的方块大小 (像素)
+_batch_size = 4096# 批量模拟测试的面板数
+
+
+def _measure(func, number: int, repeat: int) -> float:
+    '''测量每秒操作数 (预热一轮后重复 repeat 轮, 取最快一轮)
+    func: 无参数函数, 每次调用执行 number 次操作
+    '''
+    func()# 预热
+    best = None
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start_time
+        best = seconds if best is None else min(best, seconds)
+    return number / best if best else 0.0
+
+
+def _fill_matrix(matrix: TetrisMatrix, fill_percent: int, full_rows: int, seed: int) -> None:
+    '''随机填充面板
+    fill_percent: 填充的行数占比 (%)
+    full_rows: 其中整行占满的行数
+    '''
+    rnd = random.Random(seed)
+    col_count = matrix.get_col_count()
+    fill_rows = matrix.get_row_count() * fill_percent // 100
+    occupant_list = []
+    for row in range(fill_rows):
+        if row < full_rows:
+            occupant_list += [rnd.randint(Shape._ValidStart, Shape._ValidEnd) for _ in range(col_count)]
+        else:
+            hole = rnd.randrange(col_count)# 每行至少一个空位
+            occupant_list += [0 if col == hole or rnd.random() < 0.3 else rnd.randint(Shape._ValidStart, Shape._ValidEnd) for col in range(col_count)]
+    matrix.load_occupants(bytes(occupant_list))
+
+
+def bench_is_piece_setable(board, number: int, repeat: int) -> float:
+    '''碰撞检测
+    '''
+    _fill_matrix(board.get_matrix(), 50, 0, 1)
+    piece_list = []
+    for shape in range(Shape._ValidStart, Shape._ValidEnd + 1):
+        piece = TetrisPiece(Shape(shape))
+        for orientation in range(4):
+            for dx in range(-4, 5):
+                piece_list.append(piece.transfer(dx, -12, angle=90 * orientation))
+    piece_list = (piece_list * (number // len(piece_list) + 1))[:number]
+    is_piece_setable = board.is_piece_setable
+
+    def run() -> None:
+        for piece in piece_list:
+            is_piece_setable(piece)
+    return _measure(run, number, repeat)
+
+
+def bench_remove_full_lines(fill_percent: int, number: int, repeat: int) -> float:
+    '''消除整行 (每轮消除前恢复面板, 只计 remove_full_lines 的时间)
+    fill_percent: 面板填充程度 (%), 其中四分之一为整行
+    '''
+    matrix = TetrisMatrix()
+    _fill_matrix(matrix, fill_percent, matrix.get_row_count() * fill_percent // 400, 2)
+    occupants = matrix.dump_occupants()
+    matrix_list = [TetrisMatrix() for _ in range(number)]# 预先准备, 整批计时
+
+    def measure() -> float:
+        for matrix in matrix_list:
+            matrix.load_occupants(occupants)
+        start_time = time.perf_counter()
+        for matrix in matrix_list:
+            matrix.remove_full_lines()
+        return time.perf_counter() - start_time
+    measure()# 预热
+    return number / min(measure() for _ in range(repeat))
+
+
+def bench_transfer(number: int, repeat: int) -> float:
+    '''部件变换 (平移与旋转交替)
+    '''
+    piece = TetrisPiece(Shape._T)
+
+    def run() -> None:
+        for _ in range(number // 2):
+            piece.transfer(1, 0)
+            piece.transfer(angle=90)
+    return _measure(run, number // 2 * 2, repeat)
+
+
+def bench_hard_drop(number: int, repeat: int) -> float:
+    '''落至底部 (计算下落行数并变换)
+    '''
+    matrix = TetrisMatrix()
+    _fill_matrix(matrix, 50, 0, 3)
+    piece_list = []
+    for shape in range(Shape._ValidStart, Shape._ValidEnd + 1):
+        piece = TetrisPiece(Shape(shape))
+        for dx in range(-3, 4):
+            piece_list.append(piece.transfer(dx, -(1 + piece.get_top_y())))
+    piece_list = (piece_list * (number // len(piece_list) + 1))[:number]
+
+    def run() -> None:
+        for piece in piece_list:
+            piece.transfer(0, -matrix.get_drop_rows(piece))
+    return _measure(run, number, repeat)
+
+
+def bench_paint(row_count: int, col_count: int, number: int, repeat: int) -> float:
+    '''完整绘制面板 (repaint 同步执行 paintEvent)
+    '''
+    from PySide6.QtWidgets import QApplication
+    from tetris_board import TetrisBoard# 游戏面板
+    board = TetrisBoard(None, row_count, col_count)
+    _fill_matrix(board.get_matrix(), 50, 0, 4)
+    board.set_draw_piece(TetrisPiece(Shape._T).transfer(0, -2))
+    board.resize(col_count * _paint_square_size, row_count * _paint_square_size)
+    board.show()
+    QApplication.processEvents()# 窗口显示后 repaint 才会执行 paintEvent
+    board.repaint()# 生成背景贴图等缓存
+
+    def run() -> None:
+        for _ in range(number):
+            board.repaint()
+    result = _measure(run, number, repeat)
+    board.close()
+    return result
+
+
+def bench_games(game_count: int, max_pieces: int) -> dict:
+    '''无界面整局游戏 (随机放置策略, 固定种子)
+    '''
+    pieces = 0
+    start_time = time.perf_counter()
+    for seed in range(game_count):
+        engine = TetrisEngine(seed=seed)
+        strategy = create_strategy('drop', seed)
+        engine.start()
+        data = engine.get_data()
+        while engine.get_state() == GameState.Run and data._pieces_dropped < max_pieces:
+            engine.step(strategy.get_option(engine))
+        pieces += data._pieces_dropped
+    seconds = time.perf_counter() - start_time
+    return {'games_per_second': game_count / seconds, 'pieces_per_second': pieces / seconds}
+
+
+def bench_batch(batch_size: int, steps: int, repeat: int) -> float:
+    '''批量模拟 (随机朝向、平移放置, 结束的面板立即重开, 固定种子)
+    return: 每秒放置部件数
+    '''
+    import numpy as np
+    from tetris_batch import TetrisBatch# 批量模拟 (依赖 NumPy)
+    batch = TetrisBatch(batch_size, seed=5)
+    rnd = np.random.default_rng(6)
+    action_list = [(rnd.integers(0, 4, batch_size), rnd.integers(-4, 5, batch_size)) for _ in range(steps)]
+
+    def measure() -> float:
+        batch.reset()
+        placements = 0
+        start_time = time.perf_counter()
+        for orientation, dx in action_list:
+            placed, _ = batch.place(orientation, dx)
+            placements += int(np.count_nonzero(placed))
+            alive = batch.get_alive()
+            if not alive.all():
+                batch.reset(~alive)
+        return placements / (time.perf_counter() - start_time)
+    measure()# 预热
+    return max(measure() for _ in range(repeat))
+
+
+def run_benchmarks(scale: float = 1.0, repeat: int = 5) -> dict:
+    '''运行全部测试
+    scale: 操作次数倍率
+    return: {测试名: 每秒操作数}
+    '''
+    # Qt (offscreen 平台, 无需显示器)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    from tetris_board import TetrisBoard# 游戏面板
+    # 测试
+    count = lambda number: max(1, int(number * scale))
+    result = {}
+    result['is_piece_setable'] = bench_is_piece_setable(TetrisBoard(), count(20000), repeat)
+    for fill_percent in _fill_levels:
+        result[f'remove_full_lines_{fill_percent}'] = bench_remove_full_lines(fill_percent, count(2000), repeat)
+    result['transfer'] = bench_transfer(count(50000), repeat)
+    result['hard_drop'] = bench_hard_drop(count(20000), repeat)
+    for row_count, col_count in _paint_sizes:
+        result[f'paint_{row_count}x{col_count}'] = bench_paint(row_count, col_count, count(50), repeat)
+    games = bench_games(count(20), 200)
+    result['games'] = games['games_per_second']
+    result['game_pieces'] = games['pieces_per_second']
+    result['batch_placements'] = bench_batch(_batch_size, count(50), repeat)
+    app.processEvents()
+    return result
+
+
+def compare_baseline(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    '''与基准比较
+    tolerance: 允许的下降比例
+    return: 低于基准超过容差的测试名
+    '''
+    return [name for name, value in result.items() if name in baseline and value < baseline[name] * (1 - tolerance)]
+
+
+def main(argv: list[str] = None) -> int:
+    '''命令行入口
+    '''
+    parser = argparse.ArgumentParser(description='俄罗斯方块 性能测试')
+    parser.add_argument('--json', default='', help='结果输出的 JSON 文件路径')
+    parser.add_argument('--baseline', default=_baseline_path, help='比较的基准文件 (不存在则不比较)')
+    parser.add_argument('--save-baseline', default='', help='将结果保存为基准文件')
+    parser.add_argument('--tolerance', type=float, default=0.3, help='允许低于基准的比例')
+    parser.add_argument('--scale', type=float, default=1.0, help='操作次数倍率')
+    parser.add_argument('--repeat', type=int, default=5, help='每项重复轮数 (取最快)')
+    args = parser.parse_args(argv)
+    GlobalConfig.load_file(_config_dir, _config_base_name)
+    # 测试
+    result = run_benchmarks(args.scale, args.repeat)
+    output = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': result,
+    }
+    # 比较
+    baseline = {}
+    if args.baseline and os.path.isfile(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as fp:
+            baseline = json.load(fp)['results']
+    regression_list = compare_baseline(result, baseline, args.tolerance)
+    output['regressions'] = regression_list
+    # 输出
+    print(f'{"benchmark":<24}{"ops/s":>14}{"baseline":>14}{"change":>10}')
+    for name, value in result.items():
+        line = f'{name:<24}{value:>14.1f}'
+        if name in baseline:
+            line += f'{baseline[name]:>14.1f}{(value / baseline[name] - 1) * 100:>9.1f}%'
+            if name in regression_list:
+                line += '  REGRESSION'
+        print(line)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump(output, fp, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as fp:
+            json.dump(output, fp, ensure_ascii=False, indent=2)
+    if regression_list:
+        print(f'FAILED: {len(regression_list)} benchmark(s) more than {args.tolerance:.0%} below baseline: {", ".join(regression_list)}', file=sys.stderr)
+        return 1
+    return 0
+
+
+# 主程序入口
+if __name__ == '__main__':
+    sys.exit(main())
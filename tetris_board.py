@@ -5,6 +5,14 @@
 显示部件状态以及累积情况的二维平面
 由 row_count * col_count 个方块组成
 最下方为 row 0
+面板数据保存在 TetrisMatrix 中 (可与游戏引擎共用), 本控件只负责显示
+只刷新发生变化的方块区域 (部件移动前后的方块、消除后下移的行), 绘制时只处理刷新区域内的方块
+边框和内框线只在大小改变时绘制为背景贴图, 每次绘制时先贴背景再绘制方块
+方块按颜色分组批量绘制 (BoardSquare.draw_squares), 每帧的画笔/画刷切换次数与颜色数相关, 与方块数无关
+设置帧耗时统计 (FrameProfiler) 后记录每次绘制的耗时, 并在左上角叠加显示统计结果
+设置绘制调度 (FrameScheduler) 后刷新请求由调度器合并, 每帧最多提交一次
+方块大小、背景贴图只在面板大小改变时重新计算
+大面板模式 (set_image_mode) 下每个方块为图像的一个像素 (BoardImage, tetris_board_image.py), 以一次 drawImage 缩放绘制, 不绘制内框线
 """
 
 
@@ -15,15 +23,17 @@ __author__ = 'lihua.tan'
 
 
 # python库
-import copy
+import math
+import time
 from typing import override
 # Qt标准库
-from PySide6.QtCore import (Qt, QPoint)
-from PySide6.QtGui import (QPainter, QColor, QPen)
+from PySide6.QtCore import (Qt, QPoint, QRect, QRectF)
+from PySide6.QtGui import (QPainter, QColor, QPen, QRegion, QPixmap)
 from PySide6.QtWidgets import (QFrame)
 # 自封装
 from tetris_square import (BoardSquare, PieceSquare)# 游戏方块
-from tetris_piece import (Shape, TetrisPiece)# 游戏部件
+from tetris_piece import (Shape, ShapeTable, TetrisPiece)# 游戏部件
+from tetris_matrix import TetrisMatrix# 面板数据
 
 
 # 游戏面板
@@ -38,10 +48,14 @@ class TetrisBoard(QFrame):
         """
         super().__init__(parent)# 访问父类的方法和属性
         self.__init_ui()# 界面
-        self.__row_count = row_count# 行方块数
-        self.__col_count = col_count# 列方块数
-        self.__square_table = [[BoardSquare() for _ in range(self.__col_count)] for _ in range(self.__row_count)]# 方块表
+        self.__matrix = TetrisMatrix(row_count, col_count)# 面板数据
         self.__draw_piece = None# 临时绘制部件
+        self.__draw_cell_list = []# 临时绘制部件所在方块 [(row, col), ...]
+        self.__grid_pixmap = None# 背景贴图 (边框、内框线)
+        self.__grid_key = None# 背景贴图对应的 (宽, 高, 行数, 列数, 设备像素比)
+        self.__profiler = None# 帧耗时统计 (None 为不统计)
+        self.__scheduler = None# 绘制调度 (None 为直接刷新)
+        self.__board_image = None# 大面板图像 (None 为逐个绘制方块)
 
     def __init_ui(self) -> None:
         """界面
@@ -52,127 +66,233 @@ class TetrisBoard(QFrame):
     def __repr__(self) -> str:
         '''实例化对象的输出信息
         '''
-        return f'[board: {self.__row_count} x {self.__col_count}]'
+        return f'[board: {self.get_row_count()} x {self.get_col_count()}]'
+
+    def set_matrix(self, matrix: TetrisMatrix) -> None:
+        """设置显示的面板数据 (如 游戏引擎的面板)
+        """
+        self.__matrix = matrix
+        self.request_update()
+
+    def get_matrix(self) -> TetrisMatrix:
+        """面板数据
+        """
+        return self.__matrix
+
+    def set_profiler(self, profiler) -> None:
+        '''设置帧耗时统计 (None 为不统计)
+        '''
+        self.__profiler = profiler
+        self.request_update()
+
+    def update_overlay(self) -> None:
+        '''刷新耗时统计的叠加显示
+        '''
+        if self.__profiler:
+            self.request_update(self.__profiler.get_overlay_rect())
+
+    def set_scheduler(self, scheduler) -> None:
+        '''设置绘制调度 (None 为直接刷新)
+        '''
+        self.__scheduler = scheduler
+
+    def request_update(self, area: QRect | QRegion = None) -> None:
+        '''请求刷新 (有绘制调度时合并到下一帧)
+        area: 刷新区域 (None 为整个面板)
+        '''
+        if self.__scheduler:
+            self.__scheduler.mark_dirty(self, area)
+        elif area is None:
+            self.update()
+        else:
+            self.update(area)
+
+    def set_image_mode(self, enable: bool) -> None:
+        '''大面板模式 开启/关闭 (开启时方块颜色保存在图像中, 整体缩放绘制)
+        '''
+        if enable == self.is_image_mode():
+            return None
+        if enable:
+            from tetris_board_image import BoardImage# 大面板图像 (首次开启时导入 NumPy)
+            self.__board_image = BoardImage(self.get_row_count(), self.get_col_count())
+        else:
+            self.__board_image = None
+        self.__grid_key = None# 重新生成背景贴图
+        self.adjust_square_size()
+
+    def is_image_mode(self) -> bool:
+        '''大面板模式
+        '''
+        return self.__board_image is not None
 
     def reset(self, row_count: int, col_count: int) -> None:
         """设置面板大小
         row_count: 行方块数
         col_count: 列方块数
         """
-        # 大小
-        self.__row_count = row_count# 行方块数
-        self.__col_count = col_count# 列方块数
-        # 方块表
-        if self.__square_table:
-            self.__square_table.clear()
-        self.__square_table = [[BoardSquare() for _ in range(self.__col_count)] for _ in range(self.__row_count)]
+        self.__matrix.reset(row_count, col_count)
+        self.adjust_square_size()
 
     def get_row_count(self) -> int:
         """行方块数
         """
-        return self.__row_count
+        return self.__matrix.get_row_count()
 
     def get_col_count(self) -> int:
         """列方块数
         """
-        return self.__col_count
+        return self.__matrix.get_col_count()
 
     def get_square(self, row: int, col: int) -> BoardSquare:
-        """方块对象
+        """方块对象 (面板数据的快照)
         """
-        return self.__square_table[row][col]
+        square = BoardSquare()
+        occupant = self.__matrix.get_occupant(row, col)
+        if occupant:
+            square.set_to_occupied(occupant, ShapeTable.get_color(occupant))
+        return square
+
+    def get_row_mask(self, row: int) -> int:
+        """行占用位图
+        """
+        return self.__matrix.get_row_mask(row)
 
     def clear_all(self) -> None:
         """清空面板
         """
-        for row in range(self.__row_count):
-            for col in range(self.__col_count):
-                self.get_square(row, col).release_to_free()
+        self.__matrix.clear_all()
 
     def convert_piece_pos(self, piece_square: PieceSquare) -> list[int]:
         '''部件坐标 转为 面板坐标
         '''
-        row = piece_square._y + self.__row_count
-        col = piece_square._x + (self.__col_count // 2)
-        return [row, col]
+        return self.__matrix.convert_piece_pos(piece_square)
     
     def is_valid_pos(self, row: int, col: int) -> bool:
         '''有效坐标
         '''
-        return not ((row < 0 or row >= self.__row_count) or (col < 0 or col >= self.__col_count))
+        return self.__matrix.is_valid_pos(row, col)
 
-    def is_piece_setable(self, piece: TetrisPiece) -> bool:
+    def is_piece_setable(self, piece: TetrisPiece, dx: int = 0, dy: int = 0) -> bool:
         """是否可放置部件到面板
         piece: 放置部件
+        dx, dy: 在部件当前位置基础上的平移
+        """
+        return self.__matrix.is_piece_setable(piece, dx, dy)
+
+    def is_state_setable(self, shape: Shape, orientation: int, dx: int, dy: int) -> bool:
+        """是否可放置指定状态的部件到面板
+        """
+        return self.__matrix.is_state_setable(shape, orientation, dx, dy)
+    
+    def get_drop_rows(self, piece: TetrisPiece) -> int:
+        """部件可下落的行数 (落至底部)
         """
-        if piece.get_shape() == Shape._None:
-            raise ValueError
-        for piece_square in piece.get_squares():
-            # 目标位置
-            row, col = self.convert_piece_pos(piece_square)
-            # 检查越界
-            if not self.is_valid_pos(row, col):
-                return False
-            # 检查占用
-            if not self.get_square(row, col).is_free():
-                return False
-        return True
+        return self.__matrix.get_drop_rows(piece)
     
     def is_all_occupied(self, row: int) -> bool:
         '''整行被占用
         '''
-        return not any(self.get_square(row, col).is_free() for col in range(self.__col_count))
+        return self.__matrix.is_all_occupied(row)
     
     def is_all_free(self, row: int) -> bool:
         '''整行空闲
         '''
-        return all(self.get_square(row, col).is_free() for col in range(self.__col_count))
+        return self.__matrix.is_all_free(row)
 
     def set_occupy_piece(self, piece: TetrisPiece) -> None:
         """放置部件到面板 (标记占用)
         piece: 放置部件
         """
-        if piece.get_shape() == Shape._None:
-            raise ValueError
-        for piece_square in piece.get_squares():
-            row, col = self.convert_piece_pos(piece_square)# 目标位置
-            self.get_square(row, col).set_to_occupied(int(piece.get_shape()), piece.get_color())
+        self.__matrix.set_occupy_piece(piece)
 
-    def remove_full_lines(self) -> int:
+    def remove_full_lines(self) -> list[int]:
         '''清除面板中的所有完整行
-        return: 本次清除行数
-        '''
-        # 取首个占用行
-        valid_top_row = self.__row_count - 1
-        while valid_top_row >= 0 and self.is_all_free(valid_top_row):
-            valid_top_row -= 1
-        # 从顶部往底部遍历
-        remove_count = 0
-        for curr_row in range(valid_top_row, -1, -1):
-            # 无空闲方块则为完整行
-            if self.is_all_occupied(curr_row):
-                # 取上行方块
-                for row in range(curr_row, valid_top_row, 1):
-                    self.__square_table[row] = copy.deepcopy(self.__square_table[row + 1])
-                # 清最上行
-                for col in range(self.__col_count):
-                    self.get_square(valid_top_row, col).release_to_free()
-                # 移除行数
-                remove_count += 1
-                valid_top_row -= 1
-                self.update()
-        return remove_count
+        return: 本次清除的行索引列表
+        '''
+        removed_rows = self.__matrix.remove_full_lines()
+        if removed_rows:
+            self.update_rows(removed_rows[0])
+        return removed_rows
 
     def set_draw_piece(self, piece: TetrisPiece):
-        '''设置临时绘制部件
+        '''设置临时绘制部件 (刷新部件前后所在的方块)
         piece: 还在操作, 没有放置到面板上, 但需要绘制的部件 (即 当前操作部件)
         '''
         self.__draw_piece = piece
+        # 部件所在方块
+        old_cell_list = self.__draw_cell_list
+        if piece and piece.get_shape() != Shape._None:
+            row_count, center_col = self.get_row_count(), self.get_col_count() // 2
+            self.__draw_cell_list = [(y + row_count, x + center_col) for x, y in piece.get_points()]
+        else:
+            self.__draw_cell_list = []
+        # 刷新
+        self.update_cells(old_cell_list + self.__draw_cell_list)
+
+    def get_square_rect(self, board_row: int, board_col: int) -> QRect:
+        '''方块区域 (含边框, 向外取整)
+        '''
+        top, left = self.get_square_top_left(board_row, board_col)
+        return QRect(math.floor(left), math.floor(top), math.ceil(BoardSquare.get_width()) + 1, math.ceil(BoardSquare.get_height()) + 1)
+
+    def update_cells(self, cell_list: list[tuple[int]]) -> None:
+        '''刷新指定方块
+        cell_list: [(row, col), ...]
+        '''
+        region = QRegion()
+        for row, col in cell_list:
+            if self.is_valid_pos(row, col):
+                region += self.get_square_rect(row, col)
+        if not region.isEmpty():
+            self.request_update(region)
+
+    def update_rows(self, start_row: int, end_row: int = -1) -> None:
+        '''刷新指定行 (默认至顶部)
+        '''
+        if end_row < 0:
+            end_row = self.get_row_count() - 1
+        top = self.get_square_rect(end_row, 0).top()
+        bottom = self.get_square_rect(start_row, 0).bottom()
+        self.request_update(QRect(0, top, self.width(), bottom - top + 1))# 方块可能覆盖边框, 按整个宽度刷新
+
+    def get_cell_range(self, rect: QRect) -> list[int]:
+        '''区域覆盖的方块范围
+        return: [起始行, 结束行, 起始列, 结束列] (含结束值)
+        '''
+        board_rect = self.contentsRect()
+        square_width, square_height = BoardSquare.get_width(), BoardSquare.get_height()
+        start_row = max(0, int((board_rect.bottom() - rect.bottom()) // square_height) - 1)
+        end_row = min(self.get_row_count() - 1, int((board_rect.bottom() - rect.top()) // square_height) + 1)
+        start_col = max(0, int((rect.left() - board_rect.left()) // square_width) - 1)
+        end_col = min(self.get_col_count() - 1, int((rect.right() - board_rect.left()) // square_width) + 1)
+        return [start_row, end_row, start_col, end_col]
 
     def adjust_square_size(self) -> None:
-        '''根据面板大小调整方块大小
+        '''根据面板大小调整方块大小 (大小改变时重新生成背景贴图, 并刷新整个面板)
         '''
-        BoardSquare.resize(self.width() / self.__col_count, self.height() / self.__row_count)
+        BoardSquare.resize(self.width() / self.get_col_count(), self.height() / self.get_row_count())
+        if self.__board_image and self.__board_image.get_size() != (self.get_row_count(), self.get_col_count()):
+            from tetris_board_image import BoardImage# 大面板图像
+            self.__board_image = BoardImage(self.get_row_count(), self.get_col_count())
+            self.__grid_key = None
+        grid_key = (self.width(), self.height(), self.get_row_count(), self.get_col_count(), self.devicePixelRatioF())
+        if grid_key != self.__grid_key:
+            self.__grid_key = grid_key
+            self.__grid_pixmap = self.create_grid_pixmap()
+            self.update()
+
+    def create_grid_pixmap(self) -> QPixmap:
+        '''生成背景贴图 (边框、内框线)
+        '''
+        pixel_ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(round(self.width() * pixel_ratio), round(self.height() * pixel_ratio))
+        pixmap.setDevicePixelRatio(pixel_ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        with QPainter(pixmap) as painter:
+            self.drawFrame(painter)# 边框
+            if not self.__board_image:# 大面板不绘制内框线
+                self.draw_grid(painter)# 内框线
+        return pixmap
 
     def get_square_top_left(self, board_row: int, board_col: int) -> list[int]:
         '''绘制方块
@@ -185,8 +305,8 @@ class TetrisBoard(QFrame):
         left = board_rect.left() + board_col * BoardSquare.get_width()
         return [top, left]
 
-    def draw_board(self, painter: QPainter) -> None:
-        '''绘制面板
+    def draw_grid(self, painter: QPainter) -> None:
+        '''绘制内框线
         '''
         # 画笔
         pen = QPen(Qt.PenStyle.DotLine)# 虚线
@@ -194,30 +314,81 @@ class TetrisBoard(QFrame):
         painter.setPen(pen)
         # 绘制内框线
         board_rect = self.contentsRect()
-        for row in range(0, self.__row_count - 1):# 横线
+        for row in range(0, self.get_row_count() - 1):# 横线
             top = self.get_square_top_left(row, 0)[0]
             painter.drawLine(board_rect.left(), top, board_rect.right(), top)
-        for col in range(1, self.__col_count):# 竖线
+        for col in range(1, self.get_col_count()):# 竖线
             left = self.get_square_top_left(0, col)[1]
             painter.drawLine(left, board_rect.top(), left, board_rect.bottom())
-        # 绘制面板累积情况
-        for row in range(self.__row_count):
-            for col in range(self.__col_count):
-                if not self.get_square(row, col).is_free():
-                    BoardSquare.draw(painter, *self.get_square_top_left(row, col), QColor(self.get_square(row, col).get_color()))
+
+    def get_board_rectf(self) -> QRectF:
+        '''全部方块所在区域
+        '''
+        board_rect = self.contentsRect()
+        board_width = self.get_col_count() * BoardSquare.get_width()
+        board_height = self.get_row_count() * BoardSquare.get_height()
+        return QRectF(board_rect.left(), board_rect.bottom() - board_height, board_width, board_height)
+
+    def draw_board(self, painter: QPainter, rect: QRect = None) -> None:
+        '''绘制面板累积情况
+        rect: 需要绘制的区域 (None 为整个面板)
+        '''
+        start_row, end_row, start_col, end_col = self.get_cell_range(rect if rect else self.contentsRect())
+        # 大面板: 同步刷新的行后整体缩放绘制
+        if self.__board_image:
+            self.__board_image.update_rows(self.__matrix, start_row, end_row)
+            self.__board_image.draw(painter, self.get_board_rectf(), start_row, end_row, start_col, end_col)
+            return None
+        # 按占用者 (颜色) 分组, 每种颜色批量绘制
+        cell_dict = {}# 占用者 -> [(top, left), ...]
+        board_rect = self.contentsRect()
+        square_width, square_height = BoardSquare.get_width(), BoardSquare.get_height()
+        col_range = range(start_col, end_col + 1)
+        for row in range(start_row, end_row + 1):
+            row_mask = self.__matrix.get_row_mask(row)
+            if not row_mask:
+                continue
+            occupant_row = self.__matrix.get_occupant_row(row)
+            top = board_rect.bottom() - (row + 1) * square_height# 同 get_square_top_left
+            for col in col_range:
+                if row_mask >> col & 1:
+                    cell_dict.setdefault(occupant_row[col], []).append((top, board_rect.left() + col * square_width))
+        for occupant, top_left_list in cell_dict.items():
+            BoardSquare.draw_squares(painter, QColor(ShapeTable.get_color(occupant)), top_left_list)
+
+    @override# 重写
+    def resizeEvent(self, event) -> None:
+        """大小改变事件 (调整方块大小)
+        """
+        super().resizeEvent(event)
+        self.adjust_square_size()
 
     @override# 重写
     def paintEvent(self, event) -> None:
-        """绘制事件
+        """绘制事件 (只绘制刷新区域)
         """
-        super(TetrisBoard, self).paintEvent(event)
+        start_ns = time.perf_counter_ns()
         with QPainter(self) as painter:
-            # 根据面板大小调整方块大小
-            self.adjust_square_size()
+            # 设备像素比改变 (如 窗口移到其他屏幕) 时重新生成背景贴图
+            if not self.__grid_pixmap or self.__grid_pixmap.devicePixelRatio() != self.devicePixelRatioF():
+                self.adjust_square_size()
+            # 背景 (边框、内框线)
+            painter.drawPixmap(0, 0, self.__grid_pixmap)
             # 绘制当前操作部件
             if self.__draw_piece and self.__draw_piece.get_shape() != Shape._None:
-                for piece_square in self.__draw_piece.get_squares():
-                    top, left = self.get_square_top_left(*self.convert_piece_pos(piece_square))
-                    BoardSquare.draw(painter, top, left, QColor(piece_square.get_color()))
+                color = QColor(self.__draw_piece.get_color())
+                update_rect = event.rect()
+                top_left_list = [self.get_square_top_left(row, col) for row, col in self.__draw_cell_list
+                                 if update_rect.intersects(self.get_square_rect(row, col))]
+                if self.__board_image:# 大面板方块过小, 只填充颜色
+                    for top, left in top_left_list:
+                        painter.fillRect(QRectF(left, top, BoardSquare.get_width(), BoardSquare.get_height()), color)
+                elif top_left_list:
+                    BoardSquare.draw_squares(painter, color, top_left_list)
             # 绘制面板
-            self.draw_board(painter)
+            self.draw_board(painter, event.rect())
+            # 耗时统计 (叠加显示不计入)
+            if self.__profiler:
+                self.__profiler.add_sample(self.__profiler._Paint, start_ns, time.perf_counter_ns() - start_ns)
+                if event.rect().intersects(self.__profiler.get_overlay_rect()):
+                    self.__profiler.draw_overlay(painter)
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 大面板图像
+大面板 (如 500 x 500) 逐个绘制方块过慢, 改为每个方块对应图像的一个像素:
+    方块颜色保存在 NumPy 数组 (uint32, ARGB32 预乘, 空闲为透明) 中, 该数组即 QImage 的像素缓冲 (不复制)
+    刷新时只由面板数据同步刷新区域内的行, 再以一次 drawImage 缩放到控件 (最近邻, 方块边缘清晰)
+图像第 0 行为面板最上方一行 (row_count - 1)
+"""
+
+
+# 模块信息
+__all__ = ['BoardImage']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import numpy as np
+# Qt标准库
+from PySide6.QtCore import QRectF
+from PySide6.QtGui import (QPainter, QImage)
+# 自封装
+from tetris_piece import (Shape, ShapeTable)# 游戏部件
+from tetris_matrix import TetrisMatrix# 面板数据
+
+
+# 大面板图像
+class BoardImage(object):
+    '''大面板图像
+    像素数组与 QImage 共用内存, 修改数组即修改图像
+    '''
+    # 占用者 -> 像素颜色 (ARGB32 预乘, 不透明; 0 为透明)
+    __palette = np.array([0] + [0xFF000000 | ShapeTable.get_color(shape) for shape in range(Shape._T, Shape._S + 1)], dtype=np.uint32)
+
+    def __init__(self, row_count: int, col_count: int) -> None:
+        '''构造
+        row_count, col_count: 面板大小 (每个方块一个像素)
+        '''
+        self.__row_count = row_count# 行方块数
+        self.__col_count = col_count# 列方块数
+        self.__pixels = np.zeros((row_count, col_count), dtype=np.uint32)# 像素 (图像行序)
+        self.__image = QImage(self.__pixels.data, col_count, row_count, self.__pixels.strides[0], QImage.Format.Format_ARGB32_Premultiplied)
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[board image: {self.__row_count} x {self.__col_count}]'
+
+    def get_size(self) -> tuple[int]:
+        '''(行方块数, 列方块数)
+        '''
+        return self.__row_count, self.__col_count
+
+    def get_pixels(self) -> np.ndarray:
+        '''像素数组 (与图像共用内存, 第 0 行为面板最上方一行)
+        '''
+        return self.__pixels
+
+    def get_image(self) -> QImage:
+        '''图像
+        '''
+        return self.__image
+
+    def update_rows(self, matrix: TetrisMatrix, start_row: int, end_row: int) -> None:
+        '''由面板数据同步指定行 (含结束行)
+        各行占用者拼接后一次查颜色表写入像素
+        '''
+        top_row = self.__row_count - 1
+        occupants = b''.join(matrix.get_occupant_row(row) for row in range(end_row, start_row - 1, -1))# 图像行序 (自上而下)
+        occupants = np.frombuffer(occupants, dtype=np.uint8).reshape(-1, self.__col_count)
+        np.take(self.__palette, occupants, out=self.__pixels[top_row - end_row:top_row - start_row + 1])
+
+    def draw(self, painter: QPainter, target: QRectF, start_row: int, end_row: int, start_col: int, end_col: int) -> None:
+        '''绘制指定范围的方块 (含结束行、列)
+        target: 整个面板在控件中的区域 (按方块范围取其中一部分)
+        '''
+        square_width, square_height = target.width() / self.__col_count, target.height() / self.__row_count
+        top_row = self.__row_count - 1 - end_row
+        row_count, col_count = end_row - start_row + 1, end_col - start_col + 1
+        source = QRectF(start_col, top_row, col_count, row_count)
+        target = QRectF(target.left() + start_col * square_width, target.top() + top_row * square_height,
+                        col_count * square_width, row_count * square_height)
+        painter.drawImage(target, self.__image, source)
@@ -0,0 +1,349 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 游戏规则
+不依赖 Qt 的游戏核心: 面板数据、当前/预览部件、计分、等级
+部件形状由 PieceGenerator 按种子生成, 相同种子的游戏可复现
+通过 step(option) 推进, 界面只需监听引擎事件并刷新显示
+"""
+
+
+# 模块信息
+__all__ = ['TransferOption', 'GameState', 'EngineEvent', 'TetrisData', 'TetrisEngine']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+from enum import IntEnum
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_matrix import TetrisMatrix# 面板数据
+from tetris_piece import (Shape, TetrisPiece)# 游戏部件
+from tetris_generator import PieceGenerator# 部件生成器
+
+
+# 部件变换
+class TransferOption(IntEnum):
+    '''部件变换
+    '''
+    _None = 0# 无
+    LineDown = 1# 下移一行
+    DropDown = 2# 落至底部
+    LeftShift = 3# 左移
+    RightShift = 4# 右移
+    Rotate = 5# 顺时针旋转
+
+
+# 游戏运行状态
+class GameState(IntEnum):
+    '''游戏运行状态
+    '''
+    End = 0,# 结束
+    Run = 1,# 运行
+    Pause = 2,# 暂停
+
+
+# 引擎事件
+class EngineEvent(IntEnum):
+    '''引擎事件
+    '''
+    Start = 0# 开始
+    PieceMoved = 1# 当前部件变换
+    PieceArrived = 2# 当前部件抵达 (已放置到面板, 数据已更新)
+    NewPiece = 3# 更新部件
+    LinesRemoved = 4# 消除整行 (新部件已生成)
+    GameOver = 5# 结束
+
+
+class TetrisData(object):
+    '''俄罗斯方块 游戏数据
+    '''
+    __config_section = 'tetris_game'# 配置节 (与游戏界面共用)
+    _piece_score = 1# 放置部件得分
+    _line_score = 10# 消除每行得分
+
+    def __init__(self, start_level: int = None, update_level_count: int = None) -> None:
+        '''构造
+        start_level: 初始等级 (None 使用配置)
+        update_level_count: 等级+1 所需下落部件数 (None 使用配置)
+        '''
+        self.load_config()# 加载配置
+        if start_level is not None:
+            self.__start_level = start_level
+        if update_level_count is not None:
+            self.__update_level_count = update_level_count
+        self.set_override_levels()# 不覆盖配置
+        self.reset()# 重置数据
+
+    def load_config(self) -> None:
+        '''加载配置 (下一局生效)
+        '''
+        # 初始等级
+        self.__start_level = GlobalConfig.load_int(self.__config_section, 'start_level', 1, 1)
+        # 达到此值, 等级+1
+        self.__update_level_count = GlobalConfig.load_int(self.__config_section, 'update_level_count', 25, 1)
+
+    def save_config(self) -> None:
+        '''保存配置
+        '''
+        # 初始等级
+        GlobalConfig.save(self.__config_section, 'start_level', str(self.__start_level))
+        # 达到此值, 等级+1
+        GlobalConfig.save(self.__config_section, 'update_level_count', str(self.__update_level_count))
+
+    def get_start_level(self) -> int:
+        '''本局的初始等级
+        '''
+        return self.__game_start_level
+
+    def get_update_level_count(self) -> int:
+        '''本局等级+1 所需下落部件数
+        '''
+        return self.__game_update_level_count
+
+    def set_override_levels(self, start_level: int = None, update_level_count: int = None) -> None:
+        '''下一局起以指定值代替配置的初始等级、等级+1 所需下落部件数 (如按录像参数回放, 不影响保存的配置)
+        start_level, update_level_count: None 使用配置
+        '''
+        self.__override_start_level = start_level
+        self.__override_update_level_count = update_level_count
+
+    def reset(self) -> None:
+        '''重置 (配置的修改在此时生效)
+        '''
+        # 本局配置
+        self.__game_start_level = self.__start_level if self.__override_start_level is None else self.__override_start_level# 初始等级
+        self.__game_update_level_count = (self.__update_level_count if self.__override_update_level_count is None
+                                          else self.__override_update_level_count)# 等级+1 所需下落部件数
+        # 重置数据
+        self._score = 0# 分数
+        self._level = self.__game_start_level# 等级
+        self._lines_removed = 0# 累计移除行数
+        self._pieces_dropped = 0# 累计下落部件
+
+    def update(self, remove_lines: int) -> None:
+        '''更新数据
+        '''
+        # 放置部件
+        self._score += self._piece_score# 分数
+        self._pieces_dropped += 1# 累计下落部件
+        if self._pieces_dropped % self.__game_update_level_count == 0:
+            self._level += 1# 等级
+        # 消除整行
+        if remove_lines:
+            self._score += self._line_score * remove_lines# 分数
+            self._lines_removed += remove_lines# 累计移除行数
+
+
+# 游戏规则
+class TetrisEngine(object):
+    '''俄罗斯方块 游戏规则
+    不依赖 Qt, 可脱离界面高速运行
+    '''
+    def __init__(self, row_count=24, col_count=10, data: TetrisData = None, seed=None, generator: PieceGenerator = None) -> None:
+        '''构造
+        row_count, col_count: 面板大小
+        data: 游戏数据 (默认新建)
+        seed: 随机种子 (None 使用配置, 仅在新建生成器时有效)
+        generator: 部件生成器 (默认新建)
+        '''
+        self.__matrix = TetrisMatrix(row_count, col_count)# 面板
+        self.__data = data if data else TetrisData()# 数据
+        self.__generator = generator if generator else PieceGenerator(seed)# 部件生成器
+        self.__listener_list = []# 事件监听
+        self.__removed_rows = []# 最近一次消除的行
+        self._state = GameState.End# 状态
+        self._curr_piece = TetrisPiece()# 当前部件
+        self._next_piece = TetrisPiece(self.__generator.peek())# 下一部件
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[engine: {self.__matrix}, state: {self._state.name}, score: {self.__data._score}]'
+
+    def reset(self, row_count: int, col_count: int) -> None:
+        '''设置面板大小
+        '''
+        self.__matrix.reset(row_count, col_count)
+
+    def add_listener(self, callback_func) -> None:
+        '''添加事件监听
+        callback_func(event: EngineEvent) -> None
+        '''
+        self.__listener_list.append(callback_func)
+
+    def remove_listener(self, callback_func) -> None:
+        '''移除事件监听
+        '''
+        self.__listener_list.remove(callback_func)
+
+    def notify(self, event: EngineEvent) -> None:
+        '''通知事件
+        '''
+        for callback_func in self.__listener_list:
+            callback_func(event)
+
+    def get_matrix(self) -> TetrisMatrix:
+        '''面板
+        '''
+        return self.__matrix
+
+    def get_data(self) -> TetrisData:
+        '''游戏数据
+        '''
+        return self.__data
+
+    def get_state(self) -> GameState:
+        '''运行状态
+        '''
+        return self._state
+
+    def get_curr_piece(self) -> TetrisPiece:
+        '''当前部件
+        '''
+        return self._curr_piece
+
+    def get_next_piece(self) -> TetrisPiece:
+        '''下一部件
+        '''
+        return self._next_piece
+
+    def get_generator(self) -> PieceGenerator:
+        '''部件生成器
+        '''
+        return self.__generator
+
+    def set_generator(self, generator: PieceGenerator) -> None:
+        '''更换部件生成器 (下一局开始时生效)
+        '''
+        self.__generator = generator
+
+    def get_preview_shapes(self) -> list[Shape]:
+        '''预览队列中的形状 (按出场顺序, 首个即下一部件)
+        '''
+        return self.__generator.get_preview()
+
+    def get_removed_rows(self) -> list[int]:
+        '''最近一次消除的行索引
+        '''
+        return self.__removed_rows
+
+    def start(self, seed=None) -> bool:
+        '''开始游戏
+        seed: 本局随机种子 (None 使用生成器配置的种子)
+        '''
+        self.__data.reset()# 数据
+        self.__matrix.clear_all()# 面板
+        self.__removed_rows = []
+        self.__generator.reset(seed)# 部件序列
+        self._next_piece.set_shape(self.__generator.peek())
+        self._state = GameState.Run# 状态
+        self.notify(EngineEvent.Start)
+        return self.get_new_piece()# 部件
+
+    def pause(self) -> None:
+        '''暂停游戏
+        '''
+        if self._state == GameState.Run:
+            self._state = GameState.Pause
+
+    def resume(self) -> None:
+        '''恢复游戏
+        '''
+        if self._state == GameState.Pause:
+            self._state = GameState.Run
+
+    def end(self) -> None:
+        '''结束游戏
+        '''
+        self._state = GameState.End
+
+    def step(self, option: TransferOption) -> bool:
+        '''推进一步 (仅运行状态有效)
+        return: 部件变换成功
+        '''
+        if self._state != GameState.Run:
+            return False
+        return self.try_transfer_piece(option)
+
+    def get_new_piece(self) -> bool:
+        '''更新部件
+        '''
+        # 取下一部件
+        new_piece = TetrisPiece(self.__generator.draw())
+        new_piece = new_piece.transfer(0, -(1 + new_piece.get_top_y()))# 确保整个进入
+        self._next_piece.set_shape(self.__generator.peek())
+        if not self.__matrix.is_piece_setable(new_piece):# 尝试放置
+            self._curr_piece = TetrisPiece()
+            self._state = GameState.End# 结束运行
+            self.notify(EngineEvent.GameOver)
+            return False
+        # 更新部件
+        self._curr_piece = new_piece
+        self.notify(EngineEvent.NewPiece)
+        return True
+
+    def restore_piece(self, shape: Shape) -> None:
+        '''以指定形状的新部件继续运行 (面板、数据、生成器已恢复, 如 录像关键帧)
+        '''
+        new_piece = TetrisPiece(shape)
+        self._curr_piece = new_piece.transfer(0, -(1 + new_piece.get_top_y()))# 起始位置
+        self._next_piece.set_shape(self.__generator.peek())
+        self._state = GameState.Run
+        self.notify(EngineEvent.NewPiece)
+
+    def transfer_piece(self, option: TransferOption) -> TetrisPiece:
+        '''部件变换
+        '''
+        # 无
+        if option == TransferOption._None:
+            return self._curr_piece
+        # 下移一行
+        if option == TransferOption.LineDown:
+            new_piece = self._curr_piece.transfer(0, -1)
+        # 落至底部
+        elif option == TransferOption.DropDown:
+            drop_rows = self.__matrix.get_drop_rows(self._curr_piece)
+            new_piece = self._curr_piece.transfer(0, -(drop_rows + 1))
+            self._curr_piece = self._curr_piece.transfer(0, -drop_rows)
+        # 左移
+        elif option == TransferOption.LeftShift:
+            new_piece = self._curr_piece.transfer(-1, 0)
+        # 右移
+        elif option == TransferOption.RightShift:
+            new_piece = self._curr_piece.transfer(1, 0)
+        # 顺时针旋转90度
+        elif option == TransferOption.Rotate:
+            new_piece = self._curr_piece.transfer(angle=90)
+        return new_piece
+
+    def try_transfer_piece(self, option: TransferOption) -> bool:
+        '''尝试部件变换
+        '''
+        # 尝试放置变换后的部件
+        new_piece = self.transfer_piece(option)
+        if not self.__matrix.is_piece_setable(new_piece):
+            # 部件抵达
+            if option in [TransferOption.LineDown, TransferOption.DropDown]:
+                self.set_piece_arrived()
+            return False
+        # 更新部件
+        self._curr_piece = new_piece
+        self.notify(EngineEvent.PieceMoved)
+        return True
+
+    def set_piece_arrived(self) -> None:
+        '''部件抵达面板底部/触碰到累积部件方块
+        '''
+        # 更新面板
+        self.__matrix.set_occupy_piece(self._curr_piece)# 放置部件
+        self.__removed_rows = self.__matrix.remove_full_lines()# 消除整行
+        # 更新数据
+        self.__data.update(len(self.__removed_rows))
+        self.notify(EngineEvent.PieceArrived)
+        # 更新部件
+        if not self.get_new_piece():
+            return None
+        if self.__removed_rows:
+            self.notify(EngineEvent.LinesRemoved)
@@ -3,6 +3,16 @@
 
 """俄罗斯方块 游戏运行
 显示部件下落、移动、旋转、堆积、消除
+游戏规则由 TetrisEngine 处理, 界面监听引擎事件刷新显示
+每局游戏记录为录像文件 (tetris_replay.py), 也可在界面中按原速回放录像
+自动模式下由启发式自动玩家 (HeuristicStrategy) 定时给出与按键相同的部件变换
+定时下落由固定步长循环 (FixedStepLoop) 驱动: 定时器按固定步长触发, 按单调时钟补足步数, 每步累积小数行下落
+按住操作键时的重复由 InputHandler 按 DAS/ARR 在固定步中计算, 忽略系统的按键自动重复
+界面刷新请求由绘制调度 (FrameScheduler) 合并, 按帧率上限 (frame_rate_cap) 每帧最多绘制一次
+配置文件被外部修改后 (每 config_poll_ms 检查) 重新加载, 无需重启: 速度等设置立即生效, 面板大小在游戏结束后生效
+统计模式 (配置 instrument 或按 F3 切换) 下记录每帧各环节耗时并叠加显示, 关闭时导出到 instrument_export
+面板方块总数达到 large_board_cells 时使用大面板模式 (方块颜色保存在图像中, 整体缩放绘制)
+录像、自动玩家模块在首次使用时导入, 不计入启动耗时 (启动耗时统计见 tetris_startup.py)
 """
 
 
@@ -13,145 +23,113 @@ __author__ = 'lihua.tan'
 
 
 # python库
-from enum import IntEnum
+import os
+import sys
+import time
 from typing import override
+from contextlib import nullcontext
 # Qt标准库
-from PySide6.QtCore import (Qt, Slot, QBasicTimer, QTimerEvent, QEvent, QObject)
+from PySide6.QtCore import (Qt, Slot, QBasicTimer, QTimer, QTimerEvent, QEvent, QObject)
 from PySide6.QtGui import (QKeyEvent)
 from PySide6.QtWidgets import (QWidget, QMessageBox)
 # 自封装库
 from ini_config import GlobalConfig# 配置文件管理
 from drag_resize import DragResize# 调整大小
 from tetris_board import BoardSquare# 游戏面板
-from tetris_piece import TetrisPiece, Shape# 游戏部件
+from tetris_piece import Shape# 游戏部件
+from tetris_engine import (TransferOption, GameState, EngineEvent, TetrisEngine)# 游戏规则
+from tetris_profiler import FrameProfiler# 帧耗时统计
+from tetris_scheduler import FrameScheduler# 绘制调度
+from tetris_loop import FixedStepLoop# 固定步长循环
+from tetris_input import InputHandler# 按键输入
+from tetris_startup import StartupProfiler# 启动耗时统计
 from tetris_game_ui import Ui_Form# ui界面
 
 
-# 部件变换
-class TransferOption(IntEnum):
-    '''部件变换
-    '''
-    _None = 0# 无
-    LineDown = Qt.Key.Key_L# 下移一行
-    DropDown = Qt.Key.Key_Down# 落至底部
-    LeftShift = Qt.Key.Key_Left# 左移
-    RightShift = Qt.Key.Key_Right# 右移
-    Rotate = Qt.Key.Key_Up# 顺时针旋转
-
-
-# 游戏运行状态
-class GameState(IntEnum):
-    '''游戏运行状态
-    '''
-    End = 0,# 结束
-    Run = 1,# 运行
-    Pause = 2,# 暂停
-
-
-class TetrisData(object):
-    '''俄罗斯方块 游戏数据
-    '''
-    def __init__(self, ui: Ui_Form) -> None:
-        '''构造
-        '''
-        self.__ui = ui# 控制界面
-        self.load_config()# 加载配置
-        self.reset()# 重置数据
-
-    def load_config(self) -> None:
-        '''加载配置
-        '''
-        # 初始等级
-        self.__start_level = 1
-        load_value = GlobalConfig.load(__name__, 'start_level', str(self.__start_level))
-        self.__start_level = int(load_value)
-        # 达到此值, 等级+1
-        self.__update_level_count = 25
-        load_value = GlobalConfig.load(__name__, 'update_level_count', str(self.__update_level_count))
-        self.__update_level_count = int(load_value)
-
-    def save_config(self) -> None:
-        '''保存配置
-        '''
-        # 初始等级
-        GlobalConfig.save(__name__, 'start_level', str(self.__start_level))
-        # 达到此值, 等级+1
-        GlobalConfig.save(__name__, 'update_level_count', str(self.__update_level_count))
-
-    def reset(self) -> None:
-        '''重置
-        '''
-        # 重置数据
-        self._score = 0# 分数
-        self._level = self.__start_level# 等级
-        self._lines_removed = 0# 累计移除行数
-        self._pieces_dropped = 0# 累计下落部件
-
-    def display(self) -> None:
-        '''显示数据
-        '''
-        self.__ui.lcdNumber_score.display(self._score)# 分数
-        self.__ui.lcdNumber_level.display(self._level)# 等级
-        self.__ui.lcdNumber_removed_lines.display(self._lines_removed)# 累计移除行数
-
-    def update(self, remove_lines: int) -> None:
-        '''更新数据
-        '''
-        # 放置部件
-        self._score += 1# 分数
-        self._pieces_dropped += 1# 累计下落部件
-        if self._pieces_dropped % self.__update_level_count == 0:
-            self._level += 1# 等级
-        # 消除整行
-        if remove_lines:
-            self._score += 10 * remove_lines# 分数
-            self._lines_removed += remove_lines# 累计移除行数
-
-
 # 游戏运行
 class TetrisGame(QWidget):
     '''俄罗斯方块 游戏运行
     '''
+    # 按键 -> 部件变换
+    __key_option_dict = {
+        Qt.Key.Key_L: TransferOption.LineDown,# 下移一行
+        Qt.Key.Key_Down: TransferOption.DropDown,# 落至底部
+        Qt.Key.Key_Left: TransferOption.LeftShift,# 左移
+        Qt.Key.Key_Right: TransferOption.RightShift,# 右移
+        Qt.Key.Key_Up: TransferOption.Rotate,# 顺时针旋转
+    }
+
     def __init__(self, parent=None) -> None:
         '''构造
         '''
         # 访问父类的方法和属性
         super().__init__(parent)
         # 配置
-        GlobalConfig.load_file(base_name='俄罗斯方块配置')
+        GlobalConfig.load_file(base_name='俄罗斯方块配置', write_behind=True)# 延迟写入 (关闭时同步保存)
         self.load_config()# 加载配置
+        StartupProfiler.mark('config')
         # 界面
         self.__ui = Ui_Form()
         self.__ui.setupUi(self)
+        StartupProfiler.mark('setup_ui')
         self.__ui.frame_board.raise_()
         self.setWindowTitle('俄罗斯方块')# 标题
+        # 游戏规则
+        self._engine = TetrisEngine(self.__board_row_count, self.__board_col_count)
+        self._engine.add_listener(self.on_engine_event)
+        self.__generator = self._engine.get_generator()# 部件生成器 (回放时临时更换)
+        # 录像
+        self.__recorder = None# 记录 (首次开始游戏时创建)
+        self.__player = None# 回放 (None 为非回放)
+        # 自动玩家
+        self.__strategy = None# 自动玩家策略 (None 为玩家操作)
+        self._auto_timer = QBasicTimer()# 定时器 (自动玩家操作)
+        # 绘制调度
+        self.__scheduler = FrameScheduler(parent=self)
+        # 帧耗时统计
+        self.__profiler = None# 帧耗时统计 (None 为不统计)
+        self._overlay_timer = QBasicTimer()# 定时器 (刷新叠加显示)
         # 数据
-        self.__data = TetrisData(self.__ui)
-        self.__data.display()
+        self.__data = self._engine.get_data()
+        self.display_data()
         # 面板
         self._board = self.__ui.frame_board
-        self._board.reset(self.__board_row_count, self.__board_col_count)
-        # 当前部件
-        self._curr_piece = TetrisPiece()
+        self._board.set_scheduler(self.__scheduler)
+        self._board.set_matrix(self._engine.get_matrix())
+        self.update_image_mode()
         # 下一部件
-        self._next_piece = TetrisPiece()
-        self._next_piece.set_random_shape()
         self._next_piece_label = self.__ui.label_next_piece
         self._next_piece_label.installEventFilter(self)
+        self.set_instrument(self.__instrument)
         # 运行
-        self._timer = QBasicTimer()# 定时器 (定时移动部件)
-        self._state = GameState.End# 状态
+        self._timer = QBasicTimer()# 定时器 (固定步长, 定时移动部件)
+        self.__loop = FixedStepLoop(self.__loop_step_ms)# 固定步长循环
+        self.__input = InputHandler()# 按键输入 (DAS/ARR)
         self.__ui.pushButton_start.clicked.connect(self.start)# 开始
         self.__ui.pushButton_recover.clicked.connect(self.start)# 恢复
         self.__ui.pushButton_pause.clicked.connect(self.pause)# 暂停
         self.__ui.pushButton_end.clicked.connect(self.end)# 结束
+        self.__ui.pushButton_auto.toggled.connect(self.set_auto_play)# 自动
         # 窗口大小
         self.__init_size()
         self.installEventFilter(self)# 事件监听
+        # 配置文件修改检查
+        self._config_timer = QBasicTimer()# 定时器 (检查配置文件修改)
+        GlobalConfig.add_reload_listener(self.reload_config)# 文件被修改后重新加载
+        if self.__config_poll_ms:
+            self._config_timer.start(self.__config_poll_ms, self)
+        StartupProfiler.mark('game_init')
 
     def __init_size(self) -> None:
         '''设置窗口大小
         '''
+        self.update_size()
+        self._darg_resize = DragResize(self, scale=True)# 比例调整大小
+        self._darg_resize.set_size_adjust_callback(self.get_size_perfect_adjust)# 回调
+
+    def update_size(self) -> None:
+        '''按面板行列数及方块大小调整窗口大小
+        '''
         # 面板
         board_widget = self._board.get_col_count() * self.__square_width
         board_height = self._board.get_row_count() * self.__square_height
@@ -162,8 +140,6 @@ class TetrisGame(QWidget):
         widget_height = board_height
         # 调整大小
         self.setFixedSize(widget_widget, widget_height)
-        self._darg_resize = DragResize(self, scale=True)# 比例调整大小
-        self._darg_resize.set_size_adjust_callback(self.get_size_perfect_adjust)# 回调
 
     def get_size_perfect_adjust(self, width_adjust: int, height_adjust: int) -> list[int]:
         '''最优调整
@@ -188,21 +164,37 @@ class TetrisGame(QWidget):
         '''加载配置
         '''
         # 面板行数
-        load_value = GlobalConfig.load(__name__, 'board_row_count', '24')
-        self.__board_row_count = int(load_value)
+        self.__board_row_count = GlobalConfig.load_int(__name__, 'board_row_count', 24, 4)
         # 面板列数
-        load_value = GlobalConfig.load(__name__, 'board_col_count', '10')
-        self.__board_col_count = int(load_value)
+        self.__board_col_count = GlobalConfig.load_int(__name__, 'board_col_count', 10, 4)
         # 方块宽度
-        load_value = GlobalConfig.load(__name__, 'square_width', '27')
-        self.__square_width = int(load_value)
+        self.__square_width = GlobalConfig.load_int(__name__, 'square_width', 27, 1)
         # 方块高度
-        load_value = GlobalConfig.load(__name__, 'square_height', '27')
-        self.__square_height = int(load_value)
+        self.__square_height = GlobalConfig.load_int(__name__, 'square_height', 27, 1)
+        # 大面板模式的方块总数 (行数 * 列数, 0 为不使用)
+        self.__large_board_cells = GlobalConfig.load_int(__name__, 'large_board_cells', 10000, 0)
+        # 录像文件夹 (相对程序所在文件夹, 空为不记录)
+        self.__replay_dir = GlobalConfig.load(__name__, 'replay_dir', 'replays')
+        # 录像关键帧间隔部件数 (0 为不保存关键帧)
+        self.__replay_keyframe_interval = GlobalConfig.load_int(__name__, 'replay_keyframe_interval', 50, 0)
+        # 自动玩家操作间隔 (毫秒)
+        self.__ai_move_interval_ms = GlobalConfig.load_int(__name__, 'ai_move_interval_ms', 50, 1)
+        # 固定步长 (毫秒)
+        self.__loop_step_ms = GlobalConfig.load_int(__name__, 'loop_step_ms', 10, 1)
+        # 配置文件修改检查间隔 (毫秒, 0 为不检查)
+        self.__config_poll_ms = GlobalConfig.load_int(__name__, 'config_poll_ms', 1000, 0)
+        # 帧耗时统计 (0/1)
+        self.__instrument = GlobalConfig.load_bool(__name__, 'instrument', False)
+        # 帧耗时导出文件 (相对程序所在文件夹, *.trace.json 为 Chrome trace 格式, 空为不导出)
+        self.__instrument_export = GlobalConfig.load(__name__, 'instrument_export', '')
 
     def save_config(self) -> None:
         '''保存配置
         '''
+        # 方块大小 (面板当前大小)
+        if self._board.isVisible():
+            self.__square_width = int(BoardSquare.get_width())
+            self.__square_height = int(BoardSquare.get_height())
         # 初始等级
         GlobalConfig.save(__name__, 'board_row_count', str(self.__board_row_count))
         # 达到此值, 等级+1
@@ -211,43 +203,239 @@ class TetrisGame(QWidget):
         GlobalConfig.save(__name__, 'square_width', str(self.__square_width))
         # 方块大小
         GlobalConfig.save(__name__, 'square_height', str(self.__square_height))
+        # 大面板模式的方块总数
+        GlobalConfig.save(__name__, 'large_board_cells', str(self.__large_board_cells))
+        # 录像文件夹
+        GlobalConfig.save(__name__, 'replay_dir', self.__replay_dir)
+        # 录像关键帧间隔部件数
+        GlobalConfig.save(__name__, 'replay_keyframe_interval', str(self.__replay_keyframe_interval))
+        # 自动玩家操作间隔
+        GlobalConfig.save(__name__, 'ai_move_interval_ms', str(self.__ai_move_interval_ms))
+        # 固定步长
+        GlobalConfig.save(__name__, 'loop_step_ms', str(self.__loop_step_ms))
+        # 配置文件修改检查间隔
+        GlobalConfig.save(__name__, 'config_poll_ms', str(self.__config_poll_ms))
+        # 帧耗时统计
+        GlobalConfig.save(__name__, 'instrument', str(int(self.__instrument)))
+        # 帧耗时导出文件
+        GlobalConfig.save(__name__, 'instrument_export', self.__instrument_export)
+
+    def reload_config(self) -> None:
+        '''配置文件被修改后重新加载 (当前游戏继续)
+        速度、按键、帧率、自动玩家等设置立即生效; 初始等级、升级所需部件数、部件序列在下一局生效; 面板大小在游戏结束后生效
+        '''
+        self.load_config()
+        self.__data.load_config()
+        self.__generator.load_config()
+        self.__scheduler.load_config()
+        self.__input.load_config()
+        if self.__strategy:
+            self.__strategy.load_config()
+            self._auto_timer.start(self.__ai_move_interval_ms, self)
+        # 固定步长
+        self.__loop.set_step_ms(self.__loop_step_ms)
+        if self._timer.isActive():
+            self.schedule_timer()
+        # 帧耗时统计
+        if self.__instrument != bool(self.__profiler):
+            self.set_instrument(self.__instrument)
+        # 配置文件修改检查
+        if self.__config_poll_ms:
+            self._config_timer.start(self.__config_poll_ms, self)
+        else:
+            self._config_timer.stop()
+        # 面板大小
+        if self.get_state() == GameState.End:
+            self.apply_board_size()
+        self.update_image_mode()
+
+    def apply_board_size(self) -> None:
+        '''按配置的行列数调整面板 (行列数不变时不处理), 保持当前方块大小
+        '''
+        if (self.__board_row_count, self.__board_col_count) == (self._board.get_row_count(), self._board.get_col_count()):
+            return None
+        if self._board.isVisible():
+            self.__square_width = int(BoardSquare.get_width())
+            self.__square_height = int(BoardSquare.get_height())
+        self._engine.reset(self.__board_row_count, self.__board_col_count)
+        self._board.adjust_square_size()
+        self.update_image_mode()
+        self.update_size()
+
+    def update_image_mode(self) -> None:
+        '''按面板方块总数 开启/关闭 大面板模式
+        '''
+        cell_count = self._board.get_row_count() * self._board.get_col_count()
+        self._board.set_image_mode(bool(self.__large_board_cells) and cell_count >= self.__large_board_cells)
+
+    def get_state(self) -> GameState:
+        '''运行状态
+        '''
+        return self._engine.get_state()
+
+    def display_data(self) -> None:
+        '''显示数据
+        '''
+        self.__ui.lcdNumber_score.display(self.__data._score)# 分数
+        self.__ui.lcdNumber_level.display(self.__data._level)# 等级
+        self.__ui.lcdNumber_removed_lines.display(self.__data._lines_removed)# 累计移除行数
+
+    def set_timer_start(self, enable: bool) -> None:
+        '''定时设置 (关闭时暂停固定步长循环的计时)
+        '''
+        if not enable or self.get_state() == GameState.End:
+            self._timer.stop()
+            self.__loop.pause()
+            self.__input.clear()# 恢复后需重新按下
+            return None
+        self.__loop.resume()
+        self.schedule_timer()
 
-    def set_timer_start(self, enable: bool, time_ms=-1) -> None:
-        '''定时设置
+    def schedule_timer(self) -> None:
+        '''按下一次到期的时刻预定定时器 (单次, 触发后重新预定)
+        到期时刻取 下一行定时下落 与 按住操作键的下一次重复 中较早者; 回放时为下一事件的时刻
         '''
-        if not enable or self._state == GameState.End:
+        if self.get_state() != GameState.Run:
             self._timer.stop()
             return None
-        if time_ms == -1:
-            time_ms = 1000 / self.__data._level
-        self._timer.start(time_ms, self)
+        now_ns = time.perf_counter_ns()
+        if self.__player:
+            due_ns = now_ns + self.__player.get_wait_ms() * 1000000
+        else:
+            due_list = [due_ns for due_ns in (self.__loop.get_gravity_due_ns(self.__data._level), self.__input.get_next_due_ns()) if due_ns is not None]
+            if not due_list:# 无到期事件
+                self._timer.stop()
+                return None
+            due_ns = min(due_list)
+        self._timer.start(self.__loop.schedule(due_ns, now_ns), Qt.TimerType.PreciseTimer, self)
+
+    def step_input(self) -> None:
+        '''执行按住操作键的重复 (DAS/ARR, 受阻时停止)
+        '''
+        for option, count in self.__input.get_due(max_repeat=self._board.get_col_count()):
+            for _ in range(count):
+                if not self.try_transfer_piece(option):
+                    break
+
+    def step_gravity(self, steps: int) -> None:
+        '''执行固定步的定时下落 (每秒下落 等级 行, 一步可下落多行)
+        '''
+        for _ in range(steps):
+            for _ in range(self.__loop.get_gravity_rows(self.__data._level)):
+                if self.get_state() != GameState.Run:
+                    return None
+                self.try_transfer_piece(TransferOption.LineDown, True)
+
+    @Slot(bool)# 槽
+    def set_auto_play(self, enable: bool) -> None:
+        '''自动玩家 开启/关闭 (游戏结束后自动重新开始)
+        '''
+        if enable:
+            from tetris_strategy import HeuristicStrategy# 自动玩家 (首次开启时导入)
+            self.__strategy = HeuristicStrategy()
+            self._auto_timer.start(self.__ai_move_interval_ms, self)
+        else:
+            self._auto_timer.stop()
+            self.__strategy = None
+
+    def set_instrument(self, enable: bool) -> None:
+        '''帧耗时统计 开启/关闭 (开启时清除之前的样本)
+        '''
+        self.__instrument = enable
+        if enable:
+            self.__profiler = FrameProfiler()
+            self._overlay_timer.start(500, self)
+        else:
+            self._overlay_timer.stop()
+            self.__profiler = None
+        self._board.set_profiler(self.__profiler)
+
+    def get_profiler(self) -> FrameProfiler:
+        '''帧耗时统计 (None 为不统计)
+        '''
+        return self.__profiler
+
+    def export_profile(self, file_path: str) -> bool:
+        '''导出帧耗时样本 (*.trace.json 为 Chrome trace 格式, 其余为 JSON)
+        '''
+        if not self.__profiler:
+            return False
+        self.__profiler.export(file_path)
+        return True
+
+    def __measure(self, name: str):
+        '''记录 with 块的耗时 (不统计时不记录)
+        '''
+        return self.__profiler.measure(name) if self.__profiler else nullcontext()
+
+    def play_replay(self, file_path: str, seek_pieces: int = 0) -> bool:
+        '''按原速回放录像 (回放期间忽略按键, 可暂停/恢复)
+        file_path: 录像文件路径
+        seek_pieces: 自此部件数开始回放 (由关键帧跳转)
+        '''
+        from tetris_replay import (Replay, ReplayPlayer)# 录像 (首次回放时导入)
+        replay = Replay.load(file_path)
+        if (replay.row_count, replay.col_count) != (self._board.get_row_count(), self._board.get_col_count()):
+            QMessageBox.information(self, '提示', f'录像面板大小 ({replay.row_count} x {replay.col_count}) 与当前面板不一致')
+            return False
+        # 停止当前游戏 (不保存录像)
+        self.set_timer_start(False)
+        if self.__recorder:
+            self.__recorder.finish()
+        # 以录像参数开始
+        self._engine.set_generator(replay.create_engine().get_generator())
+        self.__data.set_override_levels(replay.start_level, replay.update_level_count)
+        self.__player = ReplayPlayer(replay, self._engine)
+        self.__player.start()
+        self.__loop.reset()
+        if seek_pieces:
+            self.__player.seek(seek_pieces)
+            self.display_data()
+        self.__scheduler.mark_dirty(self)
+        self.set_timer_start(True)
+        return True
+
+    def save_replay(self) -> None:
+        '''结束记录并保存录像
+        '''
+        replay = self.__recorder.finish() if self.__recorder else None
+        if not replay or not self.__replay_dir:
+            return None
+        dir_path = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), self.__replay_dir)
+        replay.save(os.path.join(dir_path, time.strftime('%Y%m%d_%H%M%S') + '.tetr'))
 
     @Slot()# 槽
     def start(self) -> None:
         '''开始游戏
         '''
         # 开始
-        if self._state == GameState.End:
-            if self._state == GameState.Run:
+        if self.get_state() == GameState.End:
+            if self.get_state() == GameState.Run:
                 self.set_timer_start(False)
                 if QMessageBox.StandardButton.Yes != QMessageBox.question(self, '提示', '游戏运行中, 确定重新开始游戏?'):
                     self.set_timer_start(True)
                     return None
-            self.__data.reset()# 数据
-            self.__data.display()
-            self._board.clear_all()# 面板
-            self.get_new_piece()# 部件
-            self._state = GameState.Run# 状态
-            self.update()
+            self.apply_board_size()# 配置修改后的面板大小
+            self._engine.start()# 数据、面板、部件、状态
+            if not self.__recorder:
+                from tetris_replay import ReplayRecorder# 录像 (首次开始游戏时导入)
+                self.__recorder = ReplayRecorder(self.__replay_keyframe_interval)
+            self.__recorder.start(self._engine)# 录像
+            self.__loop.reset()# 固定步长循环
+            self.__scheduler.mark_dirty(self)
         # 恢复
-        elif self._state == GameState.Pause:
-            if self._state == GameState.Run:
+        elif self.get_state() == GameState.Pause:
+            if self.get_state() == GameState.Run:
                 QMessageBox.information(self, '提示', '游戏运行中')
                 return None
-            if self._state == GameState.End:
+            if self.get_state() == GameState.End:
                 QMessageBox.information(self, '提示', '游戏已结束')
                 return None
-            self._state = GameState.Run# 状态
+            self._engine.resume()# 状态
+            if self.__recorder:
+                self.__recorder.resume()# 录像
+            if self.__player:
+                self.__player.resume()
         # 定时器
         self.set_timer_start(True)
         self._board.setFocus()# 设置焦点到面板, 快速响应键盘按键处理
@@ -256,11 +444,15 @@ class TetrisGame(QWidget):
     def pause(self) -> None:
         '''暂停游戏
         '''
-        if self._state == GameState.Run:# 必须在运行状态
+        if self.get_state() == GameState.Run:# 必须在运行状态
             self.set_timer_start(False)# 定时器
-            self._state = GameState.Pause# 状态
-            self.update()# 更新界面
-        if self._state == GameState.Pause:
+            self._engine.pause()# 状态
+            if self.__recorder:
+                self.__recorder.pause()# 录像
+            if self.__player:
+                self.__player.pause()
+            self.__scheduler.mark_dirty(self)# 更新界面
+        if self.get_state() == GameState.Pause:
             QMessageBox.information(self, '提示', '游戏已暂停')
 
     @Slot()# 槽
@@ -268,9 +460,14 @@ class TetrisGame(QWidget):
         '''结束游戏
         '''
         self.set_timer_start(False)# 定时器
-        self._state = GameState.End# 状态
-        self.update()# 更新界面
-        if self._state == GameState.End:
+        self._engine.end()# 状态
+        self.save_replay()# 录像
+        if self.__player:# 结束回放
+            self.__player = None
+            self._engine.set_generator(self.__generator)
+            self.__data.set_override_levels()# 恢复配置的等级参数
+        self.__scheduler.mark_dirty(self)# 更新界面
+        if self.get_state() == GameState.End and not self.__strategy:# 自动玩家不提示
             QMessageBox.information(self, '提示', '游戏已结束')
 
     @override# 重写
@@ -282,114 +479,125 @@ class TetrisGame(QWidget):
         if event_type == QEvent.Type.Close:
             self.save_config()
             self.__data.save_config()
-            GlobalConfig.save_to_file()
+            self.__generator.save_config()
+            self.__scheduler.save_config()
+            self.__input.save_config()
+            if self.__strategy:
+                self.__strategy.save_config()
+            GlobalConfig.remove_reload_listener(self.reload_config)
+            GlobalConfig.close()# 同步保存并停止后台写入
+            if self.__instrument_export:# 导出帧耗时
+                self.export_profile(os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), self.__instrument_export))
         # 绘制
         if event_type == QEvent.Type.Paint:
-            # 调整方块大小
-            self._board.adjust_square_size()
-            self.__square_width = int(BoardSquare._width)
-            self.__square_height = int(BoardSquare._height)
-            # 绘制下一部件
+            # 绘制下一部件 (方块大小在面板大小改变时调整)
             if watched == self._next_piece_label:
-                if self._next_piece.get_shape() != Shape._None:
-                    self._next_piece.draw(self._next_piece_label)# 绘制部件
+                next_piece = self._engine.get_next_piece()
+                if next_piece.get_shape() != Shape._None:
+                    with self.__measure(FrameProfiler._Next):
+                        next_piece.draw(self._next_piece_label)# 绘制部件
             # 面板绘制在 tetris_board.py 中
+            # 启动耗时统计 (本次绘制提交后记录首帧)
+            if watched == self and StartupProfiler.is_running():
+                QTimer.singleShot(0, StartupProfiler.finish)
         # 键盘按下
         elif event_type == QEvent.Type.KeyPress:
             key_event: QKeyEvent = event
-            # 部件变换
-            option = self.key_to_option(key_event.key())
-            if option != TransferOption._None:
-                self.try_transfer_piece(option)
+            # 忽略系统的按键自动重复 (按住时的重复由 InputHandler 计算)
+            if key_event.isAutoRepeat():
+                return True
+            # 帧耗时统计 开启/关闭
+            if key_event.key() == Qt.Key.Key_F3:
+                self.set_instrument(not self.__profiler)
+                return True
+            # 按键处理 (键值转为变换操作, 记录按下状态)
+            with self.__measure(FrameProfiler._Input):
+                option = self.key_to_option(key_event.key())
+                pressed = self.__input.press(option)
+            # 部件变换 (规则更新)
+            if pressed and not self.__player:
+                with self.__measure(FrameProfiler._Update):
+                    self.try_transfer_piece(option)
+                self.schedule_timer()# 按住重复、等级变化
+        # 键盘松开
+        elif event_type == QEvent.Type.KeyRelease:
+            key_event: QKeyEvent = event
+            if not key_event.isAutoRepeat():
+                self.__input.release(self.key_to_option(key_event.key()))
+                self.schedule_timer()# 恢复仍按住的另一方向的重复
+        # 失去焦点 (松开全部按键)
+        elif event_type == QEvent.Type.WindowDeactivate:
+            self.__input.clear()
         # 定时器
         elif event_type == QEvent.Type.Timer:
             timer_event: QTimerEvent = event
             # 定时移动
             if timer_event.timerId() == self._timer.timerId():
-                self.try_transfer_piece(TransferOption.LineDown)
-                self.set_timer_start(False if self._state == GameState.End else True)
+                steps = self.__loop.advance()
+                if self.__profiler:# 定时器延迟 (相对最近一步的预定时刻)
+                    lag_ns = self.__loop.get_lag_ns()
+                    self.__profiler.add_sample(FrameProfiler._TimerLate, time.perf_counter_ns() - lag_ns, lag_ns)
+                with self.__measure(FrameProfiler._Update):
+                    if self.__player:# 回放 (按录像时间执行到期事件)
+                        self.__player.play_due()
+                        if self.__player and self.__player.is_finished():
+                            self.end()
+                    else:
+                        self.step_input()
+                        self.step_gravity(steps)
+                self.schedule_timer()
+            # 自动玩家
+            elif timer_event.timerId() == self._auto_timer.timerId():
+                if self.__strategy and not self.__player and self.get_state() == GameState.Run:
+                    with self.__measure(FrameProfiler._Update):
+                        self.try_transfer_piece(self.__strategy.get_option(self._engine))
+                    self.schedule_timer()# 等级变化
+            # 刷新叠加显示
+            elif timer_event.timerId() == self._overlay_timer.timerId():
+                self._board.update_overlay()
+            # 检查配置文件修改
+            elif timer_event.timerId() == self._config_timer.timerId():
+                GlobalConfig.check_reload()# 重新加载时通知 reload_config
         return super(TetrisGame, self).eventFilter(watched, event)
     
     def key_to_option(self, key_value: int) -> TransferOption:
         '''键值 转为 变换操作
         '''
-        try:
-            return TransferOption(key_value)
-        except:
-            return TransferOption._None
+        return self.__key_option_dict.get(key_value, TransferOption._None)
 
-    def get_new_piece(self) -> bool:
-        '''更新部件
-        '''
-        # 取下一部件
-        new_piece = self._next_piece.transfer(0, -(1 + self._next_piece.get_top_y()))# 确保整个进入
-        if not self._board.is_piece_setable(new_piece):# 尝试放置
-            self._board.set_draw_piece(None)
-            self.end()# 结束运行
-            return False
-        # 更新部件
-        self._curr_piece = new_piece
-        self._next_piece.set_random_shape()
-        self._board.set_draw_piece(self._curr_piece)
-        return True
-
-    def transfer_piece(self, option: TransferOption) -> TetrisPiece:
-        '''部件变换
-        '''
-        # 无
-        if option == TransferOption._None:
-            return self._curr_piece
-        # 下移一行
-        if option == TransferOption.LineDown:
-            new_piece = self._curr_piece.transfer(0, -1)
-        # 落至底部
-        elif option == TransferOption.DropDown:
-            new_piece = self._curr_piece.transfer(0, -1)
-            while self._board.is_piece_setable(new_piece):
-                new_piece = new_piece.transfer(0, -1)
-            self._curr_piece = new_piece.transfer(0, 1)
-        # 左移
-        elif option == TransferOption.LeftShift:
-            new_piece = self._curr_piece.transfer(-1, 0)
-        # 右移
-        elif option == TransferOption.RightShift:
-            new_piece = self._curr_piece.transfer(1, 0)
-        # 顺时针旋转90度
-        elif option == TransferOption.Rotate:
-            new_piece = self._curr_piece.transfer(angle=90)
-        return new_piece
-
-    def try_transfer_piece(self, option: TransferOption) -> bool:
+    def try_transfer_piece(self, option: TransferOption, gravity: bool = False) -> bool:
         '''尝试部件变换
+        gravity: 定时下落 (否则为按键)
         '''
-        # 尝试放置变换后的部件
-        new_piece = self.transfer_piece(option)
-        if not self._board.is_piece_setable(new_piece):
-            # 部件抵达
-            if option in [TransferOption.LineDown, TransferOption.DropDown]:
-                self.set_piece_arrived()
-                self.update()
-            return False
-        # 更新部件
-        self._curr_piece = new_piece
-        # 刷新显示
-        self._board.set_draw_piece(new_piece)
-        self.update()
-        return True
+        if self.get_state() == GameState.Run and self.__recorder:
+            self.__recorder.record(option, gravity)# 录像
+        return self._engine.step(option)
 
-    def set_piece_arrived(self) -> None:
-        '''部件抵达面板底部/触碰到累积部件方块
-        ''' 
-        # 更新面板
-        self._board.set_occupy_piece(self._curr_piece)# 放置部件
-        remove_lines = self._board.remove_full_lines()# 消除整行
-        # 更新数据
-        self.__data.update(remove_lines)
-        self.__data.display()
+    def on_engine_event(self, event: EngineEvent) -> None:
+        '''引擎事件 (只刷新发生变化的部分)
+        '''
+        # 当前部件变换
+        if event == EngineEvent.PieceMoved:
+            self._board.set_draw_piece(self._engine.get_curr_piece())
         # 更新部件
-        if not self.get_new_piece():
-            return None
-        # 更新显示
-        if remove_lines:
-            # self.set_timer_start(True, 500)# 更改定时事件, 等待移除界面刷新
+        elif event == EngineEvent.NewPiece:
+            self._board.set_draw_piece(self._engine.get_curr_piece())
+            self.__scheduler.mark_dirty(self._next_piece_label)
+        # 部件抵达 (落至底部时部件直接到达抵达位置)
+        elif event == EngineEvent.PieceArrived:
+            self._board.set_draw_piece(self._engine.get_curr_piece())
+            self.display_data()
+        # 消除整行
+        elif event == EngineEvent.LinesRemoved:
             self._board.set_draw_piece(None)# 暂时不绘制新块
+            self._board.update_rows(self._engine.get_removed_rows()[0])# 清除行及其上方下移的行
+        # 开始
+        elif event == EngineEvent.Start:
+            self.display_data()
+            self._board.request_update()
+        # 结束
+        elif event == EngineEvent.GameOver:
+            self._board.set_draw_piece(None)
+            self.end()# 结束运行
+            if self.__strategy:# 自动玩家: 重新开始
+                QTimer.singleShot(0, self.start)
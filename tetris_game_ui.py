@@ -153,6 +153,12 @@ class Ui_Form(object):
 
         self.verticalLayout_6.addWidget(self.pushButton_end)
 
+        self.pushButton_auto = QPushButton(Form)
+        self.pushButton_auto.setObjectName(u"pushButton_auto")
+        self.pushButton_auto.setCheckable(True)
+
+        self.verticalLayout_6.addWidget(self.pushButton_auto)
+
         self.verticalSpacer_2 = QSpacerItem(20, 40, QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding)
 
         self.verticalLayout_6.addItem(self.verticalSpacer_2)
@@ -183,5 +189,6 @@ class Ui_Form(object):
         self.label_score_removed_lines_tip.setText(QCoreApplication.translate("Form", u"\u5df2\u79fb\u9664\u884c\u6570", None))
         self.pushButton_pause.setText(QCoreApplication.translate("Form", u"\u6682\u505c", None))
         self.pushButton_end.setText(QCoreApplication.translate("Form", u"\u7ed3\u675f", None))
+        self.pushButton_auto.setText(QCoreApplication.translate("Form", u"\u81ea\u52a8", None))
     # retranslateUi
 
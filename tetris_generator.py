@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 部件生成器
+以固定种子生成可复现的部件形状序列, 支持均匀随机与 7-bag 两种方式
+预览队列为环形缓冲区, 每次取出形状为 O(1)
+种子、方式、预览数保存在配置节 tetris_game 中, 重新加载配置后在下一序列 (reset) 生效, 当前序列不变
+getstate / setstate 可保存、恢复序列的当前位置 (录像关键帧)
+"""
+
+
+# 模块信息
+__all__ = ['GeneratorMode', 'PieceGenerator']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import random
+from enum import IntEnum
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_piece import Shape# 游戏部件
+
+
+# 生成方式
+class GeneratorMode(IntEnum):
+    '''生成方式
+    '''
+    Uniform = 0# 均匀随机
+    Bag = 1# 7-bag (每 7 个部件包含全部形状各一次)
+
+
+# 部件生成器
+class PieceGenerator(object):
+    '''部件生成器
+    相同种子、方式得到相同的形状序列
+    '''
+    __config_section = 'tetris_game'# 配置节 (与游戏界面共用)
+
+    def __init__(self, seed=None, mode: GeneratorMode = None, preview_count: int = None) -> None:
+        '''构造
+        seed: 随机种子 (None 使用配置; 配置也未固定时每局随机选取)
+        mode: 生成方式 (None 使用配置)
+        preview_count: 预览部件数 (None 使用配置)
+        '''
+        self.load_config()# 加载配置
+        if seed is not None:
+            self.__seed = seed
+        if mode is not None:
+            self.__mode = GeneratorMode(mode)
+        if preview_count is not None:
+            self.__preview_count = max(1, preview_count)
+        self.reset()# 开始序列
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[generator: {self.__game_mode.name}, seed: {self.__game_seed}, preview: {self.get_preview()}]'
+
+    def load_config(self) -> None:
+        '''加载配置 (下一序列生效)
+        '''
+        # 随机种子 (空或无效值为不固定)
+        load_value = GlobalConfig.load(self.__config_section, 'piece_seed', '').strip()
+        try:
+            self.__seed = int(load_value) if load_value else None
+        except ValueError:
+            self.__seed = None
+        # 生成方式
+        self.__mode = GlobalConfig.load_enum(self.__config_section, 'piece_mode', GeneratorMode.Uniform)
+        # 预览部件数
+        self.__preview_count = GlobalConfig.load_int(self.__config_section, 'preview_count', 1, 1)
+
+    def save_config(self) -> None:
+        '''保存配置
+        '''
+        # 随机种子
+        GlobalConfig.save(self.__config_section, 'piece_seed', '' if self.__seed is None else str(self.__seed))
+        # 生成方式
+        GlobalConfig.save(self.__config_section, 'piece_mode', self.__mode.name)
+        # 预览部件数
+        GlobalConfig.save(self.__config_section, 'preview_count', str(self.__preview_count))
+
+    def get_seed(self) -> int:
+        '''配置的随机种子 (None 为不固定)
+        '''
+        return self.__seed
+
+    def get_game_seed(self) -> int:
+        '''当前序列实际使用的随机种子
+        '''
+        return self.__game_seed
+
+    def get_mode(self) -> GeneratorMode:
+        '''当前序列的生成方式
+        '''
+        return self.__game_mode
+
+    def get_preview_count(self) -> int:
+        '''当前序列的预览部件数
+        '''
+        return self.__game_preview_count
+
+    def reset(self, seed=None) -> None:
+        '''开始新序列
+        seed: 本序列的随机种子 (None 使用配置的种子; 配置也未固定时随机选取)
+        生成方式、预览部件数取当前配置
+        '''
+        if seed is None:
+            seed = self.__seed if self.__seed is not None else random.randrange(1 << 32)
+        self.__game_seed = seed# 实际种子
+        self.__game_mode = self.__mode# 生成方式
+        self.__game_preview_count = self.__preview_count# 预览部件数
+        self.__random = random.Random(seed)# 随机数
+        self.__bag = []# 当前袋中剩余形状
+        self.__queue = [self.__create_shape() for _ in range(self.__game_preview_count)]# 预览队列 (环形)
+        self.__head = 0# 队首位置
+
+    def __create_shape(self) -> Shape:
+        '''生成下一个形状
+        '''
+        if self.__game_mode == GeneratorMode.Bag:
+            if not self.__bag:
+                self.__bag = list(Shape(shape) for shape in range(Shape._ValidStart, Shape._ValidEnd + 1))
+                self.__random.shuffle(self.__bag)
+            return self.__bag.pop()
+        return Shape(self.__random.randint(Shape._ValidStart, Shape._ValidEnd))
+
+    def draw(self) -> Shape:
+        '''取出队首形状, 队尾补入新形状
+        '''
+        shape = self.__queue[self.__head]
+        self.__queue[self.__head] = self.__create_shape()
+        self.__head = (self.__head + 1) % self.__game_preview_count
+        return shape
+
+    def peek(self, index: int = 0) -> Shape:
+        '''预览第 index 个即将取出的形状
+        '''
+        return self.__queue[(self.__head + index) % self.__game_preview_count]
+
+    def get_preview(self) -> list[Shape]:
+        '''预览队列 (按取出顺序)
+        '''
+        return self.__queue[self.__head:] + self.__queue[:self.__head]
+
+    def getstate(self) -> tuple:
+        '''序列的当前位置 (随机数状态, 袋中剩余形状, 预览队列)
+        '''
+        return self.__random.getstate(), tuple(self.__bag), tuple(self.get_preview())
+
+    def setstate(self, state: tuple) -> None:
+        '''恢复序列的位置 (getstate 的结果, 预览部件数需一致)
+        '''
+        random_state, bag, preview = state
+        if len(preview) != self.__game_preview_count:
+            raise ValueError
+        self.__random.setstate(random_state)
+        self.__bag = list(bag)
+        self.__queue = list(preview)
+        self.__head = 0
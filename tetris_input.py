@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 按键输入
+记录操作键的按下/松开状态, 忽略系统的按键自动重复, 按住时的重复由游戏时钟计算:
+    按下时立即执行一次; 左移/右移按住超过 DAS (delayed auto shift) 后每隔 ARR (auto repeat rate) 重复一次
+    (ARR 为 0 时立即移动到底); 下移一行按住时每隔 soft_drop_ms 重复一次 (不等待 DAS)
+    旋转、落至底部每次按下只执行一次
+同时按住左移和右移时以最后按下的为准, 松开后恢复另一方向 (重新计算 DAS)
+时间参数保存在配置节 tetris_game 中, 不依赖 Qt
+"""
+
+
+# 模块信息
+__all__ = ['InputHandler']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import time
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_engine import TransferOption# 游戏规则
+
+
+# 按键输入
+class InputHandler(object):
+    '''按键输入
+    press/release 记录按键状态, get_due 给出到当前时刻应重复执行的操作
+    '''
+    __config_section = 'tetris_game'# 配置节 (与游戏界面共用)
+    __shift_options = (TransferOption.LeftShift, TransferOption.RightShift)# 左右平移 (DAS/ARR)
+
+    def __init__(self, das_ms: int = None, arr_ms: int = None, soft_drop_ms: int = None) -> None:
+        '''构造
+        das_ms, arr_ms, soft_drop_ms: 时间参数 (毫秒, None 使用配置)
+        '''
+        self.load_config()# 加载配置
+        if das_ms is not None:
+            self.__das_ms = max(0, das_ms)
+        if arr_ms is not None:
+            self.__arr_ms = max(0, arr_ms)
+        if soft_drop_ms is not None:
+            self.__soft_drop_ms = max(1, soft_drop_ms)
+        self.clear()
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[input: das {self.__das_ms} ms, arr {self.__arr_ms} ms, held {[option.name for option in self.__held_dict]}]'
+
+    def load_config(self) -> None:
+        '''加载配置
+        '''
+        # 左右平移重复前的延迟 (毫秒)
+        self.__das_ms = GlobalConfig.load_int(self.__config_section, 'das_ms', 167, 0)
+        # 左右平移重复间隔 (毫秒, 0 为立即移动到底)
+        self.__arr_ms = GlobalConfig.load_int(self.__config_section, 'arr_ms', 33, 0)
+        # 下移一行重复间隔 (毫秒)
+        self.__soft_drop_ms = GlobalConfig.load_int(self.__config_section, 'soft_drop_ms', 50, 1)
+
+    def save_config(self) -> None:
+        '''保存配置
+        '''
+        # 左右平移重复前的延迟
+        GlobalConfig.save(self.__config_section, 'das_ms', str(self.__das_ms))
+        # 左右平移重复间隔
+        GlobalConfig.save(self.__config_section, 'arr_ms', str(self.__arr_ms))
+        # 下移一行重复间隔
+        GlobalConfig.save(self.__config_section, 'soft_drop_ms', str(self.__soft_drop_ms))
+
+    def clear(self) -> None:
+        '''松开全部按键 (如 窗口失去焦点)
+        '''
+        self.__held_dict = {}# 按住的操作 -> 按下时刻 (ns), 按按下顺序
+        self.__shift = None# 当前生效的左右平移 (None 为无)
+        self.__repeat_dict = {}# 重复的操作 -> [重复起算时刻 (ns), 已重复次数]
+
+    def is_held(self, option: TransferOption) -> bool:
+        '''操作键按住中
+        '''
+        return option in self.__held_dict
+
+    def press(self, option: TransferOption, now_ns: int = None) -> bool:
+        '''按下操作键
+        return: 需要立即执行一次 (已按住时为 False)
+        '''
+        if option == TransferOption._None or option in self.__held_dict:
+            return False
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        self.__held_dict[option] = now_ns
+        if option in self.__shift_options:
+            if self.__shift is not None:
+                self.__repeat_dict.pop(self.__shift, None)
+            self.__shift = option
+            self.__repeat_dict[option] = [now_ns + self.__das_ms * 1000000, 0]
+        elif option == TransferOption.LineDown:
+            self.__repeat_dict[option] = [now_ns + self.__soft_drop_ms * 1000000, 0]
+        return True
+
+    def release(self, option: TransferOption, now_ns: int = None) -> None:
+        '''松开操作键
+        '''
+        if self.__held_dict.pop(option, None) is None:
+            return None
+        self.__repeat_dict.pop(option, None)
+        if option == self.__shift:# 恢复仍按住的另一方向
+            self.__shift = None
+            for held_option in reversed(self.__held_dict):
+                if held_option in self.__shift_options:
+                    if now_ns is None:
+                        now_ns = time.perf_counter_ns()
+                    self.__shift = held_option
+                    self.__repeat_dict[held_option] = [now_ns + self.__das_ms * 1000000, 0]
+                    break
+
+    def get_next_due_ns(self) -> int:
+        '''下一次重复的时刻 (ns, 无待重复的操作时为 None)
+        ARR 为 0 的左右平移移动到底后不再预定, 其后随每次定时下落重复
+        '''
+        due_ns = None
+        for option, (start_ns, count) in self.__repeat_dict.items():
+            interval_ns = (self.__soft_drop_ms if option == TransferOption.LineDown else self.__arr_ms) * 1000000
+            if interval_ns:
+                next_ns = start_ns + count * interval_ns
+            elif not count:
+                next_ns = start_ns
+            else:
+                continue
+            due_ns = next_ns if due_ns is None else min(due_ns, next_ns)
+        return due_ns
+
+    def get_due(self, now_ns: int = None, max_repeat: int = 64) -> list[tuple]:
+        '''到当前时刻应重复执行的操作 (并计为已执行)
+        max_repeat: 一次最多重复的次数 (ARR 为 0 时即为此值)
+        return: [(操作, 次数), ...]
+        '''
+        if not self.__repeat_dict:
+            return []
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        due_list = []
+        for option, repeat in self.__repeat_dict.items():
+            start_ns, count = repeat
+            if now_ns < start_ns:
+                continue
+            interval_ns = (self.__soft_drop_ms if option == TransferOption.LineDown else self.__arr_ms) * 1000000
+            total = (now_ns - start_ns) // interval_ns + 1 if interval_ns else count + max_repeat
+            if total > count:
+                due_list.append((option, min(total - count, max_repeat)))
+                repeat[1] = total
+        return due_list
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 固定步长循环
+以单调高精度时钟 (time.perf_counter_ns) 计算应执行的固定步数, 定时器触发时刻的抖动不会累积为漂移
+定时下落以 "每秒 level 行" 累积为每步的小数行 (整数运算, 无舍入误差), 一步可下落多行
+定时器不必每步触发: 由 get_gravity_due_ns 算出下一行下落的时刻, schedule 预定唤醒的步, 唤醒时 advance 补足其间的步数
+与绘制频率无关, 不依赖 Qt, 可脱离界面运行
+"""
+
+
+# 模块信息
+__all__ = ['FixedStepLoop']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import time
+
+
+# 固定步长循环
+class FixedStepLoop(object):
+    '''固定步长循环
+    第 n 步的预定时刻为 起点 + n * 步长, 暂停期间不计时
+    '''
+    __second_ns = 1000000000# 1 秒 (ns)
+
+    def __init__(self, step_ms: int = 10, max_steps: int = 25) -> None:
+        '''构造
+        step_ms: 步长 (毫秒)
+        max_steps: 超过预定唤醒的步后最多追赶的步数 (长时间阻塞后丢弃多余的步, 避免连续追赶)
+        '''
+        self.__step_ns = max(1, int(step_ms * 1000000))# 步长 (ns)
+        self.__max_steps = max(1, max_steps)
+        self.reset()
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[loop: {self.__step_ns / 1000000} ms, {self.__step_count} steps]'
+
+    def reset(self) -> None:
+        '''从第 0 步开始 (清除下落累积)
+        '''
+        self.__start_ns = time.perf_counter_ns()# 起点
+        self.__pause_ns = 0# 暂停时刻 (0 为未暂停)
+        self.__step_count = 0# 已执行步数
+        self.__wake_step = 0# 预定唤醒的步
+        self.__gravity_acc = 0# 下落累积 (行 * 1e9)
+
+    def pause(self) -> None:
+        '''暂停计时
+        '''
+        if not self.__pause_ns:
+            self.__pause_ns = time.perf_counter_ns()
+
+    def resume(self) -> None:
+        '''恢复计时
+        '''
+        if self.__pause_ns:
+            self.__start_ns += time.perf_counter_ns() - self.__pause_ns
+            self.__pause_ns = 0
+
+    def is_paused(self) -> bool:
+        '''暂停中
+        '''
+        return bool(self.__pause_ns)
+
+    def get_step_ms(self) -> float:
+        '''步长 (毫秒)
+        '''
+        return self.__step_ns / 1000000
+
+    def set_step_ms(self, step_ms: int) -> None:
+        '''修改步长 (自最近一步的预定时刻起按新步长计算, 保留下落累积)
+        '''
+        self.__start_ns += self.__step_count * self.__step_ns
+        self.__step_count = 0
+        self.__wake_step = 0
+        self.__step_ns = max(1, int(step_ms * 1000000))
+
+    def get_step_count(self) -> int:
+        '''已执行步数
+        '''
+        return self.__step_count
+
+    def advance(self, now_ns: int = None) -> int:
+        '''到当前时刻应执行的步数 (并计为已执行)
+        now_ns: 当前时刻 (None 为 time.perf_counter_ns())
+        '''
+        if self.__pause_ns:
+            return 0
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        steps = (now_ns - self.__start_ns) // self.__step_ns - self.__step_count
+        max_steps = max(0, self.__wake_step - self.__step_count) + self.__max_steps# 预定唤醒前的步均需执行
+        if steps > max_steps:# 丢弃多余的步
+            self.__step_count += steps - max_steps
+            steps = max_steps
+        steps = max(0, steps)
+        self.__step_count += steps
+        return steps
+
+    def schedule(self, due_ns: int, now_ns: int = None) -> int:
+        '''预定在 due_ns 所在的步 (至少下一步) 唤醒
+        return: 距该步预定时刻的毫秒数 (向上取整, 作为定时器间隔)
+        '''
+        if now_ns is None:
+            now_ns = time.perf_counter_ns()
+        wake_step = max(self.__step_count + 1, -(-(due_ns - self.__start_ns) // self.__step_ns))
+        self.__wake_step = wake_step
+        wait_ns = self.__start_ns + wake_step * self.__step_ns - now_ns
+        return max(0, -(-wait_ns // 1000000))
+
+    def get_gravity_due_ns(self, level: int) -> int:
+        '''下一行定时下落的预定时刻 (ns, level 不大于 0 时为 None)
+        '''
+        if level <= 0:
+            return None
+        steps = -(-(self.__second_ns - self.__gravity_acc) // (level * self.__step_ns))# 累积满一行所需步数
+        return self.__start_ns + (self.__step_count + steps) * self.__step_ns
+
+    def get_lag_ns(self, now_ns: int = None) -> int:
+        '''当前时刻相对最近一步预定时刻的延迟 (ns)
+        '''
+        if now_ns is None:
+            now_ns = self.__pause_ns or time.perf_counter_ns()
+        return now_ns - (self.__start_ns + self.__step_count * self.__step_ns)
+
+    def get_gravity_rows(self, level: int) -> int:
+        '''一步的下落行数 (每秒 level 行, 小数部分累积到之后的步)
+        '''
+        self.__gravity_acc += level * self.__step_ns
+        rows, self.__gravity_acc = divmod(self.__gravity_acc, self.__second_ns)
+        return rows
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 面板数据
+游戏面板的纯数据模型, 不依赖 Qt, 可脱离界面运行
+由 row_count * col_count 个方块组成
+最下方为 row 0
+每行的占用情况以整数位图记录 (第 col 位为 1 表示占用), 碰撞、整行检测只需位运算
+另外逐列记录高度 (最高占用行 + 1), 落至底部的行数可由部件底部轮廓直接算出
+每行的占用者保存为 bytearray (每个方块 1 字节), 可直接作为缓冲区使用 (如 NumPy 数组, 无需复制)
+"""
+
+
+# 模块信息
+__all__ = ['TetrisMatrix']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+pass
+# 自封装库
+from tetris_piece import (Shape, ShapeTable, TetrisPiece)# 游戏部件
+
+
+# 面板数据
+class TetrisMatrix(object):
+    """面板数据
+    记录每个方块的占用者 (部件形状索引, 0 为空闲) 及每行的占用位图
+    """
+    def __init__(self, row_count=24, col_count=10) -> None:
+        """构造
+        """
+        self.reset(row_count, col_count)
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[matrix: {self.__row_count} x {self.__col_count}]'
+
+    def reset(self, row_count: int, col_count: int) -> None:
+        """设置面板大小
+        row_count: 行方块数
+        col_count: 列方块数
+        """
+        # 大小
+        self.__row_count = row_count# 行方块数
+        self.__col_count = col_count# 列方块数
+        self.__center_col = col_count // 2# 部件原点所在列
+        # 占用者表 (每行一个 bytearray)
+        self.__occupant_table = [bytearray(self.__col_count) for _ in range(self.__row_count)]
+        # 行占用位图
+        self.__row_mask_list = [0] * self.__row_count
+        self.__full_row_mask = (1 << self.__col_count) - 1
+        # 列高度
+        self.__col_height_list = [0] * self.__col_count
+
+    def get_row_count(self) -> int:
+        """行方块数
+        """
+        return self.__row_count
+
+    def get_col_count(self) -> int:
+        """列方块数
+        """
+        return self.__col_count
+
+    def get_occupant(self, row: int, col: int) -> int:
+        """占用者 (部件形状索引, 0 为空闲)
+        """
+        return self.__occupant_table[row][col]
+
+    def get_occupant_row(self, row: int) -> bytearray:
+        """整行的占用者 (bytearray, 只读, 不可修改)
+        """
+        return self.__occupant_table[row]
+
+    def get_color(self, row: int, col: int) -> int:
+        """方块颜色 (空闲为 None)
+        """
+        occupant = self.__occupant_table[row][col]
+        return ShapeTable.get_color(occupant) if occupant else None
+
+    def is_free(self, row: int, col: int) -> bool:
+        """方块空闲
+        """
+        return not self.__row_mask_list[row] & (1 << col)
+
+    def get_row_mask(self, row: int) -> int:
+        """行占用位图
+        """
+        return self.__row_mask_list[row]
+
+    def get_col_height(self, col: int) -> int:
+        """列高度 (最高占用行 + 1, 空列为 0)
+        """
+        return self.__col_height_list[col]
+
+    def get_max_height(self) -> int:
+        """最高列高度 (其上全部空闲)
+        """
+        return max(self.__col_height_list)
+
+    def dump_occupants(self) -> bytes:
+        """导出占用者 (自 row 0 起逐行, 只含最高列高度以下的行, 每个方块 1 字节)
+        """
+        return b''.join(self.__occupant_table[:self.get_max_height()])
+
+    def load_occupants(self, data: bytes) -> None:
+        """恢复占用者 (dump_occupants 的结果), 其余行清空
+        """
+        self.clear_all()
+        col_count = self.__col_count
+        for row in range(len(data) // col_count):
+            occupant_row = bytearray(data[row * col_count:(row + 1) * col_count])
+            self.__occupant_table[row] = occupant_row
+            row_mask = 0
+            for col, occupant in enumerate(occupant_row):
+                if occupant:
+                    row_mask |= 1 << col
+                    self.__col_height_list[col] = row + 1
+            self.__row_mask_list[row] = row_mask
+
+    def clear_all(self) -> None:
+        """清空面板
+        """
+        for row in range(self.__row_count):
+            self.__occupant_table[row][:] = bytes(self.__col_count)
+            self.__row_mask_list[row] = 0
+        self.__col_height_list[:] = [0] * self.__col_count
+
+    def convert_piece_pos(self, piece_square) -> list[int]:
+        '''部件坐标 转为 面板坐标
+        piece_square: 部件方块 (PieceSquare)
+        '''
+        row = piece_square._y + self.__row_count
+        col = piece_square._x + self.__center_col
+        return [row, col]
+
+    def is_valid_pos(self, row: int, col: int) -> bool:
+        '''有效坐标
+        '''
+        return not ((row < 0 or row >= self.__row_count) or (col < 0 or col >= self.__col_count))
+
+    def is_piece_setable(self, piece: TetrisPiece, dx: int = 0, dy: int = 0) -> bool:
+        """是否可放置部件到面板
+        piece: 放置部件
+        dx, dy: 在部件当前位置基础上的平移 (无需创建新部件即可探测)
+        """
+        if piece.get_shape() == Shape._None:
+            raise ValueError
+        return self.is_state_setable(piece.get_shape(), piece.get_orientation(), piece.get_dx() + dx, piece.get_dy() + dy)
+
+    def is_state_setable(self, shape: Shape, orientation: int, dx: int, dy: int) -> bool:
+        """是否可放置指定状态的部件到面板
+        shape: 部件形状索引
+        orientation: 朝向索引
+        dx, dy: 部件平移
+        """
+        state = ShapeTable.get_state(shape, orientation)
+        # 检查列越界
+        left_col = state.left_x + dx + self.__center_col
+        if left_col < 0 or state.right_x + dx + self.__center_col >= self.__col_count:
+            return False
+        # 检查行越界
+        base_row = dy + self.__row_count
+        if state.bottom_y + base_row < 0 or state.top_y + base_row >= self.__row_count:
+            return False
+        # 检查占用
+        row_mask_list = self.__row_mask_list
+        for y, mask in state.row_masks:
+            if row_mask_list[y + base_row] & (mask << left_col):
+                return False
+        return True
+
+    def get_drop_rows(self, piece: TetrisPiece) -> int:
+        """部件可下落的行数 (落至底部)
+        部件各列最底部方块均在列高度之上时, 由底部轮廓与列高度直接算出;
+        否则 (部件处于悬空方块之下) 逐行探测
+        """
+        state = piece.get_state()
+        base_row = piece.get_dy() + self.__row_count
+        base_col = piece.get_dx() + self.__center_col
+        col_height_list = self.__col_height_list
+        drop_rows = min(y + base_row - col_height_list[x + base_col] for x, y in state.bottom_profile)
+        if drop_rows >= 0:
+            return drop_rows
+        drop_rows = 0
+        while self.is_piece_setable(piece, 0, -(drop_rows + 1)):
+            drop_rows += 1
+        return drop_rows
+
+    def is_all_occupied(self, row: int) -> bool:
+        '''整行被占用
+        '''
+        return self.__row_mask_list[row] == self.__full_row_mask
+
+    def is_all_free(self, row: int) -> bool:
+        '''整行空闲
+        '''
+        return self.__row_mask_list[row] == 0
+
+    def set_occupy_piece(self, piece: TetrisPiece) -> None:
+        """放置部件到面板 (标记占用)
+        piece: 放置部件
+        """
+        if piece.get_shape() == Shape._None:
+            raise ValueError
+        shape = int(piece.get_shape())
+        for x, y in piece.get_points():
+            row, col = y + self.__row_count, x + self.__center_col# 目标位置
+            self.__occupant_table[row][col] = shape
+            self.__row_mask_list[row] |= 1 << col
+            if self.__col_height_list[col] <= row:
+                self.__col_height_list[col] = row + 1
+
+    def remove_full_lines(self) -> list[int]:
+        '''清除面板中的所有完整行
+        自底向上一次遍历, 保留行整体下移 (移动行引用), 清除的行释放后复用到顶部
+        return: 本次清除的行索引列表 (清除前的索引, 自底向上)
+        '''
+        removed_rows = []# 清除行索引
+        free_row_list = []# 待复用的行
+        write_row = 0# 保留行的目标位置
+        for curr_row in range(self.__row_count):
+            row_mask = self.__row_mask_list[curr_row]
+            # 完整行
+            if row_mask == self.__full_row_mask:
+                removed_rows.append(curr_row)
+                free_row_list.append(self.__occupant_table[curr_row])
+                continue
+            # 保留行下移
+            if write_row != curr_row:
+                self.__occupant_table[write_row] = self.__occupant_table[curr_row]
+                self.__row_mask_list[write_row] = row_mask
+            write_row += 1
+        # 顶部补入释放后的行
+        for row, occupant_row in enumerate(free_row_list, write_row):
+            occupant_row[:] = bytes(self.__col_count)
+            self.__occupant_table[row] = occupant_row
+            self.__row_mask_list[row] = 0
+        # 列高度: 清除行均为完整行 (位于每列高度之下), 整体下降后再跳过露出的空位
+        if removed_rows:
+            row_mask_list = self.__row_mask_list
+            for col in range(self.__col_count):
+                height = self.__col_height_list[col] - len(removed_rows)
+                while height > 0 and not row_mask_list[height - 1] & (1 << col):
+                    height -= 1
+                self.__col_height_list[col] = height
+        return removed_rows
@@ -6,11 +6,13 @@
 玩家操作的角色
 由 n 个连续的方块组成的形状
 方块相当于要描的点，围绕原点(0, 0)设置形状的描点坐标
+各形状的全部旋转/镜像状态在导入时预先计算为不可变的坐标元组,
+部件本身只记录 (形状, 朝向, dx, dy), 变换不再逐个方块计算
 """
 
 
 # 模块信息
-__all__ = ['Shape', 'ShapeTable', 'TetrisPiece']
+__all__ = ['Shape', 'ShapeState', 'ShapeTable', 'TetrisPiece']
 __version__ = '0.1'
 __author__ = 'lihua.tan'
 
@@ -18,11 +20,13 @@ __author__ = 'lihua.tan'
 # python库
 import random
 from enum import IntEnum
-# Qt标准库
-from PySide6.QtGui import (QPainter, QColor, QPalette)
-from PySide6.QtWidgets import QWidget
+from typing import (NamedTuple, TYPE_CHECKING)
+# Qt标准库 (仅绘制时使用, 在绘制函数中按需导入, 保证游戏规则可脱离 Qt 运行)
+if TYPE_CHECKING:# 仅用于类型注解
+    from PySide6.QtWidgets import QWidget
 # 自封装库
-from tetris_square import PieceSquare# 游戏方块
+if TYPE_CHECKING:# 仅用于类型注解
+    from tetris_square import PieceSquare# 游戏方块
 
 
 # 部件形状索引
@@ -42,6 +46,52 @@ class Shape(IntEnum):
     _ValidEnd = 7,
 
 
+# 形状状态
+class ShapeState(NamedTuple):
+    '''形状状态 (某一朝向下的预计算数据)
+    points: 描点坐标
+    left_x, right_x, bottom_y, top_y: 边界
+    row_masks: 行掩码 ((y, mask), ...), mask 的第 n 位对应 x = left_x + n
+    bottom_profile: 底部轮廓 ((x, 该列最底部方块 y), ...)
+    '''
+    points: tuple[tuple[int]]
+    left_x: int
+    right_x: int
+    bottom_y: int
+    top_y: int
+    row_masks: tuple[tuple[int]]
+    bottom_profile: tuple[tuple[int]]
+
+
+def _create_shape_states(points: tuple[tuple[int]]) -> tuple[ShapeState]:
+    '''计算形状全部朝向的状态
+    朝向索引: bit0~1 顺时针旋转 90 度的次数, bit2 水平镜像, bit3 垂直镜像
+    变换顺序与 PieceSquare 一致: 先镜像, 后旋转
+    '''
+    state_list = []
+    for orientation in range(16):
+        point_list = []
+        for x, y in points:
+            if orientation & 0b0100:# 水平镜像
+                x = -x
+            if orientation & 0b1000:# 垂直镜像
+                y = -y
+            for _ in range(orientation & 0b0011):# 旋转
+                x, y = y, -x
+            point_list.append((x, y))
+        x_list = [point[0] for point in point_list]
+        y_list = [point[1] for point in point_list]
+        left_x = min(x_list)
+        mask_dict = {}
+        bottom_dict = {}
+        for x, y in point_list:
+            mask_dict[y] = mask_dict.get(y, 0) | (1 << (x - left_x))
+            bottom_dict[x] = min(bottom_dict.get(x, y), y)
+        state_list.append(ShapeState(tuple(point_list), left_x, max(x_list), min(y_list), max(y_list),
+                                     tuple(sorted(mask_dict.items())), tuple(sorted(bottom_dict.items()))))
+    return tuple(state_list)
+
+
 # 形状配置参数表
 class ShapeTable(object):
     '''形状配置参数表
@@ -81,6 +131,8 @@ class ShapeTable(object):
         ),
     )
 
+    __state_table = tuple(_create_shape_states(param[1]) for param in __param_table)# 形状状态表 [形状][朝向]
+
     @classmethod
     def get_color(cls, shape: Shape) -> int:
         '''形状颜色
@@ -93,6 +145,23 @@ class ShapeTable(object):
         '''
         return cls.__param_table[shape][1]
 
+    @classmethod
+    def get_state(cls, shape: Shape, orientation: int = 0) -> ShapeState:
+        '''形状状态
+        orientation: 朝向索引
+        '''
+        return cls.__state_table[shape][orientation]
+
+    @staticmethod
+    def get_orientation(orientation: int = 0, angle: int = 0, flip_horizontal: bool = False, flip_vertical: bool = False) -> int:
+        '''在当前朝向基础上变换后的朝向索引
+        angle: 顺时针旋转角度 (90 * n)
+        '''
+        if angle % 90 != 0:
+            raise ValueError
+        orientation ^= (0b0100 if flip_horizontal else 0) | (0b1000 if flip_vertical else 0)
+        return (orientation & 0b1100) | (((orientation & 0b0011) + angle // 90) & 0b0011)
+
 
 # 游戏部件
 class TetrisPiece(object):
@@ -101,9 +170,7 @@ class TetrisPiece(object):
     由 n 个连续的方块组成的形状
     方块相当于要描的点，围绕原点(0, 0)设置形状的描点坐标
     '''
-    __shape = None# 形状
-    __square_list = None# 方块信息列表
-    __transfer = [0, 0, 0, False, False]# 变换 (dx, dy, angle, flip_horizontal, flip_vertical)
+    __slots__ = ('__shape', '__orientation', '__dx', '__dy')# 形状, 朝向索引, 平移
 
     def __init__(self, shape=Shape._None) -> None:
         '''构造
@@ -115,36 +182,19 @@ class TetrisPiece(object):
         '''设置形状
         shape: 部件形状索引
         '''
-        if shape == Shape._None:
-            self.clear()
-            return None
-        # 形状
-        self.__shape = shape
-        # 方块
-        if self.__square_list:
-            self.__square_list.clear()
-        color = ShapeTable.get_color(shape)
-        points = ShapeTable.get_points(shape)
-        self.__square_list = [PieceSquare(point[0], point[1], color) for point in points]
-        # 变换
-        self.__transfer = [0, 0, 0, False, False]# 变换 (dx, dy, angle, flip_horizontal, flip_vertical)
+        self.__shape = shape# 形状
+        self.__orientation = 0# 朝向
+        self.__dx, self.__dy = 0, 0# 平移
 
     def __repr__(self) -> str:
         '''实例化对象的输出信息 (详细)
         '''
-        return f'shape: {self.__shape}, transfer: {self.__transfer}, squares: {self.__square_list}'
+        return f'shape: {self.__shape}, orientation: {self.__orientation}, offset: ({self.__dx}, {self.__dy}), points: {self.get_points()}'
     
     def clear(self) -> None:
         '''清形状
         '''
-        # 形状
-        self.__shape = Shape._None
-        # 方块
-        if self.__square_list:
-            self.__square_list.clear()
-        self.__square_list = None
-        # 变换
-        self.__transfer = [0, 0, 0, False, False]# 变换 (dx, dy, angle, flip_horizontal, flip_vertical)
+        self.set_shape(Shape._None)
 
     def set_random_shape(self) -> None:
         '''随机设置形状
@@ -156,96 +206,112 @@ class TetrisPiece(object):
         '''当前部件形状
         '''
         return self.__shape
+
+    def get_orientation(self) -> int:
+        '''朝向索引
+        '''
+        return self.__orientation
+
+    def get_dx(self) -> int:
+        '''x 轴平移
+        '''
+        return self.__dx
+
+    def get_dy(self) -> int:
+        '''y 轴平移
+        '''
+        return self.__dy
+
+    def get_state(self) -> ShapeState:
+        '''形状状态 (未计入平移)
+        '''
+        return ShapeTable.get_state(self.__shape, self.__orientation)
     
     def get_color(self) -> int:
         '''当前部件颜色
         '''
-        return self.__square_list[0].get_color() if self.__shape != Shape._None else 0x00
+        return ShapeTable.get_color(self.__shape) if self.__shape != Shape._None else 0x00
+
+    def get_points(self) -> tuple[tuple[int]]:
+        '''方块坐标 (已计入平移)
+        '''
+        dx, dy = self.__dx, self.__dy
+        return tuple((x + dx, y + dy) for x, y in self.get_state().points)
 
-    def get_squares(self) -> list[PieceSquare]:
+    def get_squares(self) -> list['PieceSquare']:
         '''方块列表
         '''
-        return self.__square_list
+        from tetris_square import PieceSquare# 游戏方块
+        if self.__shape == Shape._None:
+            return None
+        color = self.get_color()
+        return [PieceSquare(x, y, color) for x, y in self.get_points()]
 
     def get_squares_count(self) -> int:
         '''部件包含方块数
         '''
-        return len(self.__square_list)
+        return len(self.get_state().points)
 
     def get_x_list(self) -> list[int]:
         '''x 轴坐标列表
         '''
-        return [square._x for square in self.__square_list]
+        return [x + self.__dx for x, _ in self.get_state().points]
 
     def get_y_list(self) -> list[int]:
         '''y 轴坐标列表
         '''
-        return [square._y for square in self.__square_list]
+        return [y + self.__dy for _, y in self.get_state().points]
 
     def get_left_x(self) -> int:
         '''最左侧方块 x 轴坐标值 (x 轴最小值)
         '''
-        return min(self.get_x_list())
+        return self.get_state().left_x + self.__dx
     
     def get_right_x(self) -> int:
         '''最右侧方块 x 轴坐标值 (x 轴最大值)
         '''
-        return max(self.get_x_list())
+        return self.get_state().right_x + self.__dx
     
     def get_bottom_y(self) -> int:
         '''最底部方块 y 轴坐标值 (y 轴最小值)
         '''
-        return min(self.get_y_list())
+        return self.get_state().bottom_y + self.__dy
 
     def get_top_y(self) -> int:
         '''最顶部方块 y 轴坐标值 (y 轴最大值)
         '''
-        return max(self.get_y_list())
+        return self.get_state().top_y + self.__dy
     
     def get_width(self) -> int:
         '''宽度 (横向方块数)
         '''
-        x_list = self.get_x_list()
-        return max(x_list) - min(x_list) + 1
+        state = self.get_state()
+        return state.right_x - state.left_x + 1
     
     def get_height(self) -> int:
         '''高度 (纵向方块数)
         '''
-        y_list = self.get_y_list()
-        return max(y_list) - min(y_list) + 1
+        state = self.get_state()
+        return state.top_y - state.bottom_y + 1
     
     def transfer(self, dx: int = 0, dy: int = 0, angle: int = 0, flip_horizontal: bool = False, flip_vertical: bool = False) -> 'TetrisPiece':
         '''变换
+        返回新部件, 仅复制 (形状, 朝向, dx, dy), 方块坐标查表获得
         '''
         if self.__shape == Shape._None:
             return self
-        # 新对象
-        result = TetrisPiece(self.__shape)
-        # 平移
-        dx += self.__transfer[0]
-        dy += self.__transfer[1]
-        # 旋转
-        if angle % 90 != 0:
-            raise ValueError
-        angle = (angle + self.__transfer[2]) % 360
-        # 镜像
-        flip_horizontal = (not self.__transfer[3]) if flip_horizontal else self.__transfer[3]
-        flip_vertical = (not self.__transfer[4]) if flip_vertical else self.__transfer[4]
-        # 变换
-        result.__transfer = [dx, dy, angle, flip_horizontal, flip_vertical]
-        for i in range(len(result.__square_list)):
-            square = result.__square_list[i]
-            if flip_horizontal:
-                square.flip_horizontal()# 水平镜像
-            if flip_vertical:
-                square.flip_vertical()# 垂直镜像
-            square.rotate(angle)# 旋转
-            square.move(dx, dy)# 移动
+        result = TetrisPiece.__new__(TetrisPiece)
+        result.__shape = self.__shape
+        result.__orientation = ShapeTable.get_orientation(self.__orientation, angle, flip_horizontal, flip_vertical) if (angle or flip_horizontal or flip_vertical) else self.__orientation
+        result.__dx = self.__dx + dx
+        result.__dy = self.__dy + dy
         return result
 
-    def draw(self, target_widget: QWidget) -> None:
+    def draw(self, target_widget: 'QWidget') -> None:
         '''绘制部件
         '''
+        from PySide6.QtGui import (QPainter, QColor, QPalette)
+        from tetris_square import PieceSquare# 游戏方块
         if self.get_shape() == Shape._None:
             return None
         with QPainter(target_widget) as painter:
@@ -260,7 +326,8 @@ class TetrisPiece(object):
             dy = (widget_rect.height() - (piece_height * PieceSquare.get_height())) / 2
             widget_rect.adjust(dx, dy, -dx, -dy)
             # 绘制方块
-            for square in self.get_squares():
-                top = widget_rect.bottom() - (square._y - piece_min_y + 1) * PieceSquare.get_height()
-                left = widget_rect.left() + (square._x - piece_min_x) * PieceSquare.get_width()
-                PieceSquare.draw(painter, top, left, QColor(square.get_color()))
+            color = QColor(self.get_color())
+            for x, y in self.get_points():
+                top = widget_rect.bottom() - (y - piece_min_y + 1) * PieceSquare.get_height()
+                left = widget_rect.left() + (x - piece_min_x) * PieceSquare.get_width()
+                PieceSquare.draw(painter, top, left, color)
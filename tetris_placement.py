@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 落点枚举
+给定面板和部件形状, 列出从起始位置经 左移/右移/旋转/下移一行 可到达的全部最终落点及操作路径
+以 (朝向, dx, dy) 为状态搜索: 每行每个朝向以 dx 位图表示, 由行占用位图及按形状缓存的旋转数据一次算出整行可放置位置
+平移、旋转在位图上求闭包, 操作路径在首次访问落点的 path 时才回溯 (通常只用到选中落点的路径)
+
+面板上方的空闲区域 (所有朝向都在最高列之上) 不逐行搜索:
+部件由起始位置直接下移到空闲区域底部, 在该行内搜索全部朝向和平移, 再向下搜索
+输出路径中, 该行的平移、旋转尽量提前到较高的行执行
+"""
+
+
+# 模块信息
+__all__ = ['Placement', 'get_placements']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+from collections import deque
+# 自封装库
+from tetris_piece import (Shape, ShapeTable)# 游戏部件
+from tetris_engine import TransferOption# 游戏规则
+
+
+# 落点
+class Placement(object):
+    '''落点
+    orientation, dx, dy: 部件最终状态 (再下移一行即抵达)
+    path: 自起始位置的操作路径 (不含最后的下移/落至底部, 首次访问时回溯并缓存)
+    '''
+    __slots__ = ('orientation', 'dx', 'dy', '_trace', '_path')
+
+    def __init__(self, orientation: int, dx: int, dy: int, trace) -> None:
+        '''构造
+        trace: 回溯操作路径的函数 (参数为 朝向, dx, dy)
+        '''
+        self.orientation = orientation
+        self.dx = dx
+        self.dy = dy
+        self._trace = trace
+        self._path = None
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[placement: orientation {self.orientation}, dx {self.dx}, dy {self.dy}]'
+
+    @property
+    def path(self) -> tuple[TransferOption]:
+        '''自起始位置的操作路径
+        '''
+        if self._path is None:
+            self._path = self._trace(self.orientation, self.dx, self.dy)
+            self._trace = None
+        return self._path
+
+
+# 操作 (避免在搜索中反复访问枚举属性)
+_left_shift, _right_shift, _rotate, _line_down = (TransferOption.LeftShift, TransferOption.RightShift,
+                                                  TransferOption.Rotate, TransferOption.LineDown)
+
+# 旋转数据缓存 [形状] -> ((left_x, right_x, bottom_y, top_y, row_masks, 旋转后朝向, 等价朝向), ...) (4 种朝向)
+# 等价朝向: (朝向, 平移 x, 平移 y), 占用方块与之相同的最小朝向 (如 正方形的 4 种朝向均等价于朝向 0)
+_rotation_cache = {}
+
+
+def _get_rotation_table(shape: Shape) -> tuple[tuple]:
+    '''形状 4 种朝向 (只旋转) 的边界、行掩码、旋转后朝向及等价朝向
+    '''
+    table = _rotation_cache.get(shape)
+    if table is None:
+        table_list = []
+        state_list = [ShapeTable.get_state(shape, orientation) for orientation in range(4)]
+        for orientation, state in enumerate(state_list):
+            points = sorted(state.points)
+            for same_orientation, same_state in enumerate(state_list[:orientation + 1]):
+                offset_x, offset_y = state.left_x - same_state.left_x, state.bottom_y - same_state.bottom_y
+                if sorted((x + offset_x, y + offset_y) for x, y in same_state.points) == points:
+                    break
+            table_list.append((state.left_x, state.right_x, state.bottom_y, state.top_y, state.row_masks,
+                               ShapeTable.get_orientation(orientation, 90), (same_orientation, offset_x, offset_y)))
+        table = _rotation_cache[shape] = tuple(table_list)
+    return table
+
+
+def get_placements(board, shape: Shape, start: tuple[int] = None) -> list[Placement]:
+    '''可到达的全部最终落点 (占用方块相同的落点只保留一个)
+    board: 面板 (TetrisMatrix 或 TetrisBoard)
+    shape: 部件形状
+    start: 起始状态 (朝向, dx, dy), None 为新部件的起始位置
+    '''
+    row_count, col_count = board.get_row_count(), board.get_col_count()
+    center_col = col_count // 2
+    row_mask_list = [board.get_row_mask(row) for row in range(row_count)]
+    table = _get_rotation_table(shape)
+    x_offset = col_count + 4# 位图中 dx 的偏移 (第 dx + x_offset 位)
+    valid_dict = {}# (朝向, dy) -> 可放置的 dx 位图
+
+    def get_valid(orientation: int, dy: int) -> int:
+        '''可放置的 dx 位图 (一次算出整行, 同 TetrisMatrix.is_state_setable)
+        '''
+        key = (orientation, dy)
+        valid = valid_dict.get(key)
+        if valid is None:
+            left_x, right_x, bottom_y, top_y, row_masks, _, _ = table[orientation]
+            base_row = dy + row_count
+            if bottom_y + base_row < 0 or top_y + base_row >= row_count:
+                valid = 0
+            else:
+                valid = (1 << (col_count - (right_x - left_x))) - 1# 不越界的最左列位图
+                for y, mask in row_masks:
+                    row_mask, bit = row_mask_list[y + base_row], 0
+                    while mask:
+                        if mask & 1:
+                            valid &= ~(row_mask >> bit)
+                        mask >>= 1
+                        bit += 1
+                valid <<= x_offset - left_x - center_col
+            valid_dict[key] = valid
+        return valid
+
+    # 起始位置 (默认与 TetrisEngine.get_new_piece 一致)
+    spawn_orientation, spawn_dx, spawn_dy = start if start else (0, 0, -(1 + table[0][3]))
+    if not get_valid(spawn_orientation, spawn_dy) >> (spawn_dx + x_offset) & 1:
+        return []
+    # 空闲区域底部: 所有朝向的最底部方块都不低于最高列
+    max_height = 0
+    for row in range(row_count - 1, -1, -1):
+        if row_mask_list[row]:
+            max_height = row + 1
+            break
+    free_dy = max(max_height - row_count - bottom_y for _, _, bottom_y, _, _, _, _ in table)
+    start_dy = min(spawn_dy, free_dy)
+    # 逐行搜索可到达状态 (不能上移, 自上而下每行求 平移、旋转 的闭包)
+    rotate_list = [table[orientation][5] for orientation in range(4)]
+    reach_dict = {}# dy -> 各朝向可到达的 dx 位图
+    enter_dict = {}# dy -> 各朝向由上一行下移进入 (或起始) 的 dx 位图
+    rest_list = []# 最终落点状态
+    enter = [0, 0, 0, 0]
+    enter[spawn_orientation] = 1 << (spawn_dx + x_offset)
+    dy = start_dy
+    while any(enter):
+        valid = [get_valid(orientation, dy) for orientation in range(4)]
+        reach = list(enter)
+        changed = True
+        while changed:
+            changed = False
+            for orientation in range(4):
+                mask, valid_mask = reach[orientation], valid[orientation]
+                if mask:# 平移: 在 valid 的连续段内先向高位、再向低位填充 (每次移位距离加倍)
+                    run, shift = valid_mask, 1
+                    while shift <= col_count:
+                        mask |= run & (mask << shift)
+                        run &= run << shift
+                        shift <<= 1
+                    run, shift = valid_mask, 1
+                    while shift <= col_count:
+                        mask |= run & (mask >> shift)
+                        run &= run >> shift
+                        shift <<= 1
+                rotated = rotate_list[orientation]# 旋转
+                grown = reach[rotated] | (mask & valid[rotated])
+                if grown != reach[rotated]:
+                    reach[rotated] = grown
+                    changed = True
+                reach[orientation] = mask
+        reach_dict[dy], enter_dict[dy] = reach, enter
+        # 下移一行
+        enter = [0, 0, 0, 0]
+        for orientation in range(4):
+            below = get_valid(orientation, dy - 1)
+            enter[orientation] = reach[orientation] & below
+            rest = reach[orientation] & ~below
+            while rest:
+                low_bit = rest & -rest
+                rest_list.append((orientation, low_bit.bit_length() - 1 - x_offset, dy))
+                rest ^= low_bit
+        dy -= 1
+    # 每行内的最短操作 (自进入该行的状态起), 按需计算
+    row_parent_dict = {}# dy -> {(朝向, dx): (上一状态, 操作) 或 None (进入该行)}
+
+    def get_row_parent(dy: int) -> dict:
+        '''行内广度优先搜索
+        '''
+        parent_dict = row_parent_dict.get(dy)
+        if parent_dict is None:
+            reach, enter = reach_dict[dy], enter_dict[dy]
+            parent_dict = {}
+            queue = deque()
+            for orientation in range(4):
+                mask = enter[orientation]
+                while mask:
+                    low_bit = mask & -mask
+                    state = (orientation, low_bit.bit_length() - 1 - x_offset)
+                    parent_dict[state] = None
+                    queue.append(state)
+                    mask ^= low_bit
+            while queue:
+                state = queue.popleft()
+                orientation, dx = state
+                for next_state, option in (
+                    ((orientation, dx - 1), _left_shift),
+                    ((orientation, dx + 1), _right_shift),
+                    ((rotate_list[orientation], dx), _rotate),
+                ):
+                    if next_state not in parent_dict and reach[next_state[0]] >> (next_state[1] + x_offset) & 1:
+                        parent_dict[next_state] = (state, option)
+                        queue.append(next_state)
+            row_parent_dict[dy] = parent_dict
+        return parent_dict
+
+    def hoist_path(path: list) -> list:
+        '''加入空闲区域内的下移, 并将空闲区域底部行的平移、旋转尽量提前到较高的行执行
+        (尽早完成平移、旋转, 定时下落时不易被累积方块阻挡)
+        '''
+        descent = spawn_dy - start_dy
+        move_count = 0
+        while move_count < len(path) and path[move_count] != _line_down:
+            move_count += 1
+        for row_dy in range(spawn_dy, start_dy, -1):
+            orientation, dx = spawn_orientation, spawn_dx
+            for option in path[:move_count]:
+                if option == _rotate:
+                    orientation = rotate_list[orientation]
+                else:
+                    dx += -1 if option == _left_shift else 1
+                if not get_valid(orientation, row_dy) >> (dx + x_offset) & 1:
+                    break
+            else:
+                return [_line_down] * (spawn_dy - row_dy) + path[:move_count] + [_line_down] * (row_dy - start_dy) + path[move_count:]
+        return [_line_down] * descent + path
+
+    def trace_path(orientation: int, dx: int, dy: int) -> tuple[TransferOption]:
+        '''回溯落点的操作路径
+        '''
+        path = []# 逆序
+        state, row_dy = (orientation, dx), dy
+        while True:
+            if enter_dict[row_dy][state[0]] >> (state[1] + x_offset) & 1:
+                if row_dy == start_dy:# 起始
+                    break
+                path.append(_line_down)# 由上一行下移进入
+                row_dy += 1
+                continue
+            state, option = get_row_parent(row_dy)[state]# 行内操作
+            path.append(option)
+        path.reverse()
+        return tuple(hoist_path(path))
+
+    # 去重 (路径在访问时回溯)
+    placement_list = []
+    cells_set = set()# 占用方块 (以等价朝向表示)
+    for orientation, dx, dy in rest_list:
+        same_orientation, offset_x, offset_y = table[orientation][6]
+        cells = (same_orientation, dx + offset_x, dy + offset_y)
+        if cells in cells_set:
+            continue
+        cells_set.add(cells)
+        placement_list.append(Placement(orientation, dx, dy, trace_path))
+    return placement_list
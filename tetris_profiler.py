@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 帧耗时统计
+记录每帧各环节的耗时样本 (按键处理、规则更新、面板绘制、下一部件绘制、定时器延迟)
+在面板上叠加显示 FPS 及各环节耗时的 p50/p99, 用于判断卡顿来自规则、绘制还是定时器调度
+原始样本可导出为 JSON 或 Chrome trace 格式 (chrome://tracing、Perfetto 可直接打开)
+"""
+
+
+# 模块信息
+__all__ = ['FrameProfiler']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+# Qt标准库
+from PySide6.QtCore import (Qt, QRect)
+from PySide6.QtGui import (QPainter, QColor, QFontDatabase)
+
+
+# 帧耗时统计
+class FrameProfiler(object):
+    '''帧耗时统计
+    样本: (名称, 开始时间 ns, 耗时 ns), 时间为 time.perf_counter_ns
+    '''
+    _Input = 'input'# 按键处理 (eventFilter 中键值转换及按键状态, 不含规则更新)
+    _Update = 'update'# 规则更新 (按键变换、定时下落、自动玩家、回放)
+    _Paint = 'paint'# 面板绘制 (TetrisBoard.paintEvent)
+    _Next = 'next'# 下一部件绘制
+    _TimerLate = 'timer_late'# 定时器触发相对预定时间的延迟
+    _name_list = (_Input, _Update, _Paint, _Next, _TimerLate)# 叠加显示的顺序
+
+    def __init__(self, max_samples: int = 100000, window: int = 600) -> None:
+        '''构造
+        max_samples: 保留的原始样本数 (超出后丢弃最早的样本)
+        window: 统计 p50/p99 的最近样本数 (每个环节)
+        '''
+        self.__sample_list = deque(maxlen=max_samples)# 原始样本
+        self.__window_dict = {name: deque(maxlen=window) for name in self._name_list}# 最近耗时 (ns)
+        self.__frame_list = deque(maxlen=window)# 最近帧 (面板绘制) 开始时间 (ns)
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[profiler: {len(self.__sample_list)} samples, {self.get_fps():.1f} fps]'
+
+    def clear(self) -> None:
+        '''清除全部样本
+        '''
+        self.__sample_list.clear()
+        for window in self.__window_dict.values():
+            window.clear()
+        self.__frame_list.clear()
+
+    def add_sample(self, name: str, start_ns: int, duration_ns: int) -> None:
+        '''记录样本
+        '''
+        self.__sample_list.append((name, start_ns, duration_ns))
+        window = self.__window_dict.get(name)
+        if window is None:
+            window = self.__window_dict[name] = deque(maxlen=self.__frame_list.maxlen)
+        window.append(duration_ns)
+        if name == self._Paint:
+            self.__frame_list.append(start_ns)
+
+    @contextmanager
+    def measure(self, name: str):
+        '''记录 with 块的耗时
+        '''
+        start_ns = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.add_sample(name, start_ns, time.perf_counter_ns() - start_ns)
+
+    def get_samples(self) -> list[tuple]:
+        '''原始样本 [(名称, 开始时间 ns, 耗时 ns), ...]
+        '''
+        return list(self.__sample_list)
+
+    def get_fps(self) -> float:
+        '''最近 1 秒内的面板绘制次数 (帧率)
+        '''
+        since_ns = time.perf_counter_ns() - 1000000000
+        return float(sum(1 for start_ns in self.__frame_list if start_ns >= since_ns))
+
+    def get_percentile(self, name: str, percent: float) -> float:
+        '''最近样本耗时的百分位数 (毫秒, 无样本为 0)
+        '''
+        window = self.__window_dict.get(name)
+        if not window:
+            return 0.0
+        duration_list = sorted(window)
+        index = min(len(duration_list) - 1, int(len(duration_list) * percent / 100))
+        return duration_list[index] / 1000000
+
+    def get_summary(self) -> dict:
+        '''各环节统计 {名称: {'count', 'p50_ms', 'p99_ms'}}
+        '''
+        return {name: {'count': len(window), 'p50_ms': self.get_percentile(name, 50), 'p99_ms': self.get_percentile(name, 99)}
+                for name, window in self.__window_dict.items()}
+
+    def export_json(self, file_path: str) -> None:
+        '''导出原始样本 (JSON)
+        '''
+        data = {
+            'clock': 'perf_counter_ns',
+            'summary': self.get_summary(),
+            'samples': [{'name': name, 'start_ns': start_ns, 'duration_ns': duration_ns} for name, start_ns, duration_ns in self.__sample_list],
+        }
+        import json# 导出时导入 (不计入启动耗时)
+        with open(file_path, 'w', encoding='utf-8') as fp:
+            json.dump(data, fp, ensure_ascii=False)
+
+    def export_chrome_trace(self, file_path: str) -> None:
+        '''导出 Chrome trace 格式 (完整事件, 时间单位为微秒)
+        '''
+        pid = os.getpid()
+        event_list = [{'name': name, 'cat': 'tetris', 'ph': 'X', 'ts': start_ns / 1000, 'dur': duration_ns / 1000, 'pid': pid, 'tid': 1}
+                      for name, start_ns, duration_ns in self.__sample_list]
+        import json# 导出时导入 (不计入启动耗时)
+        with open(file_path, 'w', encoding='utf-8') as fp:
+            json.dump({'traceEvents': event_list, 'displayTimeUnit': 'ms'}, fp)
+
+    def export(self, file_path: str) -> None:
+        '''按文件名导出 (*.trace.json 为 Chrome trace, 其余为 JSON)
+        '''
+        if file_path.lower().endswith('.trace.json'):
+            self.export_chrome_trace(file_path)
+        else:
+            self.export_json(file_path)
+
+    def get_overlay_rect(self) -> QRect:
+        '''叠加显示区域 (面板左上角)
+        '''
+        return QRect(4, 4, 184, 16 * (len(self._name_list) + 1) + 6)
+
+    def draw_overlay(self, painter: QPainter) -> None:
+        '''绘制 FPS 及各环节耗时
+        '''
+        rect = self.get_overlay_rect()
+        painter.save()
+        painter.fillRect(rect, QColor(0, 0, 0, 160))
+        painter.setPen(QColor(Qt.GlobalColor.white))
+        painter.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        line_list = [f'FPS {self.get_fps():<4.0f} p50/p99 ms']
+        for name in self._name_list:
+            line_list.append(f'{name:<11}{self.get_percentile(name, 50):5.2f}/{self.get_percentile(name, 99):<5.2f}')
+        for index, line in enumerate(line_list):
+            painter.drawText(rect.left() + 4, rect.top() + 16 * (index + 1), line)
+        painter.restore()
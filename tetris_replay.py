@@ -0,0 +1,629 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 录像
+记录一局游戏的随机种子及带时间戳的部件变换 (含定时下落), 保存为紧凑的二进制文件
+回放时以相同种子重新开始并依次执行变换, 可在界面中按原速回放, 或无界面全速回放
+每 K 个部件保存一个关键帧 (面板、数据、生成器状态), 跳转到任意部件数只需自最近的关键帧回放至多 K 个部件
+
+文件格式 (整数均为 varint):
+    文件头: b'TTRP', 版本 (1 字节), 种子 (zigzag), 生成方式, 预览部件数, 行数, 列数, 初始等级, 等级+1 所需部件数
+    事件: (与上一事件的间隔毫秒 << 4) | 代码
+        代码 0~5: 按键变换 (TransferOption), 代码 | 8: 定时下落, 代码 15: 录像结束
+    关键帧 (版本 2): 见 Keyframe.to_bytes
+    索引 (版本 2, 定长小端, 可直接 mmap): 每个关键帧一项 <IIIQQ> (部件数, 时间, 事件索引, 事件位置, 关键帧位置)
+    文件尾 (版本 2): <QI4s> (索引位置, 关键帧数, b'TKIX')
+
+用法: python tetris_replay.py replays/*.tetr --repeat 10 --seek 1000 --json result.json
+"""
+
+
+# 模块信息
+__all__ = ['ReplayEvent', 'Keyframe', 'Replay', 'ReplayIndex', 'ReplayRecorder', 'ReplayPlayer', 'play_headless']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import os
+import sys
+import json
+import mmap
+import time
+import bisect
+import struct
+import argparse
+from typing import NamedTuple
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_engine import (TransferOption, GameState, EngineEvent, TetrisData, TetrisEngine)# 游戏规则
+from tetris_piece import Shape# 游戏部件
+from tetris_generator import (GeneratorMode, PieceGenerator)# 部件生成器
+
+
+# 文件格式
+_magic = b'TTRP'# 文件标识
+_version = 2# 版本 (1: 无关键帧)
+_code_bits = 4# 事件代码位数
+_gravity_flag = 0b1000# 定时下落标记
+_end_code = 0b1111# 录像结束
+_index_struct = struct.Struct('<IIIQQ')# 索引项
+_trailer_struct = struct.Struct('<QI4s')# 文件尾
+_trailer_magic = b'TKIX'# 文件尾标识
+_random_struct = struct.Struct('<625I')# 随机数内部状态 (Mersenne Twister)
+
+
+def _write_varint(buffer: bytearray, value: int) -> None:
+    '''写入无符号 varint
+    '''
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int]:
+    '''读取无符号 varint
+    return: (值, 下一位置)
+    '''
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _zigzag(value: int) -> int:
+    '''有符号 -> 无符号
+    '''
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    '''无符号 -> 有符号
+    '''
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+# 录像事件
+class ReplayEvent(NamedTuple):
+    '''录像事件
+    '''
+    time_ms: int# 自开始的时间 (毫秒, 不含暂停)
+    option: TransferOption# 部件变换
+    gravity: bool# 定时下落 (否则为按键)
+
+
+# 关键帧
+class Keyframe(NamedTuple):
+    '''关键帧
+    部件抵达、新部件出现后的完整状态
+    '''
+    pieces_dropped: int# 累计下落部件
+    event_index: int# 之后的第一个事件索引
+    time_ms: int# 时间 (即最后一个已执行事件的时间)
+    score: int# 分数
+    level: int# 等级
+    lines_removed: int# 累计移除行数
+    curr_shape: int# 当前部件形状 (位于起始位置)
+    occupants: bytes# 面板占用者 (TetrisMatrix.dump_occupants)
+    generator_state: tuple# 生成器状态 (PieceGenerator.getstate)
+
+    @classmethod
+    def from_engine(cls, engine: TetrisEngine, event_index: int, time_ms: int) -> 'Keyframe':
+        '''保存引擎当前状态 (新部件刚出现时)
+        '''
+        data = engine.get_data()
+        return cls(data._pieces_dropped, event_index, time_ms, data._score, data._level, data._lines_removed,
+                   int(engine.get_curr_piece().get_shape()), engine.get_matrix().dump_occupants(), engine.get_generator().getstate())
+
+    def restore(self, engine: TetrisEngine) -> None:
+        '''恢复引擎状态 (引擎以录像参数创建)
+        '''
+        engine.start()# 状态、数据、面板
+        engine.get_matrix().load_occupants(self.occupants)
+        data = engine.get_data()
+        data._pieces_dropped, data._score, data._level, data._lines_removed = self.pieces_dropped, self.score, self.level, self.lines_removed
+        engine.get_generator().setstate(self.generator_state)
+        engine.restore_piece(self.curr_shape)
+
+    def to_bytes(self) -> bytes:
+        '''编码
+        varint: 部件数, 事件索引, 时间, 分数, 等级, 移除行数, 当前形状, 方块数
+        占用者: 每字节 2 个方块 (低 4 位在前)
+        生成器: 袋中形状数 + 形状, 预览数 + 形状, 随机数内部状态 (625 个 uint32)
+        '''
+        buffer = bytearray()
+        for value in (self.pieces_dropped, self.event_index, self.time_ms, self.score, self.level, self.lines_removed,
+                      self.curr_shape, len(self.occupants)):
+            _write_varint(buffer, value)
+        occupants = self.occupants + b'\0' * (len(self.occupants) % 2)
+        buffer += bytes(occupants[i] | (occupants[i + 1] << 4) for i in range(0, len(occupants), 2))
+        random_state, bag, preview = self.generator_state
+        for shape_list in (bag, preview):
+            _write_varint(buffer, len(shape_list))
+            buffer += bytes(shape_list)
+        buffer += _random_struct.pack(*random_state[1])
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, pos: int = 0) -> 'Keyframe':
+        '''解码
+        '''
+        value_list = []
+        for _ in range(8):
+            value, pos = _read_varint(data, pos)
+            value_list.append(value)
+        cell_count = value_list.pop()
+        packed = data[pos:pos + (cell_count + 1) // 2]
+        pos += len(packed)
+        occupants = bytes(value for byte in packed for value in (byte & 0x0F, byte >> 4))[:cell_count]
+        shape_lists = []
+        for _ in range(2):
+            count, pos = _read_varint(data, pos)
+            shape_lists.append(tuple(Shape(shape) for shape in data[pos:pos + count]))
+            pos += count
+        random_state = (3, _random_struct.unpack_from(data, pos), None)
+        return cls(*value_list, occupants, (random_state, *shape_lists))
+
+
+# 录像
+class Replay(object):
+    '''录像
+    一局游戏的开始参数及事件序列
+    '''
+    def __init__(self, seed: int, mode: GeneratorMode, preview_count: int, row_count: int, col_count: int,
+                 start_level: int, update_level_count: int) -> None:
+        '''构造
+        '''
+        self.seed = seed# 随机种子
+        self.mode = GeneratorMode(mode)# 生成方式
+        self.preview_count = preview_count# 预览部件数
+        self.row_count = row_count# 面板行数
+        self.col_count = col_count# 面板列数
+        self.start_level = start_level# 初始等级
+        self.update_level_count = update_level_count# 等级+1 所需部件数
+        self.event_list: list[ReplayEvent] = []# 事件
+        self.keyframe_list: list[Keyframe] = []# 关键帧 (按部件数递增)
+        self.end_ms = 0# 录像结束时间
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[replay: seed {self.seed}, {self.row_count} x {self.col_count}, {len(self.event_list)} events, {len(self.keyframe_list)} keyframes, {self.end_ms} ms]'
+
+    @classmethod
+    def from_engine(cls, engine: TetrisEngine) -> 'Replay':
+        '''以引擎当前一局的参数创建录像 (引擎已开始)
+        '''
+        generator, matrix, data = engine.get_generator(), engine.get_matrix(), engine.get_data()
+        return cls(generator.get_game_seed(), generator.get_mode(), generator.get_preview_count(),
+                   matrix.get_row_count(), matrix.get_col_count(), data.get_start_level(), data.get_update_level_count())
+
+    def create_engine(self) -> TetrisEngine:
+        '''以录像参数创建引擎 (未开始)
+        '''
+        data = TetrisData(self.start_level, self.update_level_count)
+        generator = PieceGenerator(self.seed, self.mode, self.preview_count)
+        return TetrisEngine(self.row_count, self.col_count, data, generator=generator)
+
+    def to_bytes(self) -> bytes:
+        '''编码
+        '''
+        buffer = bytearray(_magic)
+        buffer.append(_version)
+        _write_varint(buffer, _zigzag(self.seed))
+        for value in (self.mode, self.preview_count, self.row_count, self.col_count, self.start_level, self.update_level_count):
+            _write_varint(buffer, value)
+        # 事件
+        event_pos_list = []# 各事件位置
+        last_ms = 0
+        for event in self.event_list:
+            event_pos_list.append(len(buffer))
+            code = int(event.option) | (_gravity_flag if event.gravity else 0)
+            _write_varint(buffer, ((event.time_ms - last_ms) << _code_bits) | code)
+            last_ms = event.time_ms
+        event_pos_list.append(len(buffer))
+        _write_varint(buffer, ((self.end_ms - last_ms) << _code_bits) | _end_code)
+        # 关键帧
+        keyframe_pos_list = []
+        for keyframe in self.keyframe_list:
+            keyframe_pos_list.append(len(buffer))
+            buffer += keyframe.to_bytes()
+        # 索引
+        index_pos = len(buffer)
+        for keyframe, keyframe_pos in zip(self.keyframe_list, keyframe_pos_list):
+            buffer += _index_struct.pack(keyframe.pieces_dropped, keyframe.time_ms, keyframe.event_index,
+                                         event_pos_list[keyframe.event_index], keyframe_pos)
+        buffer += _trailer_struct.pack(index_pos, len(self.keyframe_list), _trailer_magic)
+        return bytes(buffer)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'Replay':
+        '''解码
+        '''
+        replay, pos = cls._read_header(data)
+        # 事件
+        for event in _iter_events(data, pos, 0):
+            if event.option is None:
+                replay.end_ms = event.time_ms
+                break
+            replay.event_list.append(event)
+        # 关键帧
+        if data[len(_magic)] >= 2:
+            index_pos, count, _ = _trailer_struct.unpack_from(data, len(data) - _trailer_struct.size)
+            for i in range(count):
+                keyframe_pos = _index_struct.unpack_from(data, index_pos + i * _index_struct.size)[-1]
+                replay.keyframe_list.append(Keyframe.from_bytes(data, keyframe_pos))
+        return replay
+
+    @classmethod
+    def _read_header(cls, data: bytes) -> tuple:
+        '''解码文件头
+        return: (录像 (无事件), 事件起始位置)
+        '''
+        if data[:len(_magic)] != _magic or data[len(_magic)] not in (1, _version):
+            raise ValueError('not a replay file')
+        pos = len(_magic) + 1
+        value_list = []
+        for _ in range(7):
+            value, pos = _read_varint(data, pos)
+            value_list.append(value)
+        return cls(_unzigzag(value_list[0]), *value_list[1:]), pos
+
+    def find_keyframe(self, pieces_dropped: int) -> Keyframe:
+        '''部件数不超过 pieces_dropped 的最后一个关键帧 (无则为 None)
+        '''
+        index = bisect.bisect_right(self.keyframe_list, pieces_dropped, key=lambda keyframe: keyframe.pieces_dropped)
+        return self.keyframe_list[index - 1] if index else None
+
+    def save(self, file_path: str) -> None:
+        '''保存到文件
+        '''
+        dir_path = os.path.dirname(os.path.abspath(file_path))
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path)
+        with open(file_path, 'wb') as fp:
+            fp.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, file_path: str) -> 'Replay':
+        '''从文件加载
+        '''
+        with open(file_path, 'rb') as fp:
+            return cls.from_bytes(fp.read())
+
+
+def _iter_events(data: bytes, pos: int, time_ms: int):
+    '''自 pos 处依次解码事件, 至录像结束
+    time_ms: pos 之前最后一个事件的时间
+    最后产生的事件的 option 为 None, 表示录像结束 (time_ms 为结束时间)
+    '''
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        time_ms += value >> _code_bits
+        code = value & _end_code
+        if code == _end_code:
+            yield ReplayEvent(time_ms, None, False)
+            return
+        yield ReplayEvent(time_ms, TransferOption(code & ~_gravity_flag), bool(code & _gravity_flag))
+
+
+# 录像索引
+class ReplayIndex(object):
+    '''录像索引
+    以 mmap 打开录像文件, 只读取文件头和定长索引, 关键帧和事件按需解码
+    可在不加载整个录像的情况下跳转到任意部件数
+    '''
+    def __init__(self, file_path: str) -> None:
+        '''构造
+        '''
+        with open(file_path, 'rb') as fp:
+            self.__data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__replay, _ = Replay._read_header(self.__data)# 录像参数 (无事件)
+        self.__index_pos, self.__count = 0, 0
+        if self.__data[len(_magic)] >= 2:
+            self.__index_pos, self.__count, _ = _trailer_struct.unpack_from(self.__data, len(self.__data) - _trailer_struct.size)
+
+    def __enter__(self) -> 'ReplayIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        '''关闭文件
+        '''
+        self.__data.close()
+
+    def get_replay(self) -> Replay:
+        '''录像参数 (不含事件、关键帧)
+        '''
+        return self.__replay
+
+    def get_count(self) -> int:
+        '''关键帧数
+        '''
+        return self.__count
+
+    def get_entry(self, index: int) -> tuple[int]:
+        '''索引项 (部件数, 时间, 事件索引, 事件位置, 关键帧位置)
+        '''
+        return _index_struct.unpack_from(self.__data, self.__index_pos + index * _index_struct.size)
+
+    def find(self, pieces_dropped: int) -> int:
+        '''部件数不超过 pieces_dropped 的最后一个关键帧的索引 (无则为 -1)
+        '''
+        low, high = 0, self.__count
+        while low < high:
+            mid = (low + high) // 2
+            if self.get_entry(mid)[0] <= pieces_dropped:
+                low = mid + 1
+            else:
+                high = mid
+        return low - 1
+
+    def seek(self, engine: TetrisEngine, pieces_dropped: int) -> int:
+        '''将引擎推进到 pieces_dropped 个部件落下后 (自最近的关键帧起回放)
+        engine: 以录像参数创建的引擎 (Replay.create_engine)
+        return: 下一事件索引
+        '''
+        index = self.find(pieces_dropped)
+        if index >= 0:
+            _, time_ms, event_index, event_pos, keyframe_pos = self.get_entry(index)
+            Keyframe.from_bytes(self.__data, keyframe_pos).restore(engine)
+        else:
+            time_ms, event_index = 0, 0
+            event_pos = Replay._read_header(self.__data)[1]
+            engine.start(self.__replay.seed)
+        data = engine.get_data()
+        for event in _iter_events(self.__data, event_pos, time_ms):
+            if event.option is None or data._pieces_dropped >= pieces_dropped or engine.get_state() != GameState.Run:
+                break
+            engine.step(event.option)
+            event_index += 1
+        return event_index
+
+
+# 录像时钟
+class _ReplayClock(object):
+    '''录像时钟 (单调时钟, 暂停期间不计时)
+    '''
+    def __init__(self) -> None:
+        '''构造
+        '''
+        self.reset_clock()
+
+    def reset_clock(self) -> None:
+        '''从 0 开始计时
+        '''
+        self.__start_ns = time.monotonic_ns()# 计时起点
+        self.__pause_ns = 0# 暂停时刻 (0 为未暂停)
+
+    def pause(self) -> None:
+        '''暂停计时
+        '''
+        if not self.__pause_ns:
+            self.__pause_ns = time.monotonic_ns()
+
+    def resume(self) -> None:
+        '''恢复计时
+        '''
+        if self.__pause_ns:
+            self.__start_ns += time.monotonic_ns() - self.__pause_ns
+            self.__pause_ns = 0
+
+    def get_ms(self) -> int:
+        '''已计时毫秒
+        '''
+        return ((self.__pause_ns or time.monotonic_ns()) - self.__start_ns) // 1000000
+
+    def set_ms(self, time_ms: int) -> None:
+        '''设置已计时毫秒 (跳转)
+        '''
+        self.__start_ns = (self.__pause_ns or time.monotonic_ns()) - time_ms * 1000000
+
+
+# 录像记录
+class ReplayRecorder(_ReplayClock):
+    '''录像记录
+    start 后通过 record 记录每次部件变换, 每 keyframe_interval 个部件保存关键帧, finish 得到录像
+    '''
+    def __init__(self, keyframe_interval: int = 50) -> None:
+        '''构造
+        keyframe_interval: 关键帧间隔部件数 (0 为不保存关键帧)
+        '''
+        super().__init__()
+        self.__keyframe_interval = keyframe_interval# 关键帧间隔
+        self.__replay = None# 当前录像
+        self.__engine = None# 记录的引擎
+
+    def is_recording(self) -> bool:
+        '''记录中
+        '''
+        return self.__replay is not None
+
+    def start(self, engine: TetrisEngine) -> None:
+        '''开始记录 (引擎已开始新的一局)
+        '''
+        self.finish()
+        self.reset_clock()
+        self.__replay = Replay.from_engine(engine)
+        self.__engine = engine
+        engine.add_listener(self.on_engine_event)
+
+    def record(self, option: TransferOption, gravity: bool = False) -> None:
+        '''记录部件变换
+        gravity: 定时下落
+        '''
+        if self.__replay is not None:
+            self.__replay.event_list.append(ReplayEvent(self.get_ms(), option, gravity))
+
+    def on_engine_event(self, event: EngineEvent) -> None:
+        '''引擎事件: 每 keyframe_interval 个部件保存关键帧
+        '''
+        if event != EngineEvent.NewPiece or not self.__keyframe_interval or self.__replay is None:
+            return None
+        pieces_dropped = self.__engine.get_data()._pieces_dropped
+        event_list = self.__replay.event_list
+        if pieces_dropped and pieces_dropped % self.__keyframe_interval == 0 and event_list:
+            self.__replay.keyframe_list.append(Keyframe.from_engine(self.__engine, len(event_list), event_list[-1].time_ms))
+
+    def finish(self) -> Replay:
+        '''结束记录
+        return: 录像 (未在记录时为 None)
+        '''
+        if self.__engine:
+            self.__engine.remove_listener(self.on_engine_event)
+            self.__engine = None
+        replay, self.__replay = self.__replay, None
+        if replay is not None:
+            replay.end_ms = max(self.get_ms(), replay.event_list[-1].time_ms if replay.event_list else 0)
+        return replay
+
+
+# 录像回放
+class ReplayPlayer(_ReplayClock):
+    '''录像回放
+    按录像时间执行事件 (界面定时调用 play_due), 或一次执行全部事件 (play_all)
+    '''
+    def __init__(self, replay: Replay, engine: TetrisEngine) -> None:
+        '''构造
+        engine: 执行回放的引擎 (面板大小需与录像一致)
+        '''
+        super().__init__()
+        self.__replay = replay# 录像
+        self.__engine = engine# 引擎
+        self.__index = 0# 下一事件索引
+
+    def get_replay(self) -> Replay:
+        '''录像
+        '''
+        return self.__replay
+
+    def start(self) -> None:
+        '''以录像的种子开始新的一局
+        '''
+        self.reset_clock()
+        self.__index = 0
+        self.__engine.start(self.__replay.seed)
+
+    def seek(self, pieces_dropped: int) -> None:
+        '''跳转到 pieces_dropped 个部件落下后 (自最近的关键帧起回放)
+        '''
+        keyframe = self.__replay.find_keyframe(pieces_dropped)
+        if keyframe:
+            keyframe.restore(self.__engine)
+            self.__index = keyframe.event_index
+        else:
+            self.__engine.start(self.__replay.seed)
+            self.__index = 0
+        event_list, engine = self.__replay.event_list, self.__engine
+        data = engine.get_data()
+        while self.__index < len(event_list) and data._pieces_dropped < pieces_dropped and engine.get_state() == GameState.Run:
+            engine.step(event_list[self.__index].option)
+            self.__index += 1
+        self.set_ms(event_list[self.__index - 1].time_ms if self.__index else 0)
+
+    def is_finished(self) -> bool:
+        '''回放结束
+        '''
+        return self.__index >= len(self.__replay.event_list) or self.__engine.get_state() == GameState.End
+
+    def get_wait_ms(self) -> int:
+        '''距下一事件的毫秒数
+        '''
+        if self.__index >= len(self.__replay.event_list):
+            return max(0, self.__replay.end_ms - self.get_ms())
+        return max(0, self.__replay.event_list[self.__index].time_ms - self.get_ms())
+
+    def play_due(self) -> int:
+        '''执行已到时间的事件
+        return: 执行的事件数
+        '''
+        event_list, engine = self.__replay.event_list, self.__engine
+        now_ms, start_index = self.get_ms(), self.__index
+        while self.__index < len(event_list) and event_list[self.__index].time_ms <= now_ms:
+            engine.step(event_list[self.__index].option)
+            self.__index += 1
+        return self.__index - start_index
+
+    def play_all(self) -> int:
+        '''全速执行剩余全部事件
+        return: 执行的事件数
+        '''
+        event_list, engine = self.__replay.event_list, self.__engine
+        start_index = self.__index
+        for event in event_list[start_index:]:
+            engine.step(event.option)
+        self.__index = len(event_list)
+        return self.__index - start_index
+
+
+def play_headless(replay: Replay) -> TetrisEngine:
+    '''无界面全速回放
+    return: 回放结束时的引擎
+    '''
+    engine = replay.create_engine()
+    player = ReplayPlayer(replay, engine)
+    player.start()
+    player.play_all()
+    return engine
+
+
+def main(argv: list[str] = None) -> int:
+    '''命令行入口: 无界面回放录像, 输出结果及速度
+    '''
+    parser = argparse.ArgumentParser(description='俄罗斯方块 录像回放 (无界面)')
+    parser.add_argument('files', nargs='+', help='录像文件')
+    parser.add_argument('--repeat', type=int, default=1, help='每个录像回放次数')
+    parser.add_argument('--seek', type=int, default=0, help='测试以索引跳转到此部件数的耗时')
+    parser.add_argument('--json', default='', help='结果输出的 JSON 文件路径')
+    args = parser.parse_args(argv)
+    GlobalConfig.load_file(os.path.dirname(os.path.abspath(__file__)), '俄罗斯方块配置')
+    # 回放
+    result_list = []
+    total_events = total_seconds = 0
+    for file_path in args.files:
+        replay = Replay.load(file_path)
+        start_time = time.perf_counter()
+        for _ in range(args.repeat):
+            engine = play_headless(replay)
+        seconds = time.perf_counter() - start_time
+        data = engine.get_data()
+        result_list.append({
+            'file': file_path,
+            'events': len(replay.event_list),
+            'score': data._score,
+            'lines_removed': data._lines_removed,
+            'pieces_dropped': data._pieces_dropped,
+            'game_over': engine.get_state() == GameState.End,
+            'events_per_second': len(replay.event_list) * args.repeat / seconds if seconds else 0.0,
+        })
+        total_events += len(replay.event_list) * args.repeat
+        total_seconds += seconds
+        print(f'{file_path}: score {data._score}, lines {data._lines_removed}, pieces {data._pieces_dropped}, '
+              f'{result_list[-1]["events_per_second"]:.0f} events/s')
+        # 跳转
+        if args.seek:
+            start_time = time.perf_counter()
+            with ReplayIndex(file_path) as replay_index:
+                engine = replay_index.get_replay().create_engine()
+                replay_index.seek(engine, args.seek)
+            result_list[-1]['seek_seconds'] = time.perf_counter() - start_time
+            print(f'    seek to piece {engine.get_data()._pieces_dropped}: {result_list[-1]["seek_seconds"] * 1000:.1f} ms')
+    if total_seconds:
+        print(f'total: {total_events} events, {total_events / total_seconds:.0f} events/s')
+    # 输出
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump(result_list, fp, ensure_ascii=False, indent=2)
+    return 0
+
+
+# 主程序入口
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 绘制调度
+各处只标记需要刷新的控件区域, 由调度器合并后每帧最多提交一次 update()
+帧率上限保存在配置节 tetris_game 中 (frame_rate_cap, 0 为不限制, 立即提交)
+按键连发时同一帧内的多次变换只绘制一次
+"""
+
+
+# 模块信息
+__all__ = ['FrameScheduler']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import time
+# Qt标准库
+from PySide6.QtCore import (Qt, Slot, QObject, QRect, QTimer)
+from PySide6.QtGui import QRegion
+from PySide6.QtWidgets import QWidget
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+
+
+# 绘制调度
+class FrameScheduler(QObject):
+    '''绘制调度
+    合并各控件的刷新区域, 按帧率上限定时提交
+    '''
+    __config_section = 'tetris_game'# 配置节 (与游戏界面共用)
+
+    def __init__(self, frame_rate_cap: int = None, parent=None) -> None:
+        '''构造
+        frame_rate_cap: 帧率上限 (None 使用配置, 0 为不限制)
+        '''
+        super().__init__(parent)# 访问父类的方法和属性
+        self.load_config()# 加载配置
+        if frame_rate_cap is not None:
+            self.__frame_rate_cap = max(0, frame_rate_cap)
+        self.__dirty_dict = {}# 控件 -> 待刷新区域 (None 为整个控件)
+        self.__last_flush_ns = 0# 上次提交时间
+        self.__request_count = 0# 累计刷新请求次数
+        self.__flush_count = 0# 累计提交次数
+        self.__timer = QTimer(self)# 定时器 (单次, 到下一帧时提交)
+        self.__timer.setSingleShot(True)
+        self.__timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.__timer.timeout.connect(self.flush)
+
+    def __repr__(self) -> str:
+        '''实例化对象的输出信息
+        '''
+        return f'[scheduler: {self.__frame_rate_cap} fps cap, {self.__request_count} requests, {self.__flush_count} flushes]'
+
+    def load_config(self) -> None:
+        '''加载配置
+        '''
+        # 帧率上限 (0 为不限制)
+        self.__frame_rate_cap = GlobalConfig.load_int(self.__config_section, 'frame_rate_cap', 60, 0)
+
+    def save_config(self) -> None:
+        '''保存配置
+        '''
+        # 帧率上限
+        GlobalConfig.save(self.__config_section, 'frame_rate_cap', str(self.__frame_rate_cap))
+
+    def get_frame_rate_cap(self) -> int:
+        '''帧率上限 (0 为不限制)
+        '''
+        return self.__frame_rate_cap
+
+    def set_frame_rate_cap(self, frame_rate_cap: int) -> None:
+        '''设置帧率上限 (0 为不限制)
+        '''
+        self.__frame_rate_cap = max(0, frame_rate_cap)
+
+    def get_counts(self) -> tuple[int]:
+        '''(累计刷新请求次数, 累计提交次数)
+        '''
+        return self.__request_count, self.__flush_count
+
+    def mark_dirty(self, widget: QWidget, area: QRect | QRegion = None) -> None:
+        '''标记控件需要刷新
+        area: 刷新区域 (None 为整个控件)
+        '''
+        self.__request_count += 1
+        if widget in self.__dirty_dict:
+            region = self.__dirty_dict[widget]
+            if region is not None:
+                self.__dirty_dict[widget] = None if area is None else region.united(area)
+        else:
+            self.__dirty_dict[widget] = None if area is None else QRegion(area)
+        # 定时提交
+        if self.__timer.isActive():
+            return None
+        if not self.__frame_rate_cap:
+            self.flush()
+            return None
+        wait_ns = self.__last_flush_ns + 1000000000 // self.__frame_rate_cap - time.perf_counter_ns()
+        self.__timer.start(max(0, wait_ns // 1000000))
+
+    @Slot()# 槽
+    def flush(self) -> None:
+        '''提交全部待刷新区域 (Qt 在本次事件循环中绘制)
+        '''
+        self.__timer.stop()
+        dirty_dict, self.__dirty_dict = self.__dirty_dict, {}
+        for widget, region in dirty_dict.items():
+            if region is None:
+                widget.update()
+            elif not region.isEmpty():
+                widget.update(region)
+        self.__last_flush_ns = time.perf_counter_ns()
+        if dirty_dict:
+            self.__flush_count += 1
@@ -4,6 +4,9 @@
 """俄罗斯方块 游戏方块
 面板方块: 记录占用当前面板方块的部件信息
 部件方块: 相当于二维点坐标
+方块按 (颜色, 大小, 设备像素比) 预先绘制为贴图并缓存, 绘制时直接贴图
+同色的多个方块可批量绘制 (draw_squares): 填充、亮边、暗边各一次调用, 画笔/画刷只切换 3 次
+    各位置方块的填充矩形、边框线按 (top, left) 缓存, 绘制时不再创建对象
 """
 
 
@@ -16,8 +19,8 @@ __author__ = 'lihua.tan'
 # python库
 from typing import Union
 # Qt标准库
-from PySide6.QtCore import (QRect)
-from PySide6.QtGui import (QPainter, QColor)
+from PySide6.QtCore import (Qt, QRect, QLine)
+from PySide6.QtGui import (QPainter, QColor, QPixmap)
 # 自封装库
 pass
 
@@ -29,6 +32,10 @@ class BoardSquare(object):
     """
     # 方块大小
     _width, _height = 10, 10
+    # 方块贴图缓存 {(颜色, 宽, 高, 设备像素比): QPixmap}
+    _sprite_dict = {}
+    # 方块几何缓存 {(top, left): (填充矩形, 左上角边框线, 右下角边框线)}
+    _geometry_dict = {}
 
     def __init__(self) -> None:
         """构造
@@ -80,8 +87,11 @@ class BoardSquare(object):
     
     @classmethod
     def resize(cls, width: int, height: int) -> None:
-        '''方块大小
+        '''方块大小 (大小改变时清空贴图缓存)
         '''
+        if int(width) != int(cls._width) or int(height) != int(cls._height):
+            cls._sprite_dict.clear()
+            cls._geometry_dict.clear()
         cls._width = width
         cls._height = height
 
@@ -94,17 +104,27 @@ class BoardSquare(object):
         return cls._height
 
     @classmethod
-    def draw(cls, painter: QPainter, top: int, left: int, color: QColor, size=0) -> None:
-        '''绘制方块
+    def get_sprite(cls, color: QColor, width: int, height: int, pixel_ratio: float) -> QPixmap:
+        '''方块贴图 (首次使用时绘制并缓存)
+        '''
+        key = (color.rgba(), width, height, pixel_ratio)
+        sprite = cls._sprite_dict.get(key)
+        if sprite is None:
+            sprite = QPixmap(round(width * pixel_ratio), round(height * pixel_ratio))
+            sprite.setDevicePixelRatio(pixel_ratio)
+            sprite.fill(Qt.GlobalColor.transparent)
+            with QPainter(sprite) as painter:
+                cls.draw_square(painter, QRect(0, 0, width, height), color)
+            cls._sprite_dict[key] = sprite
+        return sprite
+
+    @classmethod
+    def draw_square(cls, painter: QPainter, rect: QRect, color: QColor) -> None:
+        '''绘制方块 (逐个绘制填充和边框, 用于生成贴图)
         painter: 绘图工具
-        top_left_point: 方块左上角坐标
-        color: 表示颜色的16进制数
-        '''
-        # 方块矩阵
-        if size:
-            rect = QRect(left, top, size, size)
-        else:
-            rect = QRect(left, top, cls._width, cls._height)
+        rect: 方块矩阵
+        color: 方块颜色
+        '''
         # 内部填充
         rect.adjust(1, 1, -1, -1)# 调整: 左上角 (1, 1) 向内收缩 1, 右下角 (-1, -1) 向内收缩 1
         painter.fillRect(rect, color)
@@ -118,6 +138,55 @@ class BoardSquare(object):
         painter.drawLine(rect.bottomRight(), rect.topRight())
         painter.drawLine(rect.bottomRight(), rect.bottomLeft())
 
+    @classmethod
+    def create_geometry(cls, top: int, left: int) -> tuple:
+        '''方块几何 (与 draw_square 的绘制区域相同)
+        return: (填充矩形, 左上角的两条边框, 右下角的两条边框)
+        '''
+        width, height = int(cls._width), int(cls._height)
+        right, bottom = left + width - 1, top + height - 1
+        return (QRect(left + 1, top + 1, width - 2, height - 2),
+                (QLine(left, top, right, top), QLine(left, top, left, bottom)),
+                (QLine(right, bottom, right, top), QLine(right, bottom, left, bottom)))
+
+    @classmethod
+    def draw_squares(cls, painter: QPainter, color: QColor, top_left_list: list[tuple]) -> None:
+        '''批量绘制同色方块 (与 draw_square 的像素相同)
+        painter: 绘图工具
+        color: 方块颜色
+        top_left_list: 方块左上角坐标 [(top, left), ...]
+        '''
+        geometry_dict = cls._geometry_dict
+        fill_list, light_list, dark_list = [], [], []
+        for top, left in top_left_list:
+            key = (int(top), int(left))
+            geometry = geometry_dict.get(key)
+            if geometry is None:
+                geometry = geometry_dict[key] = cls.create_geometry(*key)
+            fill_list.append(geometry[0])
+            light_list += geometry[1]
+            dark_list += geometry[2]
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        painter.drawRects(fill_list)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        painter.setPen(color.lighter())
+        painter.drawLines(light_list)
+        painter.setPen(color.darker())
+        painter.drawLines(dark_list)
+
+    @classmethod
+    def draw(cls, painter: QPainter, top: int, left: int, color: QColor, size=0) -> None:
+        '''绘制方块 (贴图)
+        painter: 绘图工具
+        top, left: 方块左上角坐标
+        color: 方块颜色
+        size: 方块边长 (0 为当前方块大小)
+        '''
+        width, height = (size, size) if size else (cls._width, cls._height)
+        sprite = cls.get_sprite(color, int(width), int(height), painter.device().devicePixelRatioF())
+        painter.drawPixmap(int(left), int(top), sprite)
+
 
 # 部件方块
 class PieceSquare(BoardSquare):
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 启动耗时统计
+记录自程序入口到首帧绘制完成的各阶段耗时 (导入、创建应用程序、加载配置、setupUi、首帧绘制)
+未开始统计时 mark / finish 不做任何处理, 不依赖 Qt, 可在导入 Qt 之前使用
+"""
+
+
+# 模块信息
+__all__ = ['StartupProfiler']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import sys
+import time
+
+
+# 启动耗时统计
+class StartupProfiler(object):
+    '''启动耗时统计 (全局)
+    '''
+    _running = False# 统计中
+    _start_ns = 0# 统计起点
+    _mark_list = []# [(阶段名称, 结束时刻 ns), ...]
+    _finish_callback = None# 统计结束的回调 (参数为报告文本)
+
+    @classmethod
+    def start(cls, finish_callback=None) -> None:
+        '''开始统计
+        finish_callback: 统计结束的回调 (参数为报告文本, None 为输出到 stderr)
+        '''
+        cls._running = True
+        cls._start_ns = time.perf_counter_ns()
+        cls._mark_list = []
+        cls._finish_callback = finish_callback
+
+    @classmethod
+    def is_running(cls) -> bool:
+        '''统计中
+        '''
+        return cls._running
+
+    @classmethod
+    def mark(cls, name: str) -> None:
+        '''记录阶段结束 (阶段自上一阶段结束时开始)
+        '''
+        if cls._running:
+            cls._mark_list.append((name, time.perf_counter_ns()))
+
+    @classmethod
+    def finish(cls, name: str = 'first_paint') -> None:
+        '''记录最后阶段并结束统计, 输出报告 (已结束时不处理)
+        '''
+        if not cls._running:
+            return None
+        cls.mark(name)
+        cls._running = False
+        report = cls.get_report()
+        if cls._finish_callback:
+            cls._finish_callback(report)
+        else:
+            print(report, file=sys.stderr)
+
+    @classmethod
+    def get_phases(cls) -> list[tuple]:
+        '''各阶段耗时 [(阶段名称, 耗时 ms), ...]
+        '''
+        phase_list = []
+        last_ns = cls._start_ns
+        for name, end_ns in cls._mark_list:
+            phase_list.append((name, (end_ns - last_ns) / 1000000))
+            last_ns = end_ns
+        return phase_list
+
+    @classmethod
+    def get_report(cls) -> str:
+        '''报告文本
+        '''
+        line_list = [f'{"phase":<16}{"ms":>10}{"total ms":>12}']
+        total_ms = 0.0
+        for name, duration_ms in cls.get_phases():
+            total_ms += duration_ms
+            line_list.append(f'{name:<16}{duration_ms:>10.1f}{total_ms:>12.1f}')
+        line_list.append(f'time to first frame: {total_ms:.1f} ms')
+        return '\n'.join(line_list)
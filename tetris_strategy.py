@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 自动玩家策略
+策略根据游戏引擎的当前状态给出下一步部件变换
+通过 register_strategy 注册后可按名称创建 (如 比赛脚本)
+HeuristicStrategy 以启发式评价全部可到达落点, 可在游戏界面中作为自动玩家
+"""
+
+
+# 模块信息
+__all__ = ['TetrisStrategy', 'RandomStrategy', 'DropStrategy', 'HeuristicStrategy', 'register_strategy', 'create_strategy', 'get_strategy_names']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import time
+import random
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_piece import (Shape, ShapeTable)# 游戏部件
+from tetris_engine import (TransferOption, TetrisEngine)# 游戏规则
+from tetris_placement import (Placement, get_placements)# 落点枚举
+
+
+# 策略基类
+class TetrisStrategy(object):
+    '''自动玩家策略
+    '''
+    def __init__(self, seed=None) -> None:
+        '''构造
+        seed: 随机种子 (None 为不固定)
+        '''
+        self._random = random.Random(seed)# 随机数
+
+    def reset(self) -> None:
+        '''新游戏开始
+        '''
+        pass
+
+    def set_time_budget_ms(self, time_budget_ms: int) -> None:
+        '''设置每个部件的决策时间预算 (毫秒, 0 为不限时, 决策只取决于面板和种子)
+        不按时间决策的策略忽略
+        '''
+        pass
+
+    def get_option(self, engine: TetrisEngine) -> TransferOption:
+        '''下一步部件变换
+        '''
+        raise NotImplementedError
+
+
+# 随机操作
+class RandomStrategy(TetrisStrategy):
+    '''随机操作
+    每步随机选择一种部件变换
+    '''
+    def get_option(self, engine: TetrisEngine) -> TransferOption:
+        '''下一步部件变换
+        '''
+        return TransferOption(self._random.randint(TransferOption.LineDown, TransferOption.Rotate))
+
+
+# 随机放置
+class DropStrategy(TetrisStrategy):
+    '''随机放置
+    每个部件随机选择朝向和平移, 然后落至底部
+    '''
+    def __init__(self, seed=None) -> None:
+        '''构造
+        '''
+        super().__init__(seed)
+        self.__option_list = []# 当前部件待执行的变换
+
+    def reset(self) -> None:
+        '''新游戏开始
+        '''
+        self.__option_list = []
+
+    def get_option(self, engine: TetrisEngine) -> TransferOption:
+        '''下一步部件变换
+        '''
+        # 新部件: 规划变换 (以落至底部结束)
+        if not self.__option_list:
+            col_count = engine.get_matrix().get_col_count()
+            shift = self._random.randint(-(col_count // 2), col_count // 2)
+            self.__option_list = [TransferOption.Rotate] * self._random.randint(0, 3)
+            self.__option_list += [TransferOption.RightShift if shift > 0 else TransferOption.LeftShift] * abs(shift)
+            self.__option_list.append(TransferOption.DropDown)
+        return self.__option_list.pop(0)
+
+
+# 行占用位图面板
+class _RowMaskBoard(object):
+    '''行占用位图面板 (供 get_placements 在模拟放置后的面板上枚举落点)
+    '''
+    def __init__(self, row_mask_list: list[int], col_count: int) -> None:
+        '''构造
+        '''
+        self.__row_mask_list = row_mask_list# 行占用位图
+        self.__col_count = col_count# 列方块数
+
+    def get_row_count(self) -> int:
+        '''行方块数
+        '''
+        return len(self.__row_mask_list)
+
+    def get_col_count(self) -> int:
+        '''列方块数
+        '''
+        return self.__col_count
+
+    def get_row_mask(self, row: int) -> int:
+        '''行占用位图
+        '''
+        return self.__row_mask_list[row]
+
+
+# 启发式
+class HeuristicStrategy(TetrisStrategy):
+    '''启发式
+    以 聚合高度、空洞、凹凸度、消除行数 评价当前部件的每个可到达落点, 可结合下一部件前瞻
+    先评价全部落点, 再按评价高低依次前瞻: 至多前瞻 lookahead_limit 个落点 (确定), 超过时间预算即停止 (0 为不限时)
+    界面自动玩家使用时间预算保证响应; 比赛不限时, 同一种子的结果与机器负载无关
+    按落点路径逐步给出变换 (与玩家按键相同), 最后落至底部
+    '''
+    __config_section = 'tetris_game'# 配置节 (与游戏界面共用)
+    _height_weight = -0.510066# 聚合高度
+    _lines_weight = 0.760666# 消除行数
+    _holes_weight = -0.35663# 空洞
+    _bumpiness_weight = -0.184483# 凹凸度
+
+    def __init__(self, seed=None, time_budget_ms: int = None, lookahead: bool = None, lookahead_limit: int = None) -> None:
+        '''构造
+        time_budget_ms: 每个部件的决策时间预算 (毫秒, 0 为不限时, None 使用配置)
+        lookahead: 结合下一部件前瞻 (None 使用配置)
+        lookahead_limit: 前瞻的落点数上限 (0 为全部, None 使用配置)
+        '''
+        super().__init__(seed)
+        self.load_config()# 加载配置
+        if time_budget_ms is not None:
+            self.__time_budget_ms = max(0, time_budget_ms)
+        if lookahead is not None:
+            self.__lookahead = lookahead
+        if lookahead_limit is not None:
+            self.__lookahead_limit = max(0, lookahead_limit)
+        self.reset()
+
+    def load_config(self) -> None:
+        '''加载配置
+        '''
+        # 决策时间预算 (毫秒, 0 为不限时)
+        self.__time_budget_ms = GlobalConfig.load_int(self.__config_section, 'ai_time_budget_ms', 50, 0)
+        # 前瞻
+        self.__lookahead = GlobalConfig.load_bool(self.__config_section, 'ai_lookahead', True)
+        # 前瞻的落点数上限 (0 为全部)
+        self.__lookahead_limit = GlobalConfig.load_int(self.__config_section, 'ai_lookahead_limit', 0, 0)
+
+    def save_config(self) -> None:
+        '''保存配置
+        '''
+        # 决策时间预算 (毫秒)
+        GlobalConfig.save(self.__config_section, 'ai_time_budget_ms', str(self.__time_budget_ms))
+        # 前瞻
+        GlobalConfig.save(self.__config_section, 'ai_lookahead', str(int(self.__lookahead)))
+        # 前瞻的落点数上限
+        GlobalConfig.save(self.__config_section, 'ai_lookahead_limit', str(self.__lookahead_limit))
+
+    def set_time_budget_ms(self, time_budget_ms: int) -> None:
+        '''设置每个部件的决策时间预算 (毫秒, 0 为不限时)
+        '''
+        self.__time_budget_ms = max(0, time_budget_ms)
+
+    def reset(self) -> None:
+        '''新游戏开始
+        '''
+        self.__option_list = []# 当前部件待执行的变换
+        self.__expected = None# 执行下一变换前部件应处的状态 (朝向, dx, dy)
+        self.__pieces_dropped = -1# 规划时的累计下落部件
+
+    def get_option(self, engine: TetrisEngine) -> TransferOption:
+        '''下一步部件变换
+        '''
+        piece = engine.get_curr_piece()
+        state = (piece.get_orientation(), piece.get_dx(), piece.get_dy())
+        pieces_dropped = engine.get_data()._pieces_dropped
+        # 新部件: 规划
+        if pieces_dropped != self.__pieces_dropped or self.__expected is None:
+            self.__pieces_dropped = pieces_dropped
+            self.__plan(engine)
+        # 定时下落使部件低于预期: 跳过相应的下移
+        expected = self.__expected
+        while self.__option_list and self.__option_list[0] == TransferOption.LineDown and state[:2] == expected[:2] and state[2] < expected[2]:
+            self.__option_list.pop(0)
+            expected = (expected[0], expected[1], expected[2] - 1)
+        # 偏离路径 (如 定时下落后无法继续): 自当前位置重新规划
+        if state != expected:
+            self.__plan(engine, state)
+            expected = self.__expected
+        # 路径结束: 落至底部
+        if not self.__option_list:
+            self.__expected = state
+            return TransferOption.DropDown
+        # 按路径变换
+        option = self.__option_list.pop(0)
+        orientation, dx, dy = expected
+        if option == TransferOption.LeftShift:
+            dx -= 1
+        elif option == TransferOption.RightShift:
+            dx += 1
+        elif option == TransferOption.LineDown:
+            dy -= 1
+        elif option == TransferOption.Rotate:
+            orientation = ShapeTable.get_orientation(orientation, 90)
+        self.__expected = (orientation, dx, dy)
+        return option
+
+    def __plan(self, engine: TetrisEngine, start: tuple[int] = None) -> None:
+        '''为当前部件选择落点
+        start: 部件当前状态 (朝向, dx, dy), None 为新部件的起始位置
+        '''
+        deadline = time.perf_counter() + self.__time_budget_ms / 1000 if self.__time_budget_ms else None# None 为不限时
+        matrix = engine.get_matrix()
+        col_count = matrix.get_col_count()
+        row_mask_list = [matrix.get_row_mask(row) for row in range(matrix.get_row_count())]
+        piece = engine.get_curr_piece()
+        self.__expected = (piece.get_orientation(), piece.get_dx(), piece.get_dy())
+        self.__option_list = []
+        # 评价当前部件的全部落点
+        candidate_list = []
+        for placement in get_placements(matrix, piece.get_shape(), start):
+            mask_list, lines = self.place(row_mask_list, col_count, piece.get_shape(), placement)
+            candidate_list.append((self.evaluate(mask_list, col_count, lines), lines, placement, mask_list))
+        if not candidate_list:
+            return None
+        candidate_list.sort(key=lambda candidate: candidate[0], reverse=True)
+        best_placement = candidate_list[0][2]
+        # 前瞻下一部件 (按评价高低, 落点数上限及时间预算内)
+        next_shape = engine.get_next_piece().get_shape()
+        if self.__lookahead and next_shape != Shape._None:
+            best_value = None
+            lookahead_list = candidate_list[:self.__lookahead_limit] if self.__lookahead_limit else candidate_list
+            for _, lines, placement, mask_list in lookahead_list:
+                if deadline is not None and time.perf_counter() > deadline:
+                    break
+                value = float('-inf')# 下一部件无处放置
+                for next_placement in get_placements(_RowMaskBoard(mask_list, col_count), next_shape):
+                    next_mask_list, next_lines = self.place(mask_list, col_count, next_shape, next_placement)
+                    value = max(value, self.evaluate(next_mask_list, col_count, lines + next_lines))
+                if best_value is None or value > best_value:
+                    best_value, best_placement = value, placement
+        self.__option_list = list(best_placement.path)
+        while self.__option_list and self.__option_list[-1] == TransferOption.LineDown:# 末尾的下移由落至底部代替
+            self.__option_list.pop()
+
+    @staticmethod
+    def place(row_mask_list: list[int], col_count: int, shape: Shape, placement: Placement) -> tuple:
+        '''模拟放置部件并消除整行
+        return: (放置后的行占用位图, 消除行数)
+        '''
+        row_count = len(row_mask_list)
+        mask_list = list(row_mask_list)
+        center_col = col_count // 2
+        for x, y in ShapeTable.get_state(shape, placement.orientation).points:
+            mask_list[y + placement.dy + row_count] |= 1 << (x + placement.dx + center_col)
+        full_row_mask = (1 << col_count) - 1
+        mask_list = [row_mask for row_mask in mask_list if row_mask != full_row_mask]
+        lines = row_count - len(mask_list)
+        mask_list.extend([0] * lines)
+        return mask_list, lines
+
+    @classmethod
+    def evaluate(cls, row_mask_list: list[int], col_count: int, lines: int) -> float:
+        '''评价面板 (越大越好)
+        '''
+        # 列高度
+        height_list = [0] * col_count
+        found_mask = 0
+        for row in range(len(row_mask_list) - 1, -1, -1):
+            new_mask = row_mask_list[row] & ~found_mask
+            if new_mask:
+                found_mask |= new_mask
+                while new_mask:
+                    low_bit = new_mask & -new_mask
+                    height_list[low_bit.bit_length() - 1] = row + 1
+                    new_mask ^= low_bit
+        aggregate_height = sum(height_list)
+        # 空洞 (列高度以下的空闲方块)
+        holes = aggregate_height - sum(row_mask.bit_count() for row_mask in row_mask_list)
+        # 凹凸度
+        bumpiness = sum(abs(height_list[col] - height_list[col + 1]) for col in range(col_count - 1))
+        return (cls._height_weight * aggregate_height + cls._lines_weight * lines
+                + cls._holes_weight * holes + cls._bumpiness_weight * bumpiness)
+
+
+# 策略注册表
+_strategy_dict = {
+    'random': RandomStrategy,# 随机操作
+    'drop': DropStrategy,# 随机放置
+    'heuristic': HeuristicStrategy,# 启发式
+}
+
+
+def register_strategy(name: str, strategy_class: type) -> None:
+    '''注册策略
+    name: 策略名称
+    strategy_class: TetrisStrategy 子类, 构造参数为 seed
+    '''
+    _strategy_dict[name] = strategy_class
+
+
+def create_strategy(name: str, seed=None) -> TetrisStrategy:
+    '''按名称创建策略
+    '''
+    if name not in _strategy_dict:
+        raise ValueError(f'unknown strategy: {name}')
+    return _strategy_dict[name](seed)
+
+
+def get_strategy_names() -> list[str]:
+    '''已注册的策略名称
+    '''
+    return list(_strategy_dict.keys())
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+
+"""俄罗斯方块 自动玩家比赛
+无界面运行: 每个策略以固定种子进行 M 局游戏, 多进程使用全部 CPU 核心
+计分、等级与游戏界面一致 (TetrisData 及配置文件中的 start_level / update_level_count)
+策略不使用决策时间预算 (ai_time_budget_ms 只用于界面), 同一种子的结果可重现; 前瞻落点数上限 ai_lookahead_limit 与界面相同
+汇总各策略的分数、消除行数、下落部件数、每秒部件数, 输出表格及 JSON
+
+用法: python tetris_tournament.py -s random drop -m 100 --json result.json
+"""
+
+
+# 模块信息
+__all__ = ['play_game', 'run_tournament', 'summarize']
+__version__ = '0.1'
+__author__ = 'lihua.tan'
+
+
+# python库
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+# 自封装库
+from ini_config import GlobalConfig# 配置文件管理
+from tetris_engine import (GameState, TetrisEngine)# 游戏规则
+from tetris_strategy import (create_strategy, get_strategy_names)# 自动玩家策略
+
+
+# 配置文件 (与游戏界面相同)
+_config_dir = os.path.dirname(os.path.abspath(__file__))
+_config_base_name = '俄罗斯方块配置'
+_config_section = 'tetris_game'
+
+
+def _init_worker(config_dir: str) -> None:
+    '''子进程初始化: 加载配置文件
+    '''
+    GlobalConfig.load_file(config_dir, _config_base_name)
+
+
+def play_game(strategy_name: str, seed: int, row_count: int, col_count: int, max_pieces: int) -> dict:
+    '''以指定策略和种子进行一局游戏
+    max_pieces: 下落部件数上限 (达到后结束, 0 为不限)
+    return: 本局结果
+    '''
+    engine = TetrisEngine(row_count, col_count, seed=seed)
+    strategy = create_strategy(strategy_name, seed)
+    strategy.set_time_budget_ms(0)# 不限时: 结果只取决于种子, 与进程间的 CPU 竞争无关
+    data = engine.get_data()
+    # 运行
+    start_time = time.perf_counter()
+    engine.start()
+    while engine.get_state() == GameState.Run:
+        if max_pieces and data._pieces_dropped >= max_pieces:
+            break
+        engine.step(strategy.get_option(engine))
+    seconds = time.perf_counter() - start_time
+    # 结果
+    return {
+        'strategy': strategy_name,
+        'seed': seed,
+        'score': data._score,
+        'level': data._level,
+        'lines_removed': data._lines_removed,
+        'pieces_dropped': data._pieces_dropped,
+        'seconds': seconds,
+    }
+
+
+def _play_game_args(args: tuple) -> dict:
+    '''进程池调用入口
+    '''
+    return play_game(*args)
+
+
+def run_tournament(strategy_names: list[str], game_count: int, seed: int, row_count: int, col_count: int, max_pieces: int, workers: int = None) -> list[dict]:
+    '''进行比赛
+    每个策略使用相同的种子序列 seed ~ seed + game_count - 1
+    workers: 进程数 (None 为 CPU 核心数)
+    return: 每局结果
+    '''
+    task_list = [(name, seed + i, row_count, col_count, max_pieces) for name in strategy_names for i in range(game_count)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_config_dir,)) as executor:
+        chunk_size = max(1, len(task_list) // ((workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(_play_game_args, task_list, chunksize=chunk_size))
+
+
+def summarize(result_list: list[dict]) -> dict:
+    '''按策略汇总
+    '''
+    summary = {}
+    for result in result_list:
+        item = summary.setdefault(result['strategy'], {'games': 0, 'score': [], 'lines_removed': [], 'pieces_dropped': [], 'seconds': 0.0})
+        item['games'] += 1
+        item['score'].append(result['score'])
+        item['lines_removed'].append(result['lines_removed'])
+        item['pieces_dropped'].append(result['pieces_dropped'])
+        item['seconds'] += result['seconds']
+    for name, item in summary.items():
+        total_pieces = sum(item['pieces_dropped'])
+        summary[name] = {
+            'games': item['games'],
+            'score_mean': sum(item['score']) / item['games'],
+            'score_max': max(item['score']),
+            'lines_removed_mean': sum(item['lines_removed']) / item['games'],
+            'pieces_dropped_mean': total_pieces / item['games'],
+            'pieces_per_second': total_pieces / item['seconds'] if item['seconds'] else 0.0,
+        }
+    return summary
+
+
+def _print_summary(summary: dict) -> None:
+    '''打印汇总表格
+    '''
+    header = f'{"strategy":<12}{"games":>8}{"score":>12}{"max":>10}{"lines":>10}{"pieces":>10}{"pieces/s":>12}'
+    print(header)
+    print('-' * len(header))
+    for name, item in summary.items():
+        print(f'{name:<12}{item["games"]:>8}{item["score_mean"]:>12.1f}{item["score_max"]:>10}'
+              f'{item["lines_removed_mean"]:>10.1f}{item["pieces_dropped_mean"]:>10.1f}{item["pieces_per_second"]:>12.0f}')
+
+
+def main(argv: list[str] = None) -> int:
+    '''命令行入口
+    '''
+    # 配置 (面板大小默认与游戏界面一致)
+    GlobalConfig.load_file(_config_dir, _config_base_name)
+    row_count = GlobalConfig.load_int(_config_section, 'board_row_count', 24, 4)
+    col_count = GlobalConfig.load_int(_config_section, 'board_col_count', 10, 4)
+    # 参数
+    parser = argparse.ArgumentParser(description='俄罗斯方块 自动玩家比赛')
+    parser.add_argument('-s', '--strategies', nargs='+', default=get_strategy_names(), help=f'策略名称 ({", ".join(get_strategy_names())})')
+    parser.add_argument('-m', '--games', type=int, default=20, help='每个策略的局数')
+    parser.add_argument('--seed', type=int, default=0, help='起始种子')
+    parser.add_argument('--rows', type=int, default=row_count, help='面板行数')
+    parser.add_argument('--cols', type=int, default=col_count, help='面板列数')
+    parser.add_argument('--max-pieces', type=int, default=10000, help='每局下落部件数上限 (0 为不限)')
+    parser.add_argument('--workers', type=int, default=None, help='进程数 (默认 CPU 核心数)')
+    parser.add_argument('--json', default='', help='结果输出的 JSON 文件路径')
+    args = parser.parse_args(argv)
+    for name in args.strategies:
+        if name not in get_strategy_names():
+            parser.error(f'unknown strategy: {name}')
+    # 比赛
+    result_list = run_tournament(args.strategies, args.games, args.seed, args.rows, args.cols, args.max_pieces, args.workers)
+    summary = summarize(result_list)
+    _print_summary(summary)
+    # 输出
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as fp:
+            json.dump({'config': vars(args), 'summary': summary, 'games': result_list}, fp, ensure_ascii=False, indent=2)
+    return 0
+
+
+# 主程序入口
+if __name__ == '__main__':
+    sys.exit(main())